@@ -1,6 +1,7 @@
 const { exec } = require('child_process');
 const { promisify } = require('util');
 const axios = require('axios');
+const { pythonWorkerPool } = require('../utils/python-worker-pool');
 
 const execAsync = promisify(exec);
 
@@ -184,25 +185,12 @@ async function extractYouTubeRobust(url) {
   }
 
   try {
-    // Use Python script for better control
-    const pythonScript = '/app/ytdlp_extract.py';
-    const command = hasCookies 
-      ? `python3 ${pythonScript} "${url}" "${cookieFile}"`
-      : `python3 ${pythonScript} "${url}"`;
+    // Use a warm Python worker (yt_dlp already imported) for better control
+    const args = hasCookies ? [url, cookieFile] : [url];
     
     console.log('Running Python yt-dlp...');
     
-    const { stdout, stderr } = await execAsync(command, {
-      timeout: 45000,
-      maxBuffer: 10 * 1024 * 1024
-    });
-
-    if (stderr && stderr.includes('ERROR')) {
-      console.error('Python error:', stderr);
-      throw new Error(stderr);
-    }
-
-    const result = JSON.parse(stdout);
+    const result = await pythonWorkerPool.run('ytdlp', args, 45000);
     
     // Check if extraction failed (new format check)
     if (result.error || !result.qualities || result.qualities.length === 0) {
@@ -431,31 +419,13 @@ async function extractTeraboxWithYtDlp(url) {
   console.log('✓ Using Terabox cookies from:', cookieFile);
   
   try {
-    const pythonScript = '/app/terabox_working.py';
-    const command = `python3 ${pythonScript} "${url}" "${cookieFile}" 2>/dev/null`;
-    
     console.log('Running terabox-downloader package...');
     
-    const { stdout, stderr } = await execAsync(command, {
-      timeout: 30000,
-      maxBuffer: 10 * 1024 * 1024
-    });
-
-    // Ignore stderr since we redirected it
-    // Only parse stdout which should be pure JSON
+    const result = await pythonWorkerPool.run('terabox-working', [url, cookieFile], 30000);
     
-    if (!stdout || stdout.trim().length === 0) {
-      throw new Error('No output from Python script');
-    }
-
-    // Try to extract JSON from stdout (in case there's extra text)
-    let jsonStr = stdout.trim();
-    const jsonMatch = stdout.match(/\{[\s\S]*\}/);
-    if (jsonMatch) {
-      jsonStr = jsonMatch[0];
+    if (!result) {
+      throw new Error('No output from Python worker');
     }
-
-    const result = JSON.parse(jsonStr);
     
     if (!result.success) {
       throw new Error(result.error || 'Extraction failed');
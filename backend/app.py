@@ -1,11 +1,28 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import yt_dlp
 import os
+import json
+import time
+import extract_cache
+import metrics
+import circuit_breaker
+import extractor
+from bounded_pool import BoundedPool, PoolSaturated
+from batch_extract import BATCH_CONCURRENCY, BATCH_MAX_URLS
+from progress import ProgressQueue, emit_early_metadata, format_ndjson, format_sse
+from concurrent.futures import FIRST_COMPLETED, wait, TimeoutError as FutureTimeout
 
 app = Flask(__name__)
 CORS(app)
 
+# Extractions run on a bounded pool so slow videos can't stall every request
+# and bursts beyond concurrency + queue depth get a 429 instead of piling up
+EXTRACT_CONCURRENCY = int(os.environ.get('EXTRACT_CONCURRENCY', '8'))
+EXTRACT_QUEUE_DEPTH = int(os.environ.get('EXTRACT_QUEUE_DEPTH', '32'))
+EXTRACT_TIMEOUT = float(os.environ.get('EXTRACT_TIMEOUT', '45'))
+
+extract_pool = BoundedPool(EXTRACT_CONCURRENCY, EXTRACT_QUEUE_DEPTH)
+
 @app.route('/')
 def home():
     return jsonify({
@@ -27,79 +44,29 @@ def extract():
         if not url:
             return jsonify({'error': 'URL is required'}), 400
         
-        # yt-dlp options for MAXIMUM extraction
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-            'format': 'best',
-            'nocheckcertificate': True,
-        }
+        future = extract_pool.submit(extract_info, url)
+        result = future.result(timeout=EXTRACT_TIMEOUT)
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            
-            # Extract all available formats
-            formats = info.get('formats', [])
-            
-            # Video formats
-            video_formats = []
-            audio_formats = []
-            
-            for f in formats:
-                if f.get('vcodec') != 'none' and f.get('acodec') != 'none':
-                    # Video with audio
-                    quality = f.get('format_note', f.get('height', 'unknown'))
-                    if isinstance(quality, int):
-                        quality = f"{quality}p"
-                    
-                    video_formats.append({
-                        'quality': quality,
-                        'format': f.get('ext', 'mp4'),
-                        'size': format_size(f.get('filesize') or f.get('filesize_approx', 0)),
-                        'url': f.get('url', ''),
-                        'width': f.get('width'),
-                        'height': f.get('height'),
-                        'fps': f.get('fps')
-                    })
-                elif f.get('acodec') != 'none' and f.get('vcodec') == 'none':
-                    # Audio only
-                    bitrate = f.get('abr', 128)
-                    audio_formats.append({
-                        'quality': f"{int(bitrate)}kbps",
-                        'format': f.get('ext', 'mp3'),
-                        'size': format_size(f.get('filesize') or f.get('filesize_approx', 0)),
-                        'url': f.get('url', '')
-                    })
-            
-            # Remove duplicates and sort
-            video_formats = sorted(
-                {v['quality']: v for v in video_formats}.values(),
-                key=lambda x: x.get('height', 0),
-                reverse=True
-            )[:10]
-            
-            audio_formats = sorted(
-                {a['quality']: a for a in audio_formats}.values(),
-                key=lambda x: int(x['quality'].replace('kbps', '')),
-                reverse=True
-            )[:5]
-            
-            # Get thumbnail
-            thumbnail = info.get('thumbnail', '')
-            if not thumbnail and info.get('thumbnails'):
-                thumbnail = info['thumbnails'][-1].get('url', '')
-            
-            return jsonify({
-                'title': info.get('title', 'Video'),
-                'thumbnail': thumbnail,
-                'duration': format_duration(info.get('duration', 0)),
-                'qualities': video_formats,
-                'audioFormats': audio_formats,
-                'platform': info.get('extractor_key', 'unknown').lower(),
-                'uploader': info.get('uploader', ''),
-                'views': info.get('view_count', 0)
-            })
+        started = time.perf_counter()
+        response = jsonify(result)
+        metrics.observe('extract_stage_seconds', time.perf_counter() - started, backend='app', stage='serialize')
+        return response
+    
+    except PoolSaturated as e:
+        response = jsonify({
+            'error': 'Server busy',
+            'message': str(e)
+        })
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    
+    except FutureTimeout:
+        # Drop it if it is still queued; a running extraction can't be interrupted
+        future.cancel()
+        return jsonify({
+            'error': 'Extraction timed out',
+            'message': f'No result after {EXTRACT_TIMEOUT:.0f}s'
+        }), 504
             
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -108,21 +75,172 @@ def extract():
             'message': str(e)
         }), 500
 
-def format_size(bytes_size):
-    if not bytes_size or bytes_size == 0:
-        return 'Unknown'
-    mb = bytes_size / (1024 * 1024)
-    if mb < 1:
-        return f"{bytes_size / 1024:.0f} KB"
-    return f"{mb:.0f} MB"
+@app.route('/api/extract/batch', methods=['POST', 'OPTIONS'])
+def extract_batch():
+    """Extract a list of URLs concurrently, streaming one NDJSON line per URL as it finishes"""
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    data = request.get_json() or {}
+    urls = data.get('urls')
+    
+    if not isinstance(urls, list) or not urls:
+        return jsonify({'error': 'urls must be a non-empty list'}), 400
+    
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({'error': f'At most {BATCH_MAX_URLS} URLs per batch'}), 400
+    
+    # At most BATCH_CONCURRENCY of this batch's URLs are in the shared pool at
+    # once, so one batch can't fill it and starve /api/extract. Each URL gets
+    # EXTRACT_TIMEOUT from the moment it starts (or from submission while it
+    # is still queued).
+    waiting = list(enumerate(urls))
+    waiting.reverse()
+    in_flight = {}  # future -> (index, url, submitted)
+    started = {}  # index -> time its extraction began
+    
+    def run(index, url):
+        started[index] = time.monotonic()
+        return extract_info(url)
+    
+    def fill():
+        """Submit waiting URLs into free batch slots; busy lines for URLs that can't be placed"""
+        busy = []
+        while waiting and len(in_flight) < BATCH_CONCURRENCY:
+            index, url = waiting[-1]
+            try:
+                future = extract_pool.submit(run, index, url)
+            except PoolSaturated as e:
+                if in_flight:
+                    # Retry when one of ours finishes
+                    break
+                waiting.pop()
+                busy.append({'index': index, 'url': url, 'error': 'Server busy', 'retryAfter': e.retry_after})
+                continue
+            waiting.pop()
+            in_flight[future] = (index, url, time.monotonic())
+        return busy
+    
+    rejected = fill()
+    if not in_flight:
+        response = jsonify({'error': 'Server busy', 'message': 'Extraction pool saturated'})
+        response.headers['Retry-After'] = str(rejected[0]['retryAfter'])
+        return response, 429
+    
+    def deadline(future):
+        index, url, submitted = in_flight[future]
+        return started.get(index, submitted) + EXTRACT_TIMEOUT
+    
+    def generate():
+        lines = rejected
+        try:
+            while True:
+                for line in lines:
+                    yield json.dumps(line) + '\n'
+                if not in_flight:
+                    return
+                
+                timeout = max(0.0, min(deadline(future) for future in in_flight) - time.monotonic())
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                
+                lines = []
+                for future in done:
+                    index, url, _ = in_flight.pop(future)
+                    try:
+                        lines.append({'index': index, 'url': url, 'result': future.result()})
+                    except Exception as e:
+                        lines.append({'index': index, 'url': url, 'error': 'Failed to extract video', 'message': str(e)})
+                
+                now = time.monotonic()
+                for future in [future for future in in_flight if deadline(future) <= now]:
+                    index, url, _ = in_flight.pop(future)
+                    future.cancel()
+                    lines.append({'index': index, 'url': url, 'error': 'Extraction timed out'})
+                
+                lines += fill()
+        finally:
+            # Client went away: drop whatever has not started yet
+            for future in in_flight:
+                future.cancel()
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/api/extract/stream', methods=['POST', 'OPTIONS'])
+def extract_stream():
+    """
+    Extract with progress events (metadata as soon as known, then formats, then
+    the full result). SSE when the client sends Accept: text/event-stream,
+    NDJSON otherwise.
+    """
+    if request.method == 'OPTIONS':
+        return '', 200
+    
+    data = request.get_json() or {}
+    url = data.get('url')
+    
+    if not url:
+        return jsonify({'error': 'URL is required'}), 400
+    
+    events = ProgressQueue()
+    
+    def run():
+        try:
+            events('result', result=extract_info(url, progress=events))
+        except Exception as e:
+            events('error', error='Failed to extract video', message=str(e))
+        finally:
+            events.close()
+    
+    events('started', url=url)
+    
+    try:
+        extract_pool.submit(run)
+    except PoolSaturated as e:
+        response = jsonify({'error': 'Server busy', 'message': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    
+    emit_early_metadata(url, events)
+    
+    sse = 'text/event-stream' in request.headers.get('Accept', '')
+    encode = format_sse if sse else format_ndjson
+    
+    def generate():
+        for event in events.iter(timeout=EXTRACT_TIMEOUT):
+            yield encode(event)
+    
+    return Response(
+        generate(),
+        mimetype='text/event-stream' if sse else 'application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify(extract_cache.stats())
+
+@app.route('/api/pool/stats')
+def pool_stats():
+    return jsonify(extract_pool.stats())
+
+@app.route('/api/breakers/stats')
+def breaker_stats():
+    return jsonify(circuit_breaker.stats())
 
-def format_duration(seconds):
-    if not seconds:
-        return '0:00'
-    mins = int(seconds // 60)
-    secs = int(seconds % 60)
-    return f"{mins}:{secs:02d}"
+@app.route('/metrics')
+def prometheus_metrics():
+    """Extraction histograms and counters in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def extract_info(url, progress=None):
+    """yt-dlp extraction for any site in the API response shape (raises on errors)"""
+    return extractor.extract(url, backend='generic', progress=progress)
 
 if __name__ == '__main__':
+    # Production: gunicorn -c gunicorn.conf.py app:app
     port = int(os.environ.get('PORT', 8080))
-    app.run(host='0.0.0.0', port=port)
+    try:
+        from waitress import serve
+        serve(app, host='0.0.0.0', port=port, threads=EXTRACT_CONCURRENCY + EXTRACT_QUEUE_DEPTH)
+    except ImportError:
+        app.run(host='0.0.0.0', port=port, threaded=True)
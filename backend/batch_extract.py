@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Batch Extraction
+Runs one extractor over a list of URLs with a bounded thread pool and streams
+one NDJSON line per URL as soon as it finishes (order = completion order)
+
+Line: {"index": 0, "url": "<url>", "result": {...}}  or  {..., "error": "..."}
+"""
+
+import os
+import sys
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '4'))
+BATCH_MAX_URLS = int(os.environ.get('BATCH_MAX_URLS', '50'))
+
+
+def iter_batch(func, urls, extra_args=(), concurrency=BATCH_CONCURRENCY):
+    """Yield a result line dict per URL as extractions complete"""
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(func, url, *extra_args): (index, url)
+            for index, url in enumerate(urls)
+        }
+
+        for future in as_completed(futures):
+            index, url = futures[future]
+            try:
+                yield {"index": index, "url": url, "result": future.result()}
+            except Exception as e:
+                yield {"index": index, "url": url, "error": f"Extraction error: {str(e)}"}
+
+
+def main(argv, func):
+    """
+    CLI for `<script> --batch [--cookies FILE] [--concurrency N] [URL ...]`
+    URLs are read from stdin (one per line) when none are given.
+    """
+    urls = []
+    extra_args = ()
+    concurrency = BATCH_CONCURRENCY
+
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == '--cookies' and i + 1 < len(argv):
+            extra_args = (argv[i + 1],)
+            i += 2
+            continue
+        if arg == '--concurrency' and i + 1 < len(argv):
+            concurrency = int(argv[i + 1])
+            i += 2
+            continue
+        urls.append(arg)
+        i += 1
+
+    if not urls:
+        urls = [line.strip() for line in sys.stdin if line.strip()]
+
+    for line in iter_batch(func, urls[:BATCH_MAX_URLS], extra_args, concurrency):
+        print(json.dumps(line), flush=True)
+
+    for index, url in enumerate(urls[BATCH_MAX_URLS:], start=BATCH_MAX_URLS):
+        print(json.dumps({
+            "index": index,
+            "url": url,
+            "error": f"Batch limit of {BATCH_MAX_URLS} URLs exceeded"
+        }), flush=True)
@@ -0,0 +1 @@
+"""Offline benchmarks for the extractors: python3 -m bench.run (see bench/run.py)"""
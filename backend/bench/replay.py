@@ -0,0 +1,77 @@
+"""
+Upstream Replay
+Points the extractors at a bench.stub_server instead of the network, inside
+the benchmark process only:
+
+- http_pool requests to https://<host>/<path> go to <stub>/<host>/<path>
+- `yt_dlp` is replaced by a YoutubeDL that fetches the recorded info dict
+  from <stub>/ytdlp/info, so everything after extract_info() (format
+  selection, result building, pooling) runs for real
+
+Call install() before importing the extractor modules.
+"""
+
+import sys
+import json
+import types
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+def stub_url(base_url, url):
+    """https://host/path?query -> <base_url>/host/path?query"""
+    parts = urllib.parse.urlsplit(url)
+    rewritten = f"{base_url}/{parts.hostname}{parts.path}"
+    return f"{rewritten}?{parts.query}" if parts.query else rewritten
+
+
+class DownloadError(Exception):
+    pass
+
+
+def _youtube_dl_class(base_url):
+    class YoutubeDL:
+        """Just enough of yt_dlp.YoutubeDL for the extractors"""
+        def __init__(self, params=None):
+            self.params = params or {}
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            self.close()
+
+        def close(self):
+            pass
+
+        def extract_info(self, url, download=False):
+            clients = (self.params.get('extractor_args') or {}).get('youtube', {}).get('player_client') or ['default']
+            query = urllib.parse.urlencode({'url': url, 'client': clients[0]})
+            try:
+                with urllib.request.urlopen(f"{base_url}/ytdlp/info?{query}", timeout=30) as response:
+                    return json.load(response)
+            except urllib.error.HTTPError as e:
+                raise DownloadError(f"ERROR: [youtube] {url}: HTTP Error {e.code}: {e.reason}")
+
+    return YoutubeDL
+
+
+def install(base_url):
+    """Route http_pool and yt_dlp to the stub at base_url"""
+    import http_pool
+
+    module = types.ModuleType('yt_dlp')
+    module.YoutubeDL = _youtube_dl_class(base_url)
+    module.utils = types.SimpleNamespace(DownloadError=DownloadError)
+    sys.modules['yt_dlp'] = module
+
+    def replay_fetch_json(method, url, *args, **kwargs):
+        # Keep one circuit breaker per original host, not one for the stub
+        kwargs.setdefault('breaker', urllib.parse.urlsplit(url).hostname)
+        return fetch_json(method, stub_url(base_url, url), *args, **kwargs)
+
+    fetch_json, fetch_status, stream = http_pool.fetch_json, http_pool.fetch_status, http_pool.stream
+    http_pool.fetch_json = replay_fetch_json
+    http_pool.fetch_status = lambda method, url, *args, **kwargs: fetch_status(method, stub_url(base_url, url), *args, **kwargs)
+    http_pool.stream = lambda method, url, *args, **kwargs: stream(method, stub_url(base_url, url), *args, **kwargs)
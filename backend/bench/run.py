@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Extractor Benchmark
+Offline benchmark of the Python extractors against bench.stub_server
+(recorded upstream fixtures, injectable latency and failures). Nothing
+leaves the machine, so runs are comparable across commits.
+
+Reports, as JSON:
+- cold_start: TTFB / wall time of each CLI script (startup_profile.bench)
+- per scenario (ytdlp, generic, terabox-api, terabox-cookies), each in its
+  own process: import time, first call, sequential latency percentiles,
+  throughput with `--concurrency` threads, errors and peak RSS
+
+    cd backend && python3 -m bench.run [--iterations N] [--concurrency C]
+        [--latency MS] [--jitter MS] [--fail-rate P]
+        [--host-latency HOST=MS] [--host-fail HOST=P] [--client-fail CLIENT=P]
+        [--scenarios a,b] [--cold-runs N] [--output FILE]
+
+Every call uses a distinct URL and the result cache is off (EXTRACT_CACHE=0),
+so each one runs the whole extractor; other settings come from the
+environment as usual.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ['ytdlp', 'generic', 'terabox-api', 'terabox-cookies']
+
+# Scripts timed for cold start (argument error path: import + first output)
+COLD_START_SCRIPTS = ['ytdlp_extract.py', 'terabox_extract.py', 'terabox_extract_with_cookies.py', 'terabox_working.py']
+
+# Benchmark defaults, unless set in the environment
+BENCH_ENV = {
+    'EXTRACT_CACHE': '0',
+    'YTDLP_ADAPTIVE': '0',
+    'LINK_PROBE': '0',
+}
+
+USAGE = ('Usage: python3 -m bench.run [--iterations N] [--concurrency C] [--latency MS] '
+         '[--jitter MS] [--fail-rate P] [--host-latency HOST=MS] [--host-fail HOST=P] '
+         '[--client-fail CLIENT=P] [--scenarios a,b] [--cold-runs N] [--output FILE]')
+
+
+def scenario_call(name, cookie_file):
+    """The extraction function for a scenario: call(n) -> result dict"""
+    import extractor
+
+    # Import the backend now so it counts as import time, not first-call time
+    extractor.get_backend(name)
+
+    if name == 'ytdlp':
+        return lambda n: extractor.extract(f"https://www.youtube.com/watch?v=bn{n:09d}", backend='ytdlp')
+    if name == 'generic':
+        return lambda n: extractor.extract(f"https://vimeo.com/{100000 + n}", backend='generic')
+    if name == 'terabox-api':
+        return lambda n: extractor.extract(f"https://www.terabox.com/s/1bench{n}", backend='terabox-api')
+    if name == 'terabox-cookies':
+        return lambda n: extractor.extract(f"https://www.1024terabox.com/s/1bench{n}",
+                                           backend='terabox-cookies', cookie_file=cookie_file)
+    raise ValueError(f"Unknown scenario: {name}")
+
+
+def _timed(call, n):
+    """
+    (ms, ok) for one extraction. Exceptions, success: False and an 'error'
+    key (yt-dlp failures carry no 'success') count as errors.
+    """
+    started = time.perf_counter()
+    try:
+        result = call(n)
+        ok = bool(result) and result.get('success') is not False and not result.get('error')
+    except Exception:
+        ok = False
+    return (time.perf_counter() - started) * 1000, ok
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _summary(values):
+    from startup_profile import _percentile
+
+    if not values:
+        return None
+    return {
+        'min': round(min(values), 2),
+        'p50': round(_percentile(values, 50), 2),
+        'p95': round(_percentile(values, 95), 2),
+        'p99': round(_percentile(values, 99), 2),
+        'max': round(max(values), 2),
+        'mean': round(sum(values) / len(values), 2),
+    }
+
+
+def run_scenario(name, stub, iterations, concurrency):
+    """Runs inside the scenario's own process (see _spawn)"""
+    from bench import replay
+
+    cookie_file = os.path.join(tempfile.mkdtemp(prefix='bench-'), 'cookies.txt')
+    with open(cookie_file, 'w') as f:
+        f.write("# Netscape HTTP Cookie File\n"
+                ".1024terabox.com\tTRUE\t/\tTRUE\t2147483647\tndus\tbench-session\n")
+
+    started = time.perf_counter()
+    replay.install(stub)
+    call = scenario_call(name, cookie_file)
+    import_ms = (time.perf_counter() - started) * 1000
+
+    # First call pays for lazy imports, session creation and pool warm-up
+    first_ms, first_ok = _timed(call, 0)
+
+    latencies = []
+    errors = 0 if first_ok else 1
+    for n in range(1, iterations + 1):
+        ms, ok = _timed(call, n)
+        latencies.append(ms)
+        errors += not ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(lambda n: _timed(call, n), range(iterations + 1, 2 * iterations + 1)))
+    elapsed = time.perf_counter() - started
+    errors += sum(1 for _, ok in outcomes if not ok)
+
+    return {
+        'import_ms': round(import_ms, 2),
+        'first_call_ms': round(first_ms, 2),
+        'latency_ms': _summary(latencies),
+        'throughput': {
+            'concurrency': concurrency,
+            'requests': len(outcomes),
+            'elapsed_s': round(elapsed, 3),
+            'rps': round(len(outcomes) / elapsed, 2) if elapsed else None,
+            'latency_ms': _summary([ms for ms, _ in outcomes]),
+        },
+        'requests': 2 * iterations + 1,
+        'errors': errors,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def _spawn(name, stub, iterations, concurrency):
+    """Run one scenario in a fresh interpreter, so imports and RSS are its own"""
+    env = dict(os.environ)
+    for key, value in BENCH_ENV.items():
+        env.setdefault(key, value)
+    env.setdefault('YTDLP_CLIENT_STATS', os.path.join(tempfile.gettempdir(), f"bench_client_stats_{os.getpid()}.json"))
+
+    proc = subprocess.run(
+        [sys.executable, '-m', 'bench.run', '--scenario', name, '--stub', stub,
+         '--iterations', str(iterations), '--concurrency', str(concurrency)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    try:
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return {'error': f"exit code {proc.returncode}", 'stderr': proc.stderr[-2000:]}
+
+
+def cold_start(runs):
+    import startup_profile
+
+    return {
+        script: startup_profile.bench(os.path.join(BACKEND_DIR, script), [], runs)
+        for script in COLD_START_SCRIPTS
+    }
+
+
+def _pairs(values, cast):
+    """['host=12', ...] -> {'host': 12.0, ...}"""
+    pairs = {}
+    for value in values:
+        key, _, number = value.partition('=')
+        pairs[key] = cast(number)
+    return pairs
+
+
+def _options(argv):
+    options = {
+        'iterations': 50, 'concurrency': 8, 'latency': 20.0, 'jitter': 5.0,
+        'fail_rate': 0.0, 'cold_runs': 5, 'scenarios': ','.join(SCENARIOS), 'output': None,
+        'scenario': None, 'stub': None,
+    }
+    lists = {'host_latency': [], 'host_fail': [], 'client_fail': []}
+    casts = {'iterations': int, 'concurrency': int, 'cold_runs': int, 'latency': float,
+             'jitter': float, 'fail_rate': float}
+
+    i = 0
+    while i < len(argv):
+        name = argv[i][2:].replace('-', '_') if argv[i].startswith('--') else None
+        if (name in options or name in lists) and i + 1 < len(argv):
+            if name in lists:
+                lists[name].append(argv[i + 1])
+            else:
+                options[name] = casts.get(name, str)(argv[i + 1])
+            i += 2
+            continue
+        raise ValueError(f"Unknown argument: {argv[i]}")
+
+    options['host_latency'] = _pairs(lists['host_latency'], float)
+    options['host_fail'] = _pairs(lists['host_fail'], float)
+    options['client_fail'] = _pairs(lists['client_fail'], float)
+    return options
+
+
+def main(argv):
+    try:
+        options = _options(argv)
+    except ValueError as e:
+        print(json.dumps({'error': str(e), 'usage': USAGE}))
+        sys.exit(1)
+
+    if options['scenario']:
+        # Child process started by _spawn
+        sys.path.insert(0, BACKEND_DIR)
+        result = run_scenario(options['scenario'], options['stub'], options['iterations'], options['concurrency'])
+        print(json.dumps(result))
+        return
+
+    sys.path.insert(0, BACKEND_DIR)
+    from bench.stub_server import StubConfig, StubServer
+
+    config = StubConfig(
+        latency=options['latency'], jitter=options['jitter'], fail_rate=options['fail_rate'],
+        host_latency=options['host_latency'], host_fail=options['host_fail'],
+        client_fail=options['client_fail'], seed=0,
+    )
+    server = StubServer(config)
+    stub = server.start()
+
+    try:
+        report = {
+            'benchmark': 'extractors',
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': {key: options[key] for key in (
+                'iterations', 'concurrency', 'latency', 'jitter', 'fail_rate',
+                'host_latency', 'host_fail', 'client_fail')},
+            'cold_start': cold_start(options['cold_runs']) if options['cold_runs'] else None,
+            'scenarios': {
+                name: _spawn(name, stub, options['iterations'], options['concurrency'])
+                for name in options['scenarios'].split(',') if name
+            },
+            'stub': server.stats(),
+        }
+    finally:
+        server.stop()
+
+    output = json.dumps(report, indent=2)
+    if options['output']:
+        with open(options['output'], 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Stub Upstream Server
+Local HTTP server that replays the recorded fixtures in bench/fixtures in
+place of the real upstreams. Requests arrive as /<original host>/<path>
+(bench.replay rewrites the extractors' URLs that way), so latency and
+failures can be injected per host:
+
+- /<terabox mirror>/share/list, /share/download   authenticated API
+- /terabox.hnn.workers.dev/api/get-info, get-download   public worker API
+- /ytdlp/info?url=&client=   yt-dlp info dict (served to bench.replay's YoutubeDL)
+
+    python3 -m bench.stub_server [--port P] [--latency MS] [--jitter MS] [--fail-rate P]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return json.load(f)
+
+
+class StubConfig:
+    """
+    Latency and failure injection. latency/jitter are in ms; per-host and
+    per-client overrides take precedence over the defaults.
+    """
+    def __init__(self, latency=0, jitter=0, fail_rate=0.0, fail_status=503,
+                 host_latency=None, host_fail=None, client_fail=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_rate = fail_rate
+        self.fail_status = fail_status
+        self.host_latency = host_latency or {}
+        self.host_fail = host_fail or {}
+        self.client_fail = client_fail or {}
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self, host):
+        base = self.host_latency.get(host, self.latency)
+        with self.lock:
+            jitter = self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0
+        return max(0.0, base + jitter) / 1000
+
+    def fails(self, host, client=None):
+        rate = self.client_fail.get(client, self.host_fail.get(host, self.fail_rate))
+        with self.lock:
+            return self.random.random() < rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes - don't let Nagle hold the body
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _route(self, method):
+        server = self.server
+        parts = urllib.parse.urlsplit(self.path)
+        segments = parts.path.lstrip('/').split('/', 1)
+        host, path = segments[0], '/' + (segments[1] if len(segments) > 1 else '')
+        query = dict(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+        body = self._body() if method == 'POST' else b''
+
+        with server.counter_lock:
+            server.requests[host] = server.requests.get(host, 0) + 1
+
+        time.sleep(server.config.delay(host))
+        if server.config.fails(host, query.get('client')):
+            with server.counter_lock:
+                server.failures[host] = server.failures.get(host, 0) + 1
+            self._send_json(server.config.fail_status, {'error': 'injected failure'})
+            return
+
+        handler = server.routes.get(path)
+        if handler is None:
+            self._send_json(404, {'error': f'no fixture for {path}'})
+            return
+        self._send_json(200, handler(server.fixtures, query, body))
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def _share_download(fixtures, query, body):
+    """Echo one dlink per requested fs_id, so folder shares resolve too"""
+    data = dict(fixtures['share_download'])
+    template = data['list'][0]
+    try:
+        fs_ids = json.loads(query.get('fid_list', '[]'))
+    except ValueError:
+        fs_ids = []
+    data['list'] = [
+        dict(template, fs_id=fs_id, dlink=template['dlink'].replace(str(template['fs_id']), str(fs_id)))
+        for fs_id in fs_ids
+    ]
+    return data
+
+
+def _ytdlp_info(fixtures, query, body):
+    """The recorded info dict, re-keyed to the requested video"""
+    info = dict(fixtures['youtube_info'])
+    video_id = urllib.parse.parse_qs(urllib.parse.urlsplit(query.get('url', '')).query).get('v', [info['id']])[0]
+    info['id'] = video_id
+    info['webpage_url'] = f"https://www.youtube.com/watch?v={video_id}"
+    return info
+
+
+ROUTES = {
+    '/share/list': lambda fixtures, query, body: fixtures['share_list'],
+    '/share/download': _share_download,
+    '/api/get-info': lambda fixtures, query, body: fixtures['get_info'],
+    '/api/get-download': lambda fixtures, query, body: fixtures['get_download'],
+    '/info': _ytdlp_info,
+}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        super().__init__((host, port), _Handler)
+        self.config = config or StubConfig()
+        self.routes = ROUTES
+        self.fixtures = {
+            'youtube_info': load_fixture('youtube_info.json'),
+            'share_list': load_fixture('terabox_share_list.json'),
+            'share_download': load_fixture('terabox_share_download.json'),
+            'get_info': load_fixture('terabox_get_info.json'),
+            'get_download': load_fixture('terabox_get_download.json'),
+        }
+        self.counter_lock = threading.Lock()
+        self.requests = {}
+        self.failures = {}
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def start(self):
+        """Serve on a daemon thread; returns the base URL"""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def stats(self):
+        with self.counter_lock:
+            return {'requests': dict(self.requests), 'failures': dict(self.failures)}
+
+
+def main(argv):
+    """Run the stub in the foreground (for pointing a worker at it by hand)"""
+    options = {'--port': 0, '--latency': 0.0, '--jitter': 0.0, '--fail-rate': 0.0}
+    i = 0
+    while i < len(argv):
+        if argv[i] in options and i + 1 < len(argv):
+            options[argv[i]] = type(options[argv[i]])(argv[i + 1])
+            i += 2
+            continue
+        print(json.dumps({'error': 'Usage: python3 -m bench.stub_server [--port P] [--latency MS] [--jitter MS] [--fail-rate P]'}))
+        sys.exit(1)
+
+    config = StubConfig(options['--latency'], options['--jitter'], options['--fail-rate'])
+    server = StubServer(config, port=options['--port'])
+    print(json.dumps({'url': server.url}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
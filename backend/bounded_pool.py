@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Bounded Extraction Pool
+Thread pool with a hard cap on running + queued work, so a burst of slow
+extractions is rejected early (HTTP 429) instead of piling up unbounded
+"""
+
+import math
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(Exception):
+    """Raised when concurrency and queue depth are both used up"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Extraction pool saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class BoundedPool:
+    """ThreadPoolExecutor that admits at most concurrency + queue_depth tasks"""
+
+    def __init__(self, concurrency=4, queue_depth=16, name='extract'):
+        self.concurrency = max(1, concurrency)
+        self.queue_depth = max(0, queue_depth)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=name)
+        self.lock = threading.Lock()
+        self.pending = 0
+        # Running average task duration, used for the Retry-After hint
+        self.avg_duration = 5.0
+        self.counters = {'submitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0, 'cancelled': 0}
+
+    def retry_after(self):
+        """Seconds until a slot is likely to free up"""
+        waves = max(1, self.pending - self.concurrency + 1) / self.concurrency
+        return max(1, math.ceil(self.avg_duration * waves))
+
+    def submit(self, func, *args, **kwargs):
+        """Schedule func, or raise PoolSaturated when the pool is full"""
+        with self.lock:
+            if self.pending >= self.concurrency + self.queue_depth:
+                self.counters['rejected'] += 1
+                raise PoolSaturated(self.retry_after())
+            self.pending += 1
+            self.counters['submitted'] += 1
+
+        def run():
+            started = time.time()
+            failed = False
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                duration = time.time() - started
+                with self.lock:
+                    self.pending -= 1
+                    self.avg_duration = 0.8 * self.avg_duration + 0.2 * duration
+                    self.counters['failed' if failed else 'completed'] += 1
+
+        def release_cancelled(future):
+            # A cancelled task never runs, so run() can't free its slot
+            if future.cancelled():
+                with self.lock:
+                    self.pending -= 1
+                    self.counters['cancelled'] += 1
+
+        future = self.executor.submit(run)
+        future.add_done_callback(release_cancelled)
+        return future
+
+    def stats(self):
+        with self.lock:
+            return dict(
+                self.counters,
+                pending=self.pending,
+                concurrency=self.concurrency,
+                queue_depth=self.queue_depth,
+                avg_duration=round(self.avg_duration, 3),
+            )
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Circuit Breakers
+Per-upstream breakers shared by every request in a worker process, so a
+dead endpoint costs milliseconds instead of a full timeout per request
+
+- one breaker per name: upstream host for http_pool.fetch_json
+  ("terabox.hnn.workers.dev", each Terabox mirror), "ytdlp-client:<name>"
+  for yt-dlp player clients ("ytdlp-client:<name>@<account hash>" per
+  cookie account)
+- closed: calls go through; BREAKER_FAILURES consecutive failures open it
+- open: calls are refused at once (CircuitOpen) for the cooldown
+- half-open: after the cooldown up to BREAKER_HALF_OPEN trial calls are let
+  through; a success closes the breaker, a failure reopens it with the
+  cooldown doubled (BREAKER_COOLDOWN up to BREAKER_MAX_COOLDOWN)
+
+BREAKERS=0 turns every breaker into a pass-through.
+"""
+
+import os
+import time
+import threading
+import urllib.error
+
+import metrics
+
+BREAKERS_ENABLED = os.environ.get('BREAKERS', '1').lower() not in ('0', 'false', 'no')
+FAILURE_THRESHOLD = int(os.environ.get('BREAKER_FAILURES', '5'))
+COOLDOWN = float(os.environ.get('BREAKER_COOLDOWN', '30'))
+MAX_COOLDOWN = float(os.environ.get('BREAKER_MAX_COOLDOWN', '600'))
+HALF_OPEN_CALLS = int(os.environ.get('BREAKER_HALF_OPEN', '1'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpen(urllib.error.URLError):
+    """
+    Refused without calling the upstream. A URLError, so callers that
+    already handle network errors need no new except clause.
+    """
+    def __init__(self, name, retry_after):
+        super().__init__(f"circuit open for {name} (retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class Breaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, cooldown=COOLDOWN,
+                 max_cooldown=MAX_COOLDOWN, half_open_calls=HALF_OPEN_CALLS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.half_open_calls = half_open_calls
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        self.trials = 0
+        self.counters = {'calls': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            metrics.inc('circuit_breaker_transitions_total', breaker=self.name, state=state)
+
+    def retry_after(self):
+        with self.lock:
+            return max(0.0, self.opened_at + self.cooldown - time.time())
+
+    def allow(self):
+        """
+        True when a call may go ahead. Every allowed call must be followed by
+        record() - in half-open state it holds one of the trial slots.
+        """
+        with self.lock:
+            if self.state == OPEN and time.time() - self.opened_at >= self.cooldown:
+                self._set_state(HALF_OPEN)
+                self.trials = 0
+
+            if self.state == CLOSED or (self.state == HALF_OPEN and self.trials < self.half_open_calls):
+                if self.state == HALF_OPEN:
+                    self.trials += 1
+                self.counters['calls'] += 1
+                return True
+
+            self.counters['rejected'] += 1
+        metrics.inc('circuit_breaker_rejections_total', breaker=self.name)
+        return False
+
+    def record(self, ok):
+        """Outcome of a call that allow() let through"""
+        with self.lock:
+            if ok:
+                self.failures = 0
+                self.cooldown = self.base_cooldown
+                self._set_state(CLOSED)
+                return
+
+            self.counters['failures'] += 1
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # Trial failed: back off harder before the next one
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.opened_at = time.time()
+        self.trials = 0
+        self.counters['opened'] += 1
+        self._set_state(OPEN)
+
+    def stats(self):
+        with self.lock:
+            return dict(
+                self.counters,
+                state=self.state,
+                consecutive_failures=self.failures,
+                cooldown=self.cooldown,
+                retry_after=round(max(0.0, self.opened_at + self.cooldown - time.time()), 1) if self.state == OPEN else 0,
+            )
+
+
+_breakers = {}
+_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """The shared breaker for an upstream, or None when breakers are disabled"""
+    if not BREAKERS_ENABLED:
+        return None
+    with _lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = Breaker(name)
+        return breaker
+
+
+def check(name):
+    """Breaker for name after admitting a call; raises CircuitOpen when refused"""
+    breaker = get_breaker(name)
+    if breaker and not breaker.allow():
+        raise CircuitOpen(name, breaker.retry_after())
+    return breaker
+
+
+def stats():
+    """State and counters of every breaker in this process"""
+    with _lock:
+        breakers = dict(_breakers)
+    return {name: breaker.stats() for name, breaker in breakers.items()}
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Player Client Statistics
+Tracks per-client success rate and latency (EWMA) and reorders the yt-dlp
+player clients so the ones working this week are tried first
+
+State is kept in a small JSON file shared by every worker process on the host.
+"""
+
+import os
+import json
+import time
+import random
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Windows dev machines: no cross-process locking, stats still work per process
+    fcntl = None
+
+DEFAULT_STATE_FILE = os.environ.get('YTDLP_CLIENT_STATS', '/tmp/ytdlp_client_stats.json')
+
+# Prior for clients with no history: neutral success rate, slow-ish latency,
+# so untried clients keep their hardcoded priority order
+PRIOR_SUCCESS = 0.5
+PRIOR_LATENCY = 5.0
+
+
+class ClientStats:
+    """EWMA success/latency counters with epsilon-greedy reordering"""
+
+    def __init__(self, path=DEFAULT_STATE_FILE, alpha=0.2, explore=0.1):
+        self.path = path
+        self.alpha = alpha
+        self.explore = explore
+        self.stats = {}
+        self.mtime = None
+        self.lock = threading.Lock()
+
+    def _load(self):
+        """Reload the state file if another process changed it"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+
+        if mtime == self.mtime:
+            return
+
+        try:
+            with open(self.path, 'r') as f:
+                self.stats = json.load(f)
+            self.mtime = mtime
+        except (OSError, ValueError):
+            pass
+
+    def score(self, name):
+        """Expected successes per second of waiting - higher is better"""
+        entry = self.stats.get(name, {})
+        success = entry.get('success', PRIOR_SUCCESS)
+        latency = entry.get('latency', PRIOR_LATENCY)
+        return success / max(latency, 0.1)
+
+    def order(self, extractors):
+        """Return extractors sorted by score, occasionally exploring a random one first"""
+        with self.lock:
+            self._load()
+            ranked = sorted(
+                enumerate(extractors),
+                key=lambda item: (-self.score(item[1]['name']), item[0])
+            )
+            ranked = [extractor for _, extractor in ranked]
+
+        # Periodic exploration so a recovered client gets noticed again
+        if len(ranked) > 1 and random.random() < self.explore:
+            pick = ranked.pop(random.randrange(1, len(ranked)))
+            ranked.insert(0, pick)
+
+        return ranked
+
+    def record(self, name, success, latency):
+        """Fold one attempt into the shared state file"""
+        with self.lock:
+            try:
+                with open(self.path, 'a+') as f:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_EX)
+
+                    f.seek(0)
+                    try:
+                        self.stats = json.loads(f.read() or '{}')
+                    except ValueError:
+                        self.stats = {}
+
+                    self._update(name, success, latency)
+
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(self.stats, f)
+                    f.flush()
+
+                self.mtime = os.path.getmtime(self.path)
+            except OSError:
+                # Read-only filesystem etc: keep the stats in memory only
+                self._update(name, success, latency)
+
+    def _update(self, name, success, latency):
+        entry = self.stats.setdefault(name, {
+            'success': PRIOR_SUCCESS,
+            'latency': PRIOR_LATENCY,
+            'attempts': 0,
+        })
+        a = self.alpha
+        entry['success'] = (1 - a) * entry['success'] + a * (1.0 if success else 0.0)
+        entry['latency'] = (1 - a) * entry['latency'] + a * latency
+        entry['attempts'] = entry.get('attempts', 0) + 1
+        entry['updated'] = time.time()
+
+    def snapshot(self):
+        """Current stats, for debugging/metrics"""
+        with self.lock:
+            self._load()
+            return {name: dict(entry) for name, entry in self.stats.items()}
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Multi-account Cookie Pool
+Spreads extractions over several credential sets (cookie files) so one
+account's rate limit doesn't throttle the whole fleet
+
+- picks the healthy account that failed least recently, round-robin on ties
+- tracks per-account requests, failures and last error code
+- quarantines an account after consecutive failures, with exponential backoff
+
+Accounts come from TERABOX_COOKIE_POOL / YOUTUBE_COOKIE_POOL (comma-separated
+files, directories or globs); without it the single cookie file passed by the
+caller forms a one-account pool. Health is tracked per process.
+"""
+
+import os
+import glob
+import time
+import threading
+
+FAILURE_THRESHOLD = int(os.environ.get('COOKIE_POOL_FAILURES', '3'))
+QUARANTINE_BASE = float(os.environ.get('COOKIE_POOL_QUARANTINE', '60'))
+QUARANTINE_MAX = float(os.environ.get('COOKIE_POOL_QUARANTINE_MAX', '1800'))
+
+POOL_ENV = {
+    'terabox': 'TERABOX_COOKIE_POOL',
+    'youtube': 'YOUTUBE_COOKIE_POOL',
+}
+
+
+class Account:
+    def __init__(self, path):
+        self.path = path
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_used = 0.0
+        self.last_failure = 0.0
+        self.last_error = None
+        self.quarantined_until = 0.0
+        self.quarantines = 0
+
+    def snapshot(self, now):
+        return {
+            'requests': self.requests,
+            'failures': self.failures,
+            'error_rate': round(self.failures / self.requests, 4) if self.requests else 0.0,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error,
+            'quarantined_for': max(0, round(self.quarantined_until - now, 1)),
+        }
+
+
+class CookiePool:
+    """Round-robin / least-recently-failed account selection with quarantine"""
+
+    def __init__(self, paths):
+        self.accounts = [Account(path) for path in paths]
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Cookie file path to use for the next request"""
+        now = time.time()
+        with self.lock:
+            healthy = [a for a in self.accounts if a.quarantined_until <= now]
+            if healthy:
+                # Least recently failed first, then least recently used (round-robin)
+                account = min(healthy, key=lambda a: (a.last_failure, a.last_used))
+            else:
+                # Everyone is quarantined: use the one that comes back soonest
+                account = min(self.accounts, key=lambda a: a.quarantined_until)
+
+            account.requests += 1
+            account.last_used = now
+            return account.path
+
+    def report(self, path, success, error=None):
+        """Record the outcome of a request made with `path`"""
+        now = time.time()
+        with self.lock:
+            account = next((a for a in self.accounts if a.path == path), None)
+            if account is None:
+                return
+
+            if success:
+                account.consecutive_failures = 0
+                account.quarantines = 0
+                return
+
+            account.failures += 1
+            account.consecutive_failures += 1
+            account.last_failure = now
+            account.last_error = error
+
+            if account.consecutive_failures >= FAILURE_THRESHOLD and len(self.accounts) > 1:
+                backoff = min(QUARANTINE_MAX, QUARANTINE_BASE * (2 ** account.quarantines))
+                account.quarantined_until = now + backoff
+                account.quarantines += 1
+                account.consecutive_failures = 0
+
+    def stats(self):
+        now = time.time()
+        with self.lock:
+            return {a.path: a.snapshot(now) for a in self.accounts}
+
+
+def _expand(spec):
+    """Comma-separated files, directories (*.txt inside) or globs -> sorted file list"""
+    paths = []
+    for item in (s.strip() for s in spec.split(',')):
+        if not item:
+            continue
+        if os.path.isdir(item):
+            paths.extend(glob.glob(os.path.join(item, '*.txt')))
+        elif any(c in item for c in '*?['):
+            paths.extend(glob.glob(item))
+        else:
+            paths.append(item)
+    return sorted(set(paths))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(kind, default_file=None):
+    """Shared pool for a platform, or None when there is no cookie file at all"""
+    spec = os.environ.get(POOL_ENV.get(kind, ''), '')
+    key = (kind, spec or default_file)
+
+    with _pools_lock:
+        if key not in _pools:
+            paths = _expand(spec) if spec else ([default_file] if default_file else [])
+            _pools[key] = CookiePool(paths) if paths else None
+        return _pools[key]
+
+
+def stats():
+    """Per-account health of every pool in this process"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {
+        f"{kind}:{source}": pool.stats()
+        for (kind, source), pool in pools.items() if pool
+    }
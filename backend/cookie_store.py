@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Shared Cookie Store
+Parses each Netscape cookie file once and caches the result keyed by
+path + mtime + size, reloading automatically when the file changes
+
+Hands out ready-to-use forms: a CookieJar (for requests/urllib), a
+name -> value dict and a Cookie header string.
+"""
+
+import os
+import time
+import threading
+
+# Don't stat() the file more often than this per path (seconds)
+RECHECK_INTERVAL = float(os.environ.get('COOKIE_RECHECK_SECONDS', '1'))
+
+_cache = {}  # path -> _Entry
+_lock = threading.Lock()
+
+
+class _Entry:
+    def __init__(self, signature, jar, values):
+        self.signature = signature
+        self.jar = jar
+        self.values = values
+        self.headers = {}
+        self.checked = time.time()
+
+
+def _parse(path):
+    """Parse a Netscape cookie file into (CookieJar, {name: value})"""
+    import http.cookiejar
+
+    jar = http.cookiejar.CookieJar()
+    values = {}
+
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+
+            # curl writes HttpOnly cookies as comments with this prefix
+            if line.startswith('#HttpOnly_'):
+                line = line[len('#HttpOnly_'):]
+            elif not line or line.startswith('#'):
+                continue
+
+            parts = line.split('\t')
+            if len(parts) < 7:
+                continue
+
+            domain, domain_flag, path_, secure, expires, name, value = parts[:7]
+            values[name] = value
+            jar.set_cookie(http.cookiejar.Cookie(
+                version=0, name=name, value=value,
+                port=None, port_specified=False,
+                domain=domain, domain_specified=domain_flag.upper() == 'TRUE',
+                domain_initial_dot=domain.startswith('.'),
+                path=path_, path_specified=True,
+                secure=secure.upper() == 'TRUE',
+                # Like MozillaCookieJar.load(ignore_expires=True)
+                expires=None,
+                discard=False, comment=None, comment_url=None, rest={}
+            ))
+
+    return jar, values
+
+
+def _get(path):
+    """Cached entry for path, reparsed when mtime/size change"""
+    now = time.time()
+
+    with _lock:
+        entry = _cache.get(path)
+        if entry and now - entry.checked < RECHECK_INTERVAL:
+            return entry
+
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        entry = _cache.get(path)
+        if entry and entry.signature == signature:
+            entry.checked = now
+            return entry
+
+    jar, values = _parse(path)
+    entry = _Entry(signature, jar, values)
+
+    with _lock:
+        _cache[path] = entry
+    return entry
+
+
+def load_jar(path):
+    """CookieJar for path (shared - treat as read-only), or None if unreadable"""
+    try:
+        return _get(path).jar
+    except (OSError, ValueError):
+        return None
+
+
+def cookie_values(path):
+    """{name: value} for path, or None if unreadable"""
+    try:
+        return _get(path).values
+    except (OSError, ValueError):
+        return None
+
+
+def cookie_header(path, names=None):
+    """'a=1; b=2' Cookie header for path (optionally only `names`), or None if unreadable"""
+    try:
+        entry = _get(path)
+    except (OSError, ValueError):
+        return None
+
+    key = tuple(names) if names else None
+    header = entry.headers.get(key)
+    if header is None:
+        items = entry.values.items() if key is None else \
+            [(name, entry.values[name]) for name in key if name in entry.values]
+        header = '; '.join(f"{name}={value}" for name, value in items)
+        entry.headers[key] = header
+    return header
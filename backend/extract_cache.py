@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Extraction Result Cache
+TTL + LRU cache for extraction results keyed by canonical video/share ID
+
+- youtu.be / shorts / watch / embed URLs map to the same YouTube key
+- terabox /s/<id> maps to the same key across 1024terabox/teraboxapp/... domains
+- other URLs are normalized with tracking parameters stripped
+- entries expire with the signed media URLs they contain (googlevideo
+  `expire=`, Terabox dlink `time=` + `expires=`), capped by a default TTL
+- memory tier is bounded by an approximate byte budget; an optional SQLite
+  tier (EXTRACT_CACHE_DB) is shared between worker processes
+- entries are stored serialized, so every hit returns a fresh copy that
+  callers may modify
+- extractors that take a cookie file get it in the key, so one account's
+  results are never served to another
+- permanent failures (results with "permanent": true - private/removed
+  videos, missing Terabox shares) are cached for EXTRACT_NEGATIVE_TTL
+  seconds, so retries of a dead URL return at once
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs, parse_qsl, urlencode
+from singleflight import flights
+import metrics
+
+CACHE_ENABLED = os.environ.get('EXTRACT_CACHE', '1').lower() not in ('0', 'false', 'no')
+DEFAULT_TTL = float(os.environ.get('EXTRACT_CACHE_TTL', '1800'))
+MAX_BYTES = int(os.environ.get('EXTRACT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+SQLITE_PATH = os.environ.get('EXTRACT_CACHE_DB')
+NEGATIVE_TTL = float(os.environ.get('EXTRACT_NEGATIVE_TTL', '120'))
+
+# Signed URLs are refreshed this long before they actually expire
+EXPIRY_MARGIN = 300
+
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'igshid', 'igsh', 'si', 'feature', 'ref', 'ref_src',
+    'is_from_webapp', 'sender_device', 'mibextid',
+}
+
+YOUTUBE_HOSTS = ('youtube.com', 'youtu.be', 'youtube-nocookie.com')
+YOUTUBE_ID = re.compile(r'^[A-Za-z0-9_-]{11}$')
+def _host_in(host, domains):
+    """host is one of domains or a subdomain of one (not just a suffix match)"""
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+TERABOX_HOST = re.compile(r'(^|\.)(1024)?tera(box)?(app|share|link|fileshare)?\.(com|app|fun)$|(^|\.)(4fun|mirrobox|nephobox|freeterabox|momerybox|tibibox)\.com$')
+
+
+def canonical_key(url):
+    """Map equivalent URLs to one cache key"""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url
+
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if host.startswith('m.'):
+        host = host[2:]
+    query = parse_qs(parts.query)
+
+    # YouTube: everything collapses to the video ID
+    if _host_in(host, YOUTUBE_HOSTS):
+        video_id = None
+        segments = [s for s in parts.path.split('/') if s]
+
+        if host == 'youtu.be' and segments:
+            video_id = segments[0]
+        elif 'v' in query:
+            video_id = query['v'][0]
+        elif len(segments) >= 2 and segments[0] in ('shorts', 'embed', 'live', 'v'):
+            video_id = segments[1]
+
+        if video_id and YOUTUBE_ID.match(video_id):
+            return f"youtube:{video_id}"
+
+    # Terabox: share ID is the same on every mirror domain
+    if TERABOX_HOST.search(host):
+        match = re.search(r'/s/([a-zA-Z0-9_-]+)', parts.path)
+        if match:
+            return f"terabox:{match.group(1)}"
+        if 'surl' in query:
+            # surl=<id> is the share ID without its leading '1'
+            return f"terabox:1{query['surl'][0]}"
+
+    # Everything else: normalized URL without tracking params or fragment
+    params = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in TRACKING_PARAMS and not k.startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    return f"url:{host}{path}" + (f"?{urlencode(params)}" if params else '')
+
+
+def _url_expiry(url):
+    """Absolute expiry timestamp encoded in a signed media URL, or None"""
+    if not url or '?' not in url:
+        return None
+
+    query = parse_qs(urlsplit(url).query)
+
+    # googlevideo: expire=<unix ts>
+    if 'expire' in query:
+        try:
+            return float(query['expire'][0])
+        except ValueError:
+            pass
+
+    # Terabox dlink: time=<unix ts>&expires=8h
+    if 'time' in query and 'expires' in query:
+        match = re.match(r'^(\d+)([smhd]?)$', query['expires'][0])
+        if match:
+            unit = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+            try:
+                return float(query['time'][0]) + int(match.group(1)) * unit
+            except ValueError:
+                pass
+
+    return None
+
+
+def result_ttl(result, default_ttl=DEFAULT_TTL):
+    """TTL for a result: the default, shortened to the earliest signed URL expiry"""
+    urls = [result.get('download_link')]
+    for key in ('qualities', 'audioFormats', 'files'):
+        for item in result.get(key) or []:
+            if isinstance(item, dict):
+                urls.append(item.get('url') or item.get('download_link'))
+
+    now = time.time()
+    ttl = default_ttl
+    for url in urls:
+        expiry = _url_expiry(url)
+        if expiry:
+            ttl = min(ttl, expiry - now - EXPIRY_MARGIN)
+
+    return ttl
+
+
+def is_cacheable(result):
+    """Only successful extractions are cached"""
+    if not isinstance(result, dict) or result.get('error'):
+        return False
+    if result.get('success') is False:
+        return False
+    return True
+
+
+def is_permanent_failure(result):
+    """Failures the extractor marked as permanent (retrying won't help)"""
+    return isinstance(result, dict) and result.get('permanent') is True
+
+
+class ResultCache:
+    """In-memory TTL/LRU cache bounded by bytes, with an optional SQLite tier"""
+
+    def __init__(self, max_bytes=MAX_BYTES, default_ttl=DEFAULT_TTL, sqlite_path=SQLITE_PATH):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sqlite_path = sqlite_path
+        self.entries = OrderedDict()  # key -> (expires, size, JSON payload)
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.counters = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expired': 0,
+        }
+        self._db = None
+
+    # -- SQLite tier -------------------------------------------------------
+
+    def _connect(self):
+        if not self.sqlite_path:
+            return None
+        if self._db is None:
+            import sqlite3
+            db = sqlite3.connect(self.sqlite_path, timeout=2, check_same_thread=False)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS results '
+                '(key TEXT PRIMARY KEY, expires REAL, value TEXT)'
+            )
+            self._db = db
+        return self._db
+
+    def _disk_get(self, key):
+        if not self.sqlite_path:
+            return None
+        import sqlite3
+        try:
+            db = self._connect()
+            if not db:
+                return None
+            row = db.execute(
+                'SELECT expires, value FROM results WHERE key = ? AND expires > ?',
+                (key, time.time())
+            ).fetchone()
+            return row
+        except sqlite3.Error:
+            return None
+
+    def _disk_set(self, key, expires, payload):
+        if not self.sqlite_path:
+            return
+        import sqlite3
+        try:
+            db = self._connect()
+            if not db:
+                return
+            with db:
+                db.execute(
+                    'INSERT OR REPLACE INTO results (key, expires, value) VALUES (?, ?, ?)',
+                    (key, expires, payload)
+                )
+                db.execute('DELETE FROM results WHERE expires <= ?', (time.time(),))
+        except sqlite3.Error:
+            pass
+
+    # -- Memory tier -------------------------------------------------------
+
+    def _store(self, key, expires, payload):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+
+        old = self.entries.pop(key, None)
+        if old:
+            self.bytes -= old[1]
+
+        self.entries[key] = (expires, size, payload)
+        self.bytes += size
+
+        while self.bytes > self.max_bytes and self.entries:
+            _, (_, evicted_size, _) = self.entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.counters['evictions'] += 1
+
+    def get(self, key):
+        """Cached value or None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry:
+                expires, size, payload = entry
+                if expires > time.time():
+                    self.entries.move_to_end(key)
+                    self.counters['hits'] += 1
+                    # Decoded per hit: callers get their own copy
+                    return json.loads(payload)
+
+                del self.entries[key]
+                self.bytes -= size
+                self.counters['expired'] += 1
+
+            row = self._disk_get(key)
+            if row:
+                expires, payload = row
+                self._store(key, expires, payload)
+                self.counters['disk_hits'] += 1
+                return json.loads(payload)
+
+            self.counters['misses'] += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        """Cache a value; ttl defaults to the signed-URL-aware result_ttl"""
+        if ttl is None:
+            ttl = result_ttl(value, self.default_ttl)
+        if ttl <= 0:
+            return
+
+        payload = json.dumps(value)
+        expires = time.time() + ttl
+
+        with self.lock:
+            self._store(key, expires, payload)
+            self._disk_set(key, expires, payload)
+            self.counters['stores'] += 1
+
+    def stats(self):
+        """Hit/miss counters and current size, for tuning"""
+        with self.lock:
+            lookups = self.counters['hits'] + self.counters['disk_hits'] + self.counters['misses']
+            return dict(
+                self.counters,
+                entries=len(self.entries),
+                bytes=self.bytes,
+                max_bytes=self.max_bytes,
+                hit_rate=round((lookups - self.counters['misses']) / lookups, 4) if lookups else 0.0,
+            )
+
+
+result_cache = ResultCache()
+
+
+def account_key(cookie_file):
+    """Short stable tag for the cookie file an extraction ran with"""
+    return hashlib.sha1(os.path.abspath(cookie_file).encode('utf-8')).hexdigest()[:12]
+
+
+def cached_extraction(namespace, account=None):
+    """
+    Decorator for extract functions taking the URL as first argument.
+    Results are cached per namespace (each extractor has its own response shape),
+    and concurrent misses for the same key are coalesced into one extraction.
+
+    account: name of the function's cookie file argument; results fetched
+    with different cookie files are cached separately.
+    """
+    def decorator(func):
+        signature = inspect.signature(func) if account else None
+
+        @functools.wraps(func)
+        def wrapper(url, *args, **kwargs):
+            key = f"{namespace}:{canonical_key(url)}"
+            if signature:
+                cookie_file = signature.bind_partial(url, *args, **kwargs).arguments.get(account)
+                if cookie_file:
+                    key += f"@{account_key(cookie_file)}"
+            started = time.perf_counter()
+
+            if CACHE_ENABLED:
+                cached = result_cache.get(key)
+                if cached is not None:
+                    elapsed = time.perf_counter() - started
+                    hit = 'negative_hit' if is_permanent_failure(cached) else 'hit'
+                    metrics.inc('extract_cache_total', backend=namespace, result=hit)
+                    metrics.observe('extract_duration_seconds', elapsed, backend=namespace, outcome='cached')
+                    if metrics.TIMINGS_IN_RESULT and isinstance(cached, dict):
+                        # Stored timings describe the original extraction, not this request
+                        cached = dict(cached, timings={'cache': round(elapsed * 1000, 1)})
+                    return cached
+                metrics.inc('extract_cache_total', backend=namespace, result='miss')
+
+            def run():
+                result = func(url, *args, **kwargs)
+                if CACHE_ENABLED and is_cacheable(result):
+                    result_cache.set(key, result)
+                elif CACHE_ENABLED and NEGATIVE_TTL > 0 and is_permanent_failure(result):
+                    # Short TTL: a private video can be made public again
+                    result_cache.set(key, result, ttl=NEGATIVE_TTL)
+                return result
+
+            outcome = 'exception'
+            try:
+                result = flights.do(key, run)
+                outcome = 'ok' if is_cacheable(result) else 'error'
+                return result
+            finally:
+                metrics.observe('extract_duration_seconds', time.perf_counter() - started,
+                                backend=namespace, outcome=outcome)
+
+        return wrapper
+    return decorator
+
+
+def stats():
+    """Stats of the shared process-wide cache and request coalescing"""
+    return dict(result_cache.stats(), singleflight=flights.stats())
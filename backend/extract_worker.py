@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Persistent Extraction Worker
+Imports the extractors once and serves newline-delimited JSON requests
+over stdin/stdout (default) or a Unix socket (--socket PATH)
+
+Request:  {"id": 1, "backend": "ytdlp", "args": ["<url>", "<cookie_file>"]}
+          (backend names/aliases as in extractor.BACKENDS / extractor.ALIASES)
+Response: {"id": 1, "result": {...}}
+"""
+
+import sys
+import json
+
+import extractor
+
+
+def get_handler(backend):
+    """Import (once) and return the extraction function for a backend"""
+    try:
+        # Backends are imported on first use and stay loaded for the
+        # lifetime of the worker
+        return extractor.get_backend(backend)
+    except SystemExit:
+        # Some scripts exit at import time when their dependency is missing
+        raise ImportError(f"Backend '{backend}' is not available in this environment")
+
+
+def handle_request(request, default_backend=None):
+    """Run one decoded request and return the response dict"""
+    request_id = request.get('id')
+
+    if request.get('op') == 'ping':
+        return {"id": request_id, "result": "pong"}
+
+    if request.get('op') == 'stats':
+        import extract_cache
+        import http_pool
+        import cookie_pool
+        import link_probe
+        import metrics
+        import circuit_breaker
+        from ydl_pool import ydl_pool
+        return {"id": request_id, "result": {
+            "cache": extract_cache.stats(),
+            "http": http_pool.stats(),
+            "cookies": cookie_pool.stats(),
+            "probe": link_probe.stats(),
+            "ydl": ydl_pool.stats(),
+            "metrics": metrics.snapshot(),
+            "breakers": circuit_breaker.stats(),
+        }}
+
+    try:
+        backend = request.get('backend') or default_backend
+        handler = get_handler(backend)
+        args = request.get('args') or []
+        kwargs = request.get('kwargs') or {}
+
+        # Keep stray prints from the extractors off the protocol stream
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        try:
+            result = handler(*args, **kwargs)
+        finally:
+            sys.stdout = stdout
+
+        return {"id": request_id, "result": result}
+
+    except Exception as e:
+        return {
+            "id": request_id,
+            "error": f"Worker error: {str(e)}"
+        }
+
+
+def handle_line(line, default_backend=None):
+    """Decode one request line and return the encoded response line"""
+    try:
+        request = json.loads(line)
+    except json.JSONDecodeError as e:
+        response = {"id": None, "error": f"Invalid JSON request: {str(e)}"}
+    else:
+        response = handle_request(request, default_backend)
+
+    return json.dumps(response) + "\n"
+
+
+def serve_stdio(default_backend=None):
+    """Serve requests from stdin until EOF, one response line per request"""
+    stdout = sys.stdout
+
+    # Announce readiness so the pool knows imports are done
+    stdout.write(json.dumps({"id": None, "ready": True}) + "\n")
+    stdout.flush()
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        stdout.write(handle_line(line, default_backend))
+        stdout.flush()
+
+
+def serve_socket(path, default_backend=None):
+    """Serve requests on a Unix socket, one thread per connection"""
+    import os
+    import socketserver
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode('utf-8').strip()
+                if not line:
+                    continue
+
+                self.wfile.write(handle_line(line, default_backend).encode('utf-8'))
+                self.wfile.flush()
+
+    if os.path.exists(path):
+        os.unlink(path)
+
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        server.daemon_threads = True
+        server.serve_forever()
+
+
+def main(argv, default_backend=None):
+    """Entry point shared by this script and the extractor scripts' --worker flag"""
+    preload = []
+    socket_path = None
+
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        if arg == '--socket' and i + 1 < len(argv):
+            socket_path = argv[i + 1]
+            i += 2
+            continue
+        if arg == '--preload' and i + 1 < len(argv):
+            preload = [b for b in argv[i + 1].split(',') if b]
+            i += 2
+            continue
+        i += 1
+
+    if default_backend:
+        preload.append(default_backend)
+
+    # Pay the import cost up front, before the first request arrives
+    for backend in preload:
+        try:
+            get_handler(backend)
+        except Exception as e:
+            print(f"Preload of {backend} failed: {str(e)}", file=sys.stderr)
+
+    if socket_path:
+        serve_socket(socket_path, default_backend)
+    else:
+        serve_stdio(default_backend)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
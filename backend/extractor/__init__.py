@@ -0,0 +1,66 @@
+"""
+Unified Extraction Library
+Single entry point shared by app.py, the worker and the CLI scripts:
+
+    from extractor import extract
+    result = extract(url)                       # backend picked from the URL
+    result = extract(url, backend='terabox-cookies', cookie_file='cookies.txt')
+
+Each backend lives in its own module under extractor.backends and is only
+imported when first used, so a Terabox-only worker never imports yt_dlp.
+"""
+
+import importlib
+
+# Backend name -> module under extractor.backends
+BACKENDS = {
+    'ytdlp': 'ytdlp',
+    'generic': 'generic',
+    'terabox-api': 'terabox_api',
+    'terabox-cookies': 'terabox_cookies',
+    'terabox-package': 'terabox_package',
+}
+
+# Older names used by the Node worker pool and extract_worker requests
+ALIASES = {
+    'yt-dlp': 'ytdlp',
+    'terabox': 'terabox-api',
+    'terabox-working': 'terabox-package',
+}
+
+_modules = {}
+
+
+def resolve(name):
+    """Canonical backend name for a name or alias"""
+    name = ALIASES.get(name, name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name}")
+    return name
+
+
+def get_backend(name):
+    """Import (once) and return the backend's extract function"""
+    name = resolve(name)
+    if name not in _modules:
+        _modules[name] = importlib.import_module(f"{__name__}.backends.{BACKENDS[name]}")
+    return _modules[name].extract
+
+
+def detect_backend(url, cookie_file=None):
+    """Default backend for a URL"""
+    from extract_cache import canonical_key
+
+    key = canonical_key(url)
+    if key.startswith('terabox:'):
+        return 'terabox-cookies' if cookie_file else 'terabox-api'
+    if key.startswith('youtube:'):
+        return 'ytdlp'
+    return 'generic'
+
+
+def extract(url, backend=None, **opts):
+    """Extract url with the given (or detected) backend"""
+    if backend is None:
+        backend = detect_backend(url, opts.get('cookie_file'))
+    return get_backend(backend)(url, **opts)
@@ -0,0 +1,4 @@
+"""
+Extraction backends - one module per backend, each exposing
+extract(url, **opts). Imported lazily by extractor.get_backend.
+"""
@@ -0,0 +1,89 @@
+"""Any yt-dlp supported site, in the app.py API response shape"""
+
+import time
+
+# Imported with the backend so a worker's --preload pays for it
+import yt_dlp  # noqa: F401
+import link_probe
+import metrics
+from ydl_pool import ydl_pool
+from extract_cache import cached_extraction
+from format_select import top_formats_by_quality, slim_opts
+from extractor.formatting import format_size, format_duration
+
+
+@cached_extraction('generic')
+def extract(url, progress=None, **opts):
+    """Run yt-dlp and build the API response (raises on extraction errors)"""
+    timings = metrics.Timings('generic')
+    
+    # yt-dlp options for MAXIMUM extraction
+    ydl_opts = slim_opts({
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': False,
+        'format': 'best',
+        'nocheckcertificate': True,
+    })
+    
+    with ydl_pool.checkout(ydl_opts) as ydl:
+        with timings.stage('extract_info'):
+            info = ydl.extract_info(url, download=False)
+        
+        if progress:
+            progress(
+                'metadata',
+                source='yt-dlp',
+                title=info.get('title', 'Video'),
+                thumbnail=info.get('thumbnail', ''),
+                duration=format_duration(info.get('duration', 0))
+            )
+        
+        # One pass over the formats: dedupe by quality label, top-K by heap
+        format_started = time.perf_counter()
+        video_fmts, audio_fmts = top_formats_by_quality(info.get('formats') or [], video_limit=10, audio_limit=5)
+        
+        video_formats = [{
+            'quality': f.quality,
+            'format': f.ext or 'mp4',
+            'size': format_size(f.filesize),
+            'url': f.url,
+            'width': f.width,
+            'height': f.height,
+            'fps': f.fps
+        } for f in video_fmts]
+        
+        audio_formats = [{
+            'quality': f.quality,
+            'format': f.ext or 'mp3',
+            'size': format_size(f.filesize),
+            'url': f.url
+        } for f in audio_fmts]
+        
+        timings.add('formats', time.perf_counter() - format_started)
+        
+        if progress:
+            progress('formats', qualities=len(video_formats), audioFormats=len(audio_formats))
+        
+        # Get thumbnail
+        thumbnail = info.get('thumbnail', '')
+        if not thumbnail and info.get('thumbnails'):
+            thumbnail = info['thumbnails'][-1].get('url', '')
+        
+        result = {
+            'title': info.get('title', 'Video'),
+            'thumbnail': thumbnail,
+            'duration': format_duration(info.get('duration', 0)),
+            'qualities': video_formats,
+            'audioFormats': audio_formats,
+            'platform': info.get('extractor_key', 'unknown').lower(),
+            'uploader': info.get('uploader', ''),
+            'views': info.get('view_count', 0)
+        }
+        
+        # Optional: check the top format URLs are alive and fill in real sizes
+        if link_probe.PROBE_ENABLED:
+            with timings.stage('probe'):
+                link_probe.probe_formats(result, format_size, progress=progress)
+        
+        return timings.finish(result)
@@ -0,0 +1,8 @@
+"""Terabox via the public Cloudflare Worker API (terabox_extract.py)"""
+
+from terabox_extract import extract_terabox
+
+
+def extract(url, cookie_file=None, **opts):
+    # This API needs no cookies
+    return extract_terabox(url)
@@ -0,0 +1,7 @@
+"""Terabox via the authenticated share API (terabox_extract_with_cookies.py)"""
+
+from terabox_extract_with_cookies import extract_terabox_with_cookies
+
+
+def extract(url, cookie_file=None, **opts):
+    return extract_terabox_with_cookies(url, cookie_file)
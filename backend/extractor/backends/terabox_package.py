@@ -0,0 +1,7 @@
+"""Terabox via the terabox-downloader package (terabox_working.py)"""
+
+from terabox_working import extract_terabox
+
+
+def extract(url, cookie_file=None, **opts):
+    return extract_terabox(url, cookie_file)
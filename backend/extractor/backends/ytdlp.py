@@ -0,0 +1,10 @@
+"""YouTube via yt-dlp with the player client fallback chain (ytdlp_extract.py)"""
+
+# ytdlp_extract imports yt_dlp lazily; import it with the backend so a
+# worker's --preload pays for it before the first request
+import yt_dlp  # noqa: F401
+from ytdlp_extract import extract_video
+
+
+def extract(url, cookie_file=None, **opts):
+    return extract_video(url, cookie_file, **opts)
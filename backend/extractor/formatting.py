@@ -0,0 +1,47 @@
+"""
+Shared formatting helpers (sizes, durations) used by every backend
+"""
+
+
+def format_size(bytes_size):
+    """Whole KB/MB, 'Unknown' when missing (app.py API responses)"""
+    if not bytes_size or bytes_size == 0:
+        return 'Unknown'
+    mb = bytes_size / (1024 * 1024)
+    if mb < 1:
+        return f"{bytes_size / 1024:.0f} KB"
+    return f"{mb:.0f} MB"
+
+
+def format_size_mb(bytes_size):
+    """Two-decimal MB, 'Unknown' when missing (ytdlp_extract responses)"""
+    if not bytes_size:
+        return 'Unknown'
+    return f"{bytes_size / (1024 * 1024):.2f} MB"
+
+
+def format_bytes(bytes_size):
+    """Format bytes to human readable size (B through TB)"""
+    try:
+        bytes_size = int(bytes_size)
+        if bytes_size == 0:
+            return "0 B"
+        
+        units = ['B', 'KB', 'MB', 'GB', 'TB']
+        i = 0
+        while bytes_size >= 1024 and i < len(units) - 1:
+            bytes_size /= 1024.0
+            i += 1
+        
+        return f"{bytes_size:.2f} {units[i]}"
+    except:
+        return "Unknown"
+
+
+def format_duration(seconds):
+    """m:ss"""
+    if not seconds:
+        return '0:00'
+    mins = int(seconds // 60)
+    secs = int(seconds % 60)
+    return f"{mins}:{secs:02d}"
@@ -2,7 +2,7 @@
 const { extractWithCobalt } = require('./cobalt-extractor');
 const { extractInstagramCustom } = require('./instagram-custom-extractor');
 const { extractTikTokCustom } = require('./tiktok-custom-extractor');
-const { spawn } = require('child_process');
+const { pythonWorkerPool } = require('../utils/python-worker-pool');
 const path = require('path');
 
 // Extractor configuration with priorities
@@ -92,67 +92,32 @@ async function smartExtract(url, platform) {
   throw new Error('All extraction methods failed. The video may be private, deleted, or from an unsupported platform.');
 }
 
-// yt-dlp extractor (existing implementation)
+// yt-dlp extractor (existing implementation, served by warm Python workers)
 async function extractWithYtDlp(url, platform) {
   console.log('🐍 yt-dlp: Starting extraction...');
   
-  return new Promise((resolve, reject) => {
-    const pythonScript = platform === 'terabox' 
-      ? path.join(__dirname, '..', 'terabox_extract.py')
-      : path.join(__dirname, '..', 'ytdlp_extract.py');
-    
-    const cookiesFile = path.join(__dirname, '..', 'cookies.txt');
-    const args = [pythonScript, url];
-    
-    // Add cookies file if it exists
-    const fs = require('fs');
-    if (fs.existsSync(cookiesFile)) {
-      args.push(cookiesFile);
-      console.log('🍪 Using cookies file');
-    }
-    
-    const pythonProcess = spawn('python3', args);
-    
-    let output = '';
-    let errorOutput = '';
-    
-    pythonProcess.stdout.on('data', (data) => {
-      output += data.toString();
-    });
-    
-    pythonProcess.stderr.on('data', (data) => {
-      errorOutput += data.toString();
-    });
-    
-    pythonProcess.on('close', (code) => {
-      if (code !== 0) {
-        reject(new Error(errorOutput || 'yt-dlp extraction failed'));
-        return;
-      }
-      
-      try {
-        const result = JSON.parse(output);
-        
-        // Check if extraction failed
-        if (result.error || (result.qualities && result.qualities.length === 0)) {
-          reject(new Error(result.error || 'No formats available'));
-          return;
-        }
-        
-        console.log('✅ yt-dlp extraction successful');
-        console.log(`📊 Got ${result.qualities.length} video qualities, ${result.audioFormats.length} audio formats`);
-        resolve(result);
-      } catch (error) {
-        reject(new Error('Failed to parse yt-dlp output: ' + error.message));
-      }
-    });
-    
-    // Timeout after 30 seconds
-    setTimeout(() => {
-      pythonProcess.kill();
-      reject(new Error('yt-dlp timeout'));
-    }, 30000);
-  });
+  const backend = platform === 'terabox' ? 'terabox' : 'ytdlp';
+  const cookiesFile = path.join(__dirname, '..', 'cookies.txt');
+  const args = [url];
+  
+  // Add cookies file if it exists
+  const fs = require('fs');
+  if (fs.existsSync(cookiesFile)) {
+    args.push(cookiesFile);
+    console.log('🍪 Using cookies file');
+  }
+  
+  // Timeout after 30 seconds (the worker is replaced if it hangs)
+  const result = await pythonWorkerPool.run(backend, args, 30000);
+  
+  // Check if extraction failed
+  if (result.error || (result.qualities && result.qualities.length === 0)) {
+    throw new Error(result.error || 'No formats available');
+  }
+  
+  console.log('✅ yt-dlp extraction successful');
+  console.log(`📊 Got ${result.qualities.length} video qualities, ${result.audioFormats.length} audio formats`);
+  return result;
 }
 
 // Helper: Timeout promise
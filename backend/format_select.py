@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Single-pass Format Selection
+Projects yt-dlp format dicts into compact records (only the fields we output)
+in one pass and picks the top K with a heap instead of copying, filtering and
+fully sorting the whole list several times
+
+heapq.nlargest is equivalent to sorted(..., reverse=True)[:k] (ties keep
+their original order), so the selected formats are the same as before.
+"""
+
+import os
+import heapq
+
+# Options that stop yt-dlp from doing work we never output (subtitles,
+# comments, thumbnails on disk). YTDLP_SLIM=0 disables them.
+SLIM_MODE = os.environ.get('YTDLP_SLIM', '1').lower() not in ('0', 'false', 'no')
+
+SLIM_YDL_OPTS = {
+    'writesubtitles': False,
+    'writeautomaticsub': False,
+    'getcomments': False,
+    'writethumbnail': False,
+    'check_formats': False,
+}
+
+# Merged into extractor_args['youtube']
+SLIM_YOUTUBE_ARGS = {
+    'skip': ['translated_subs'],
+}
+
+
+class Fmt:
+    """Compact format record"""
+    __slots__ = ('quality', 'format_id', 'ext', 'url', 'height', 'width', 'fps',
+                 'filesize', 'vcodec', 'acodec', 'abr', 'tbr')
+
+    def __init__(self, f, quality):
+        self.quality = quality
+        self.format_id = f.get('format_id')
+        self.ext = f.get('ext')
+        self.url = f.get('url', '')
+        self.height = f.get('height')
+        self.width = f.get('width')
+        self.fps = f.get('fps')
+        self.filesize = f.get('filesize') or f.get('filesize_approx') or 0
+        self.vcodec = f.get('vcodec', 'none')
+        self.acodec = f.get('acodec', 'none')
+        self.abr = f.get('abr') or 0
+        self.tbr = f.get('tbr') or 0
+
+
+def slim_opts(ydl_opts):
+    """ydl_opts with the slim options applied (no-op when YTDLP_SLIM=0)"""
+    if not SLIM_MODE:
+        return ydl_opts
+    return dict(SLIM_YDL_OPTS, **ydl_opts)
+
+
+def youtube_args(**args):
+    """extractor_args['youtube'] with the slim skips added"""
+    if SLIM_MODE:
+        args = dict(SLIM_YOUTUBE_ARGS, **args)
+    return {'youtube': args}
+
+
+def top_formats(formats, video_limit=5, audio_limit=3):
+    """
+    Best video formats by height and audio-only formats by bitrate
+    (ytdlp_extract semantics: every format with a URL, no dedupe)
+    """
+    video = []
+    audio = []
+
+    for f in formats:
+        if not f.get('url'):
+            continue
+
+        vcodec = f.get('vcodec', 'none')
+        if vcodec != 'none':
+            video.append(Fmt(f, f.get('format_note', '')))
+        elif f.get('acodec', 'none') != 'none':
+            audio.append(Fmt(f, f.get('format_note', '')))
+
+    return (
+        heapq.nlargest(video_limit, video, key=lambda x: x.height or 0),
+        heapq.nlargest(audio_limit, audio, key=lambda x: x.abr or x.tbr or 0),
+    )
+
+
+def top_formats_by_quality(formats, video_limit=10, audio_limit=5):
+    """
+    Muxed video formats by height and audio-only formats by bitrate, one per
+    quality label - the last format seen for a label wins (app.py semantics)
+    """
+    video = {}
+    audio = {}
+
+    for f in formats:
+        vcodec = f.get('vcodec')
+        acodec = f.get('acodec')
+
+        if vcodec != 'none' and acodec != 'none':
+            # Video with audio
+            quality = f.get('format_note', f.get('height', 'unknown'))
+            if isinstance(quality, int):
+                quality = f"{quality}p"
+            video[quality] = f
+        elif acodec != 'none' and vcodec == 'none':
+            # Audio only (no abr: 128; abr None used to raise, now also 128)
+            abr = f.get('abr', 128)
+            quality = f"{int(128 if abr is None else abr)}kbps"
+            audio[quality] = f
+
+    # Records are only built for the survivors of the dedupe
+    video = [Fmt(f, quality) for quality, f in video.items()]
+    audio = [Fmt(f, quality) for quality, f in audio.items()]
+
+    return (
+        heapq.nlargest(video_limit, video, key=lambda x: x.height or 0),
+        heapq.nlargest(audio_limit, audio, key=lambda x: int(x.quality[:-4])),
+    )
@@ -0,0 +1,18 @@
+# Gunicorn config for the Flask extraction API (app.py)
+# Usage: gunicorn -c gunicorn.conf.py app:app
+#
+# Each process runs extractions on its own bounded pool (EXTRACT_CONCURRENCY,
+# EXTRACT_QUEUE_DEPTH); request threads only wait on that pool, so they are
+# sized to admit a full queue and still answer 429s and health checks.
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+worker_class = 'gthread'
+threads = int(os.environ.get('EXTRACT_CONCURRENCY', '8')) + int(os.environ.get('EXTRACT_QUEUE_DEPTH', '32')) + 4
+timeout = int(float(os.environ.get('EXTRACT_TIMEOUT', '45'))) + 15
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers periodically to bound memory growth from yt-dlp
+max_requests = 1000
+max_requests_jitter = 100
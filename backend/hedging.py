@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Hedged Requests
+Start alternative attempts in priority order, a new one every `stagger`
+seconds (or as soon as a running one fails), and return the first result
+that passes `accept`
+
+Losing attempts run on daemon threads and are abandoned - blocking calls
+(yt-dlp, HTTP with long timeouts) can't be interrupted; attempts that
+haven't started yet are skipped.
+"""
+
+import queue
+import threading
+
+
+def first_success(attempts, stagger, accept=bool):
+    """
+    attempts: list of zero-argument callables, highest priority first
+    Returns (index, result) of the first accepted result, or (None, None).
+    An attempt that raises counts as a failure.
+    """
+    results = queue.Queue()
+
+    def run(index, attempt):
+        try:
+            results.put((index, attempt()))
+        except Exception:
+            results.put((index, None))
+
+    pending = list(enumerate(attempts))
+    running = 0
+
+    while pending or running:
+        if pending:
+            threading.Thread(target=run, args=pending.pop(0), daemon=True).start()
+            running += 1
+
+        # Wait for a finisher; start the next attempt once the stagger elapses
+        try:
+            index, result = results.get(timeout=stagger if pending else None)
+        except queue.Empty:
+            continue
+
+        running -= 1
+        if accept(result):
+            return index, result
+
+        # Drain other finishers without blocking
+        while running:
+            try:
+                index, result = results.get_nowait()
+            except queue.Empty:
+                break
+            running -= 1
+            if accept(result):
+                return index, result
+
+    return None, None
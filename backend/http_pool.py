@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Connection Pool
+Module-level keep-alive sessions shared by the Terabox extractors, so a
+long-running worker reuses TCP+TLS connections to the same hosts instead
+of handshaking on every extraction
+
+- requests.Session with per-host pool sizing (HTTP_POOL_HOSTS, HTTP_POOL_MAXSIZE)
+- optional HTTP/2 through httpx when HTTP2=1 and httpx[http2] is installed
+- plain urllib fallback when neither library is available
+- per-host request / new-connection counters via stats()
+- fetch_json goes through a per-host circuit breaker (circuit_breaker.py),
+  so a host that keeps failing is skipped without waiting for its timeout
+
+requests/httpx/ssl are imported when the first session is created, so
+importing this module (and the scripts that use it) stays cheap on paths
+that never make a request.
+
+Sessions never store response cookies: callers pass their own cookie jar per
+request, so accounts can't leak into each other through the shared session.
+"""
+
+import os
+import json
+import threading
+import contextlib
+import urllib.error
+import urllib.parse
+
+import circuit_breaker
+
+POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS', '10'))
+POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '20'))
+USE_HTTP2 = os.environ.get('HTTP2', '').lower() in ('1', 'true', 'yes')
+
+_sessions = {}
+_lock = threading.Lock()
+_request_counts = {}
+
+
+def _no_store_policy():
+    """Cookie policy that never keeps Set-Cookie responses in a shared session"""
+    import http.cookiejar
+
+    class _NoStoreCookies(http.cookiejar.DefaultCookiePolicy):
+        def set_ok(self, cookie, request):
+            return False
+
+    return _NoStoreCookies()
+
+
+def _create_session(verify):
+    if USE_HTTP2:
+        try:
+            import httpx
+            return httpx.Client(
+                http2=True,
+                verify=verify,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=POOL_HOSTS * POOL_MAXSIZE,
+                    max_keepalive_connections=POOL_MAXSIZE
+                )
+            )
+        except ImportError:
+            pass
+
+    try:
+        import requests
+        from requests.adapters import HTTPAdapter
+    except ImportError:
+        return None
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.verify = verify
+    session.cookies.set_policy(_no_store_policy())
+    return session
+
+
+def get_session(name='default', verify=True):
+    """Shared session for a group of callers (None when only urllib is available)"""
+    key = (name, verify)
+    with _lock:
+        if key not in _sessions:
+            _sessions[key] = _create_session(verify)
+        return _sessions[key]
+
+
+def _count(url):
+    host = urllib.parse.urlsplit(url).hostname or ''
+    with _lock:
+        _request_counts[host] = _request_counts.get(host, 0) + 1
+
+
+def _urllib_open(method, url, headers, data, cookies, timeout, verify):
+    import ssl
+    import urllib.request
+
+    handlers = []
+    if not verify:
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+        handlers.append(urllib.request.HTTPSHandler(context=ctx))
+    if cookies is not None:
+        # HTTPCookieProcessor stores Set-Cookie responses in the jar it is
+        # given; give it a per-request copy so the caller's (shared) jar is
+        # never written to
+        import http.cookiejar
+
+        jar = http.cookiejar.CookieJar()
+        for cookie in cookies:
+            jar.set_cookie(cookie)
+        handlers.append(urllib.request.HTTPCookieProcessor(jar))
+
+    opener = urllib.request.build_opener(*handlers)
+    req = urllib.request.Request(url, data=data, headers=headers or {}, method=method)
+    return opener.open(req, timeout=timeout)
+
+
+def _urllib_fetch(method, url, headers, data, cookies, timeout, verify):
+    with _urllib_open(method, url, headers, data, cookies, timeout, verify) as response:
+        return response.read().decode('utf-8')
+
+
+def fetch_json(method, url, session='default', headers=None, data=None, json_body=None,
+               cookies=None, timeout=30, verify=True, breaker=None):
+    """
+    Send a request over the shared pool and decode the JSON body.
+
+    Errors are raised as urllib.error.HTTPError / URLError and
+    json.JSONDecodeError whatever the underlying library, so callers keep one
+    set of except clauses.
+
+    breaker: circuit breaker name, the URL's host by default (False: none).
+    While it is open, circuit_breaker.CircuitOpen (a URLError) is raised
+    without sending the request.
+    """
+    if breaker is None:
+        breaker = urllib.parse.urlsplit(url).hostname
+    guard = circuit_breaker.check(breaker) if breaker else None
+
+    ok = False
+    try:
+        result = _fetch_json(method, url, session, headers, data, json_body, cookies, timeout, verify)
+        ok = True
+        return result
+    except urllib.error.HTTPError as e:
+        # The host answered - only overload and server errors count against it
+        ok = e.code < 500 and e.code != 429
+        raise
+    finally:
+        if guard:
+            guard.record(ok)
+
+
+def _fetch_json(method, url, session, headers, data, json_body, cookies, timeout, verify):
+    _count(url)
+
+    if json_body is not None:
+        data = json.dumps(json_body).encode('utf-8')
+        headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+
+    client = get_session(session, verify)
+    if client is None:
+        return json.loads(_urllib_fetch(method, url, headers, data, cookies, timeout, verify))
+
+    try:
+        if hasattr(client, 'mount'):
+            response = client.request(method, url, headers=headers, data=data, cookies=cookies, timeout=timeout)
+        else:
+            # httpx takes the raw body as content=
+            response = client.request(method, url, headers=headers, content=data, cookies=cookies, timeout=timeout)
+    except Exception as e:
+        # Connection errors/timeouts from requests or httpx
+        raise urllib.error.URLError(str(e))
+
+    if response.status_code >= 400:
+        reason = getattr(response, 'reason', None) or getattr(response, 'reason_phrase', '')
+        raise urllib.error.HTTPError(url, response.status_code, reason, response.headers, None)
+
+    return json.loads(response.text)
+
+
+def fetch_status(method, url, session='default', headers=None, timeout=10, verify=True):
+    """
+    Send a request without reading the body and return (status, headers).
+    For HEAD / Range probes: HTTP error statuses are returned, not raised;
+    connection errors and timeouts are raised as urllib.error.URLError.
+    """
+    _count(url)
+
+    client = get_session(session, verify)
+    if client is None:
+        try:
+            with _urllib_open(method, url, headers, None, None, timeout, verify) as response:
+                return response.status, response.headers
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers
+
+    try:
+        if hasattr(client, 'mount'):
+            response = client.request(method, url, headers=headers, timeout=timeout, stream=True)
+            response.close()
+            return response.status_code, response.headers
+
+        with client.stream(method, url, headers=headers, timeout=timeout) as response:
+            return response.status_code, response.headers
+    except Exception as e:
+        raise urllib.error.URLError(str(e))
+
+
+@contextlib.contextmanager
+def stream(method, url, session='default', headers=None, cookies=None, timeout=30,
+           verify=True, chunk_size=256 * 1024):
+    """
+    Streaming request over the shared pool:
+
+        with http_pool.stream('GET', url, headers=...) as (status, headers, chunks):
+            for data in chunks: ...
+
+    HTTP error statuses are yielded, not raised (with no body chunks for
+    urllib); failures to connect are raised as urllib.error.URLError, errors
+    while reading chunks come from the underlying library.
+    """
+    _count(url)
+
+    client = get_session(session, verify)
+    if client is None:
+        try:
+            response = _urllib_open(method, url, headers, None, cookies, timeout, verify)
+        except urllib.error.HTTPError as e:
+            yield e.code, e.headers, iter(())
+            return
+        with response:
+            yield response.status, response.headers, iter(lambda: response.read(chunk_size), b'')
+        return
+
+    try:
+        if hasattr(client, 'mount'):
+            response = client.request(method, url, headers=headers, cookies=cookies, timeout=timeout, stream=True)
+            chunks = response.iter_content(chunk_size)
+        else:
+            response = client.send(
+                client.build_request(method, url, headers=headers, cookies=cookies, timeout=timeout),
+                stream=True
+            )
+            chunks = response.iter_bytes(chunk_size)
+    except Exception as e:
+        raise urllib.error.URLError(str(e))
+
+    try:
+        yield response.status_code, response.headers, chunks
+    finally:
+        response.close()
+
+
+def stats():
+    """Per-host request counts and (for requests/urllib3) connections opened"""
+    with _lock:
+        hosts = {host: {'requests': count} for host, count in _request_counts.items()}
+        sessions = list(_sessions.values())
+
+    for client in sessions:
+        adapters = getattr(client, 'adapters', {}) if client is not None else {}
+        for adapter in set(adapters.values()):
+            pools = adapter.poolmanager.pools
+            for pool_key in pools.keys():
+                pool = pools[pool_key]
+                entry = hosts.setdefault(pool.host, {'requests': 0})
+                entry['connections'] = entry.get('connections', 0) + pool.num_connections
+
+    for entry in hosts.values():
+        if entry.get('connections') and entry['requests']:
+            entry['reuse_ratio'] = round(1 - entry['connections'] / entry['requests'], 4)
+
+    return {'http2': USE_HTTP2, 'hosts': hosts}
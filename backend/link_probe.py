@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Download Link Pre-validation
+Optional post-extraction stage (LINK_PROBE=1) that probes the top formats'
+URLs before they are handed out:
+
+- HEAD, falling back to a GET of bytes=0-0 when HEAD is refused or carries
+  no length, over the shared http_pool session
+- fills in the real size from Content-Length / Content-Range
+- drops formats whose URL is dead (403 expired signature, 404, 410)
+
+Probes run on at most LINK_PROBE_CONCURRENCY daemon threads and the whole
+stage gives up after LINK_PROBE_BUDGET seconds - formats whose probe hasn't
+finished are returned untouched. Results are cached per media URL until the
+URL's signature expires.
+"""
+
+import os
+import re
+import time
+import queue
+import threading
+from collections import OrderedDict
+
+import http_pool
+from extract_cache import _url_expiry
+
+PROBE_ENABLED = os.environ.get('LINK_PROBE', '').lower() in ('1', 'true', 'yes')
+PROBE_TOP_K = int(os.environ.get('LINK_PROBE_TOP_K', '3'))
+PROBE_CONCURRENCY = int(os.environ.get('LINK_PROBE_CONCURRENCY', '4'))
+PROBE_BUDGET = float(os.environ.get('LINK_PROBE_BUDGET', '2.0'))
+PROBE_TIMEOUT = float(os.environ.get('LINK_PROBE_TIMEOUT', '3.0'))
+
+# Cache lifetime for URLs that don't say when they expire
+DEFAULT_TTL = 600
+MAX_ENTRIES = 4096
+
+DEAD_STATUSES = {403, 404, 410}
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+_cache = OrderedDict()  # url -> (expires, status, length)
+_lock = threading.Lock()
+_stats = {'probes': 0, 'cache_hits': 0, 'dead': 0, 'sized': 0, 'errors': 0, 'timed_out': 0}
+
+
+def _count(field, n=1):
+    with _lock:
+        _stats[field] += n
+
+
+def _length(status, headers):
+    """Full resource size from a HEAD or bytes=0-0 response, or None"""
+    content_range = headers.get('Content-Range')
+    if content_range:
+        # bytes 0-0/123456
+        match = re.search(r'/(\d+)$', content_range)
+        return int(match.group(1)) if match else None
+
+    if status == 200 and headers.get('Content-Length'):
+        try:
+            return int(headers['Content-Length']) or None
+        except ValueError:
+            return None
+    return None
+
+
+def _cached(url):
+    with _lock:
+        entry = _cache.get(url)
+        if entry and entry[0] > time.time():
+            _stats['cache_hits'] += 1
+            return entry[1], entry[2]
+    return None
+
+
+def _remember(url, status, length):
+    expires = _url_expiry(url) or time.time() + DEFAULT_TTL
+    with _lock:
+        _cache[url] = (expires, status, length)
+        _cache.move_to_end(url)
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def probe_url(url, timeout=PROBE_TIMEOUT):
+    """(status, size in bytes) for a media URL; (None, None) when unreachable"""
+    cached = _cached(url)
+    if cached:
+        return cached
+
+    _count('probes')
+    headers = {'User-Agent': USER_AGENT}
+    try:
+        status, response_headers = http_pool.fetch_status('HEAD', url, session='probe', headers=headers, timeout=timeout)
+        length = _length(status, response_headers)
+
+        # Some CDNs refuse HEAD or omit the length - ask for one byte instead
+        if status not in DEAD_STATUSES and (status >= 400 or length is None):
+            status, response_headers = http_pool.fetch_status(
+                'GET', url, session='probe', headers=dict(headers, Range='bytes=0-0'), timeout=timeout
+            )
+            length = _length(status, response_headers)
+    except Exception:
+        # Network trouble says nothing about the link itself - don't cache
+        _count('errors')
+        return None, None
+
+    _remember(url, status, length)
+    return status, length
+
+
+def probe_formats(result, size_format, top_k=PROBE_TOP_K, concurrency=PROBE_CONCURRENCY,
+                  budget=PROBE_BUDGET, progress=None):
+    """
+    Probe the first top_k entries of result['qualities'] and
+    result['audioFormats'] in place: dead ones are removed, live ones get
+    'size' = size_format(real length). Returns the result.
+    """
+    targets = [
+        fmt
+        for key in ('qualities', 'audioFormats')
+        for fmt in (result.get(key) or [])[:top_k]
+        if fmt.get('url')
+    ]
+    if not targets:
+        return result
+
+    work = queue.Queue()
+    for fmt in targets:
+        work.put(fmt)
+    done = queue.Queue()
+    stop = threading.Event()
+
+    def run():
+        while not stop.is_set():
+            try:
+                fmt = work.get_nowait()
+            except queue.Empty:
+                return
+            done.put((fmt, probe_url(fmt['url'])))
+
+    for _ in range(max(1, min(concurrency, len(targets)))):
+        threading.Thread(target=run, daemon=True).start()
+
+    # Collect what finishes within the budget; stragglers are abandoned
+    deadline = time.time() + budget
+    dead = set()
+    finished = 0
+    while finished < len(targets):
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            fmt, (status, length) = done.get(timeout=remaining)
+        except queue.Empty:
+            break
+        finished += 1
+
+        if status in DEAD_STATUSES:
+            dead.add(id(fmt))
+        elif length:
+            fmt['size'] = size_format(length)
+            _count('sized')
+
+    stop.set()
+    _count('timed_out', len(targets) - finished)
+
+    if dead:
+        _count('dead', len(dead))
+        for key in ('qualities', 'audioFormats'):
+            if result.get(key):
+                result[key] = [fmt for fmt in result[key] if id(fmt) not in dead]
+
+    if progress:
+        progress('probe', probed=finished, dead=len(dead), timed_out=len(targets) - finished)
+
+    return result
+
+
+def stats():
+    """Probe counters and cache size"""
+    with _lock:
+        return dict(_stats, cached=len(_cache), enabled=PROBE_ENABLED)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Media Content Cache
+Optional disk tier (MEDIA_CACHE_DIR) for hot media: the whole file is
+fetched once in the background and later requests are served from local
+disk instead of the origin
+
+- keyed by the stable file ID, not the (expiring) signed URL:
+  Terabox fs_id, or YouTube video ID + format_id
+- size-bounded LRU (MEDIA_CACHE_MAX_GB); files larger than
+  MEDIA_CACHE_MAX_FILE_MB are never cached
+- cached ranges are read through mmap, so hot files come straight from the
+  page cache
+- first access starts a background fill with the parallel range downloader;
+  concurrent requests for the same key don't start a second fill
+
+The index lives in memory and is rebuilt from the directory at startup;
+a file only appears under its final name once it is complete.
+"""
+
+import os
+import json
+import mmap
+import time
+import hashlib
+import threading
+import contextlib
+from collections import OrderedDict
+
+from extract_cache import canonical_key
+
+CACHE_DIR = os.environ.get('MEDIA_CACHE_DIR')
+MAX_BYTES = int(float(os.environ.get('MEDIA_CACHE_MAX_GB', '10')) * 1024 ** 3)
+MAX_FILE_BYTES = int(os.environ.get('MEDIA_CACHE_MAX_FILE_MB', '512')) * 1024 ** 2
+
+
+def media_key(page_url, result, fmt=None):
+    """Stable cache key for an extraction result (and chosen format), or None"""
+    if result.get('fs_id'):
+        return f"terabox-fs:{result['fs_id']}"
+
+    key = canonical_key(page_url)
+    if key.startswith('youtube:') and fmt and fmt.get('format_id'):
+        return f"{key}:{fmt['format_id']}"
+    return None
+
+
+class MediaCache:
+    def __init__(self, root, max_bytes=MAX_BYTES, max_file_bytes=MAX_FILE_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # name -> {'size', 'content_type'}, oldest first
+        self.filling = set()
+        self.counters = {'hits': 0, 'misses': 0, 'fills': 0, 'fill_errors': 0, 'evictions': 0}
+
+        os.makedirs(root, exist_ok=True)
+        self._scan()
+
+    def _name(self, key):
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def _path(self, name, suffix='.bin'):
+        return os.path.join(self.root, name + suffix)
+
+    def _scan(self):
+        """Rebuild the index from disk, least recently used first"""
+        found = []
+        for filename in os.listdir(self.root):
+            if not filename.endswith('.bin'):
+                continue
+            name = filename[:-4]
+            try:
+                stat = os.stat(self._path(name))
+                with open(self._path(name, '.json')) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            found.append((stat.st_mtime, name, {'size': stat.st_size, 'content_type': meta.get('content_type')}))
+
+        for _, name, entry in sorted(found):
+            self.entries[name] = entry
+
+    def lookup(self, key):
+        """{'path', 'size', 'content_type'} when key is cached, else None"""
+        name = self._name(key)
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                self.counters['misses'] += 1
+                return None
+            self.entries.move_to_end(name)
+            self.counters['hits'] += 1
+
+        path = self._path(name)
+        try:
+            # mtime doubles as the LRU timestamp across restarts
+            os.utime(path)
+        except OSError:
+            with self.lock:
+                self.entries.pop(name, None)
+            return None
+        return dict(entry, path=path)
+
+    @contextlib.contextmanager
+    def open_map(self, entry):
+        """Read-only mmap of a file returned by lookup()"""
+        with open(entry['path'], 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def read_range(self, key, start=0, end=None):
+        """Bytes start..end (inclusive) of a cached file, or None on a miss"""
+        entry = self.lookup(key)
+        if entry is None or not entry['size']:
+            return None
+        with self.open_map(entry) as mapped:
+            end = len(mapped) - 1 if end is None else min(end, len(mapped) - 1)
+            return mapped[start:end + 1]
+
+    def fill(self, key, url, size, cookie_file=None, content_type=None):
+        """
+        Fetch url into the cache on a background thread. No-op when the key
+        is cached or filling, or the size is unknown or above the file limit.
+        """
+        if not size or int(size) > self.max_file_bytes:
+            return False
+
+        name = self._name(key)
+        with self.lock:
+            if name in self.entries or name in self.filling:
+                return False
+            self.filling.add(name)
+
+        threading.Thread(
+            target=self._fill, args=(name, key, url, size, cookie_file, content_type), daemon=True
+        ).start()
+        return True
+
+    def _fill(self, name, key, url, size, cookie_file, content_type):
+        import terabox_download
+
+        part = self._path(name, '.part')
+        try:
+            result = terabox_download.download(url, part, size, cookie_file)
+            if not result.get('success') or result['size_bytes'] > self.max_file_bytes:
+                with self.lock:
+                    self.counters['fill_errors'] += 1
+                return
+
+            with open(self._path(name, '.json'), 'w') as f:
+                json.dump({'key': key, 'content_type': content_type, 'cached_at': time.time()}, f)
+            os.replace(part, self._path(name))
+
+            with self.lock:
+                self.entries[name] = {'size': result['size_bytes'], 'content_type': content_type}
+                self.counters['fills'] += 1
+            self._evict()
+        finally:
+            with self.lock:
+                self.filling.discard(name)
+            for leftover in (part, part + '.part.json'):
+                with contextlib.suppress(OSError):
+                    os.remove(leftover)
+
+    def _evict(self):
+        """Drop least recently used files until the cache fits"""
+        with self.lock:
+            total = sum(entry['size'] for entry in self.entries.values())
+            victims = []
+            while total > self.max_bytes and len(self.entries) > 1:
+                name, entry = self.entries.popitem(last=False)
+                total -= entry['size']
+                victims.append(name)
+            self.counters['evictions'] += len(victims)
+
+        for name in victims:
+            for suffix in ('.bin', '.json'):
+                with contextlib.suppress(OSError):
+                    os.remove(self._path(name, suffix))
+
+    def stats(self):
+        with self.lock:
+            return dict(
+                self.counters,
+                files=len(self.entries),
+                bytes=sum(entry['size'] for entry in self.entries.values()),
+                max_bytes=self.max_bytes,
+                filling=len(self.filling),
+            )
+
+
+media_cache = MediaCache(CACHE_DIR) if CACHE_DIR else None
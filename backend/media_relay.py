@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+"""
+Media Relay
+asyncio service that streams upstream media to clients for hosts that need
+cookies or a Referer (Terabox dlinks, referer-locked CDNs)
+
+    GET /relay?url=<media url>[&referer=<url>]
+    GET /relay?src=<page url>          (resolved through the extractor package)
+    GET /stats                         (media cache counters)
+
+- one fixed buffer per connection: upstream bytes land in it via
+  BufferedProtocol.get_buffer() and go out with loop.sock_sendall() on a
+  memoryview slice, so relaying allocates nothing per chunk and a
+  connection never holds more than RELAY_BUFFER_KB of body data
+- upstream reading is paused while the client drains the buffer, so a slow
+  client throttles its own upstream instead of piling up memory
+- Range / Content-Range are passed through for seeking; upstream redirects
+  are followed before the response starts
+- only Terabox hosts (terabox_download.TERABOX_MEDIA_DOMAINS) and
+  RELAY_ALLOWED_HOSTS are fetched, and only when every address they
+  resolve to is public - checked again on each redirect hop
+- the cookie pool's Cookie header is only sent for src= requests (a dlink
+  the server resolved itself) and only to Terabox hosts; a client-supplied
+  url= never runs as the server's account
+- with MEDIA_CACHE_DIR set, src= requests (whose media key and size come
+  from the server's own extraction, never from the query) are served from
+  the disk cache when hot, and start a background fill otherwise
+
+    python3 media_relay.py [--host 0.0.0.0] [--port 8090]
+"""
+
+import os
+import re
+import ssl
+import json
+import sys
+import socket
+import asyncio
+import ipaddress
+import urllib.parse
+
+import cookie_pool
+import cookie_store
+from media_cache import media_cache, media_key
+from terabox_download import is_terabox_host
+
+RELAY_HOST = os.environ.get('RELAY_HOST', '0.0.0.0')
+RELAY_PORT = int(os.environ.get('RELAY_PORT', '8090'))
+BUFFER_SIZE = int(os.environ.get('RELAY_BUFFER_KB', '64')) * 1024
+MAX_CONNECTIONS = int(os.environ.get('RELAY_MAX_CONNECTIONS', '4096'))
+CONNECT_TIMEOUT = float(os.environ.get('RELAY_CONNECT_TIMEOUT', '15'))
+IDLE_TIMEOUT = float(os.environ.get('RELAY_IDLE_TIMEOUT', '60'))
+# Non-Terabox upstreams the relay may fetch (and their subdomains)
+ALLOWED_HOSTS = tuple(
+    host.strip().lower() for host in os.environ.get('RELAY_ALLOWED_HOSTS', 'googlevideo.com').split(',') if host.strip()
+)
+# Let upstreams resolve to private/loopback addresses (local testing only)
+ALLOW_PRIVATE = os.environ.get('RELAY_ALLOW_PRIVATE', '').lower() in ('1', 'true', 'yes')
+TERABOX_COOKIES = os.environ.get(
+    'TERABOX_COOKIE_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'terabox_cookies.txt')
+)
+
+MAX_HEAD = 64 * 1024
+MAX_REDIRECTS = 5
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Upstream response headers worth passing on to the client
+PASS_HEADERS = (
+    'content-type', 'content-length', 'content-range', 'accept-ranges',
+    'last-modified', 'etag', 'transfer-encoding', 'content-disposition',
+)
+
+_ssl_context = ssl.create_default_context()
+
+
+class RelayError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _Upstream(asyncio.BufferedProtocol):
+    """Reads straight into the connection's buffer, one fill at a time"""
+
+    def __init__(self, view):
+        self.view = view
+        self.transport = None
+        self._waiter = None
+        self._pending = 0
+        self._closed = False
+        self._error = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        # Nothing is read until the relay asks for it
+        transport.pause_reading()
+
+    def get_buffer(self, sizehint):
+        return self.view
+
+    def buffer_updated(self, nbytes):
+        # Hold further data until this fill has been sent on
+        self.transport.pause_reading()
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(nbytes)
+        else:
+            self._pending = nbytes
+
+    def eof_received(self):
+        self._finish(None)
+
+    def connection_lost(self, exc):
+        self._finish(exc)
+
+    def _finish(self, exc):
+        self._closed = True
+        self._error = self._error or exc
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(0)
+
+    async def read(self):
+        """Fill the buffer; returns the byte count, 0 at EOF"""
+        if self._pending:
+            nbytes, self._pending = self._pending, 0
+            return nbytes
+        if self._closed:
+            if self._error:
+                raise self._error
+            return 0
+
+        self._waiter = asyncio.get_running_loop().create_future()
+        self.transport.resume_reading()
+        return await asyncio.wait_for(self._waiter, IDLE_TIMEOUT)
+
+    def close(self):
+        if self.transport:
+            self.transport.close()
+
+
+def _terabox_cookie():
+    pool = cookie_pool.get_pool('terabox', TERABOX_COOKIES)
+    return cookie_store.cookie_header(pool.acquire()) if pool else None
+
+
+def _header_safe(value):
+    """True when value can go into a request line or header as-is"""
+    try:
+        value.encode('latin-1')
+    except UnicodeEncodeError:
+        return False
+    return not any(ch in value for ch in '\r\n\0')
+
+
+def _clean_referer(referer):
+    """
+    Client-supplied referer rebuilt from its URL parts, so it can't carry
+    extra header lines into the upstream request
+    """
+    if not referer:
+        return None
+    parts = urllib.parse.urlsplit(referer)
+    if parts.scheme not in ('http', 'https') or not parts.hostname or not _header_safe(referer):
+        raise RelayError(400, 'Invalid referer')
+    return urllib.parse.urlunsplit((parts.scheme, parts.netloc, parts.path, parts.query, ''))
+
+
+def _allowed_host(host):
+    host = host.lower().rstrip('.')
+    return is_terabox_host(host) or any(host == domain or host.endswith('.' + domain) for domain in ALLOWED_HOSTS)
+
+
+async def _resolve_public(loop, host, port):
+    """
+    (family, address) to connect to for host. Refused when any address it
+    resolves to is private, loopback, link-local or otherwise not public,
+    so the relay can't be pointed into the internal network.
+    """
+    try:
+        infos = await asyncio.wait_for(
+            loop.getaddrinfo(host, port, type=socket.SOCK_STREAM), CONNECT_TIMEOUT
+        )
+    except (OSError, asyncio.TimeoutError) as e:
+        raise RelayError(502, f"Upstream lookup failed: {str(e)}")
+    if not infos:
+        raise RelayError(502, 'Upstream lookup failed')
+
+    for family, _, _, _, sockaddr in infos:
+        address = ipaddress.ip_address(sockaddr[0].split('%', 1)[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not ALLOW_PRIVATE and (not address.is_global or address.is_multicast):
+            raise RelayError(403, 'Upstream address not allowed')
+
+    family, _, _, _, sockaddr = infos[0]
+    return family, sockaddr[0]
+
+
+async def _open_upstream(url, view, range_header, referer, method='GET', account=False):
+    """
+    Connect, send the request (GET, or HEAD for HEAD requests) and read the
+    response head. account: send the Terabox cookies to Terabox hosts (only
+    for URLs the server resolved itself).
+    Returns (protocol, status line, headers dict, body bytes already in view).
+    """
+    loop = asyncio.get_running_loop()
+
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise RelayError(400, 'Unsupported URL')
+        if not _allowed_host(parts.hostname):
+            raise RelayError(403, 'Upstream host not allowed')
+
+        https = parts.scheme == 'https'
+        port = parts.port or (443 if https else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        if not _header_safe(parts.netloc + path) or ' ' in path:
+            raise RelayError(400, 'Unsupported URL')
+
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {parts.netloc}",
+            f"User-Agent: {USER_AGENT}",
+            f"Referer: {referer or f'{parts.scheme}://{parts.hostname}/'}",
+            "Accept: */*",
+            "Accept-Encoding: identity",
+            "Connection: close",
+        ]
+        if range_header and _header_safe(range_header):
+            lines.append(f"Range: {range_header}")
+        if account and is_terabox_host(parts.hostname):
+            cookie = _terabox_cookie()
+            if cookie:
+                lines.append(f"Cookie: {cookie}")
+
+        # Connect to the vetted address itself, so a second DNS answer can't differ
+        family, address = await _resolve_public(loop, parts.hostname, port)
+        try:
+            _, upstream = await asyncio.wait_for(loop.create_connection(
+                lambda: _Upstream(view), address, port, family=family,
+                ssl=_ssl_context if https else None,
+                server_hostname=parts.hostname if https else None
+            ), CONNECT_TIMEOUT)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise RelayError(502, f"Upstream connection failed: {str(e)}")
+
+        upstream.transport.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+        # Response head (copied out of the buffer - it's small and only once)
+        head = bytearray()
+        while True:
+            nbytes = await upstream.read()
+            if not nbytes:
+                upstream.close()
+                raise RelayError(502, 'Upstream closed before sending headers')
+            start = len(head)
+            head += view[:nbytes]
+            end = head.find(b'\r\n\r\n', max(0, start - 3))
+            if end != -1:
+                break
+            if len(head) > MAX_HEAD:
+                upstream.close()
+                raise RelayError(502, 'Upstream headers too large')
+
+        # Body bytes that arrived with the head are still at the end of view
+        body_offset = nbytes - (len(head) - end - 4)
+        status_line, *header_lines = head[:end].decode('latin-1').split('\r\n')
+        headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            status = int(status_line.split(' ', 2)[1])
+        except (IndexError, ValueError):
+            upstream.close()
+            raise RelayError(502, 'Malformed upstream status line')
+        if status in (301, 302, 303, 307, 308) and headers.get('location'):
+            upstream.close()
+            url = urllib.parse.urljoin(url, headers['location'])
+            continue
+
+        return upstream, status_line, headers, (body_offset, nbytes)
+
+    raise RelayError(502, 'Too many upstream redirects')
+
+
+async def _resolve_source(src):
+    """
+    Page URL -> (direct media URL, media cache key, size in bytes) via the
+    extractor package (in a thread)
+    """
+    import extractor
+
+    loop = asyncio.get_running_loop()
+    try:
+        result = await loop.run_in_executor(None, lambda: extractor.extract(src))
+    except Exception as e:
+        raise RelayError(502, f"Extraction failed: {str(e)}")
+    if not isinstance(result, dict):
+        raise RelayError(502, 'Extraction failed')
+
+    if result.get('download_link'):
+        return result['download_link'], media_key(src, result), result.get('size_bytes')
+    for key in ('qualities', 'audioFormats'):
+        for fmt in result.get(key) or []:
+            if fmt.get('url'):
+                return fmt['url'], media_key(src, result, fmt), None
+    raise RelayError(502, result.get('error') or 'No media URL found')
+
+
+def _parse_range(value, size):
+    """Single 'bytes=' range -> inclusive (start, end), None for the whole file"""
+    match = re.match(r'^bytes=(\d*)-(\d*)$', (value or '').strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    if match.group(1):
+        start = int(match.group(1))
+        end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(0, size - int(match.group(2)))
+        end = size - 1
+    if start > end:
+        raise RelayError(416, 'Range Not Satisfiable')
+    return start, end
+
+
+async def _serve_cached(loop, client, key, method, range_header):
+    """Send a media cache hit from its mmap; False on a miss"""
+    entry = media_cache.lookup(key)
+    if entry is None or not entry['size']:
+        return False
+
+    with media_cache.open_map(entry) as mapped:
+        size = len(mapped)
+        byte_range = _parse_range(range_header, size)
+        start, end = byte_range or (0, size - 1)
+
+        lines = ['HTTP/1.1 206 Partial Content' if byte_range else 'HTTP/1.1 200 OK']
+        lines.append(f"Content-Type: {entry['content_type'] or 'application/octet-stream'}")
+        lines.append(f"Content-Length: {end - start + 1}")
+        if byte_range:
+            lines.append(f"Content-Range: bytes {start}-{end}/{size}")
+        lines += ["Accept-Ranges: bytes", "Access-Control-Allow-Origin: *", "Connection: close"]
+        await loop.sock_sendall(client, ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+        if method == 'HEAD':
+            return True
+
+        # Slices of the mapping go straight to the socket; each is released
+        # before the next so the mmap can close cleanly
+        with memoryview(mapped) as whole:
+            for offset in range(start, end + 1, BUFFER_SIZE):
+                with whole[offset:min(offset + BUFFER_SIZE, end + 1)] as chunk:
+                    await loop.sock_sendall(client, chunk)
+    return True
+
+
+def _total_size(headers):
+    """Full file size from an upstream Content-Range or Content-Length"""
+    match = re.search(r'/(\d+)$', headers.get('content-range', ''))
+    if match:
+        return int(match.group(1))
+    length = headers.get('content-length', '')
+    return int(length) if length.isdigit() and 'content-range' not in headers else None
+
+
+def _response(status, message, content_type='text/plain'):
+    body = message.encode('utf-8')
+    reason = 'OK' if status == 200 else message
+    return (
+        f"HTTP/1.1 {status} {reason}\r\n"
+        f"Content-Type: {content_type}; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Access-Control-Allow-Origin: *\r\n"
+        "Connection: close\r\n\r\n"
+    ).encode('latin-1') + body
+
+
+async def _read_request(loop, client):
+    head = bytearray()
+    while b'\r\n\r\n' not in head:
+        data = await asyncio.wait_for(loop.sock_recv(client, 4096), IDLE_TIMEOUT)
+        if not data:
+            return None
+        head += data
+        if len(head) > MAX_HEAD:
+            raise RelayError(431, 'Request headers too large')
+
+    request_line, *header_lines = head.split(b'\r\n\r\n', 1)[0].decode('latin-1').split('\r\n')
+    method, target, _ = (request_line.split(' ') + ['', ''])[:3]
+    headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return method, target, headers
+
+
+async def handle_client(client):
+    """Serve one client connection (one request, then close)"""
+    loop = asyncio.get_running_loop()
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    upstream = None
+
+    try:
+        request = await _read_request(loop, client)
+        if request is None:
+            return
+        method, target, headers = request
+
+        parts = urllib.parse.urlsplit(target)
+        if parts.path == '/health':
+            await loop.sock_sendall(client, _response(200, 'OK'))
+            return
+        if parts.path == '/stats':
+            stats = {'media_cache': media_cache.stats() if media_cache else None}
+            await loop.sock_sendall(client, _response(200, json.dumps(stats), 'application/json'))
+            return
+        if parts.path != '/relay' or method not in ('GET', 'HEAD'):
+            raise RelayError(404, 'Not Found')
+
+        query = urllib.parse.parse_qs(parts.query)
+        url = query.get('url', [None])[0]
+        key = size = None
+        resolved = False
+        if not url and query.get('src'):
+            url, key, size = await _resolve_source(query['src'][0])
+            resolved = True
+        if not url:
+            raise RelayError(400, 'url or src is required')
+
+        if media_cache and key and await _serve_cached(loop, client, key, method, headers.get('range')):
+            return
+
+        upstream, status_line, upstream_headers, (start, end) = await _open_upstream(
+            url, view, headers.get('range'), _clean_referer(query.get('referer', [None])[0]), method,
+            account=resolved
+        )
+
+        if media_cache and key:
+            # First access: fetch the whole file in the background for next time
+            media_cache.fill(
+                key, url, size or _total_size(upstream_headers),
+                TERABOX_COOKIES if resolved and is_terabox_host(urllib.parse.urlsplit(url).hostname) else None,
+                upstream_headers.get('content-type')
+            )
+
+        lines = [status_line.replace('HTTP/1.0', 'HTTP/1.1', 1)]
+        lines += [f"{name.title()}: {upstream_headers[name]}" for name in PASS_HEADERS if name in upstream_headers]
+        lines += ["Access-Control-Allow-Origin: *", "Connection: close"]
+        await loop.sock_sendall(client, ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+        if method == 'HEAD':
+            return
+
+        # The body is passed through verbatim (chunked framing included)
+        if end > start:
+            await loop.sock_sendall(client, view[start:end])
+        while True:
+            nbytes = await upstream.read()
+            if not nbytes:
+                break
+            await loop.sock_sendall(client, view[:nbytes])
+
+    except RelayError as e:
+        try:
+            await loop.sock_sendall(client, _response(e.status, str(e)))
+        except OSError:
+            pass
+    except (OSError, asyncio.TimeoutError):
+        # Client went away or upstream stalled mid-body
+        pass
+    except Exception as e:
+        print(f"Relay error: {str(e)}", file=sys.stderr)
+        try:
+            await loop.sock_sendall(client, _response(502, 'Relay error'))
+        except OSError:
+            pass
+    finally:
+        if upstream:
+            upstream.close()
+        client.close()
+
+
+async def serve(host=RELAY_HOST, port=RELAY_PORT):
+    loop = asyncio.get_running_loop()
+    listener = socket.create_server((host, port), reuse_port=hasattr(socket, 'SO_REUSEPORT'), backlog=1024)
+    listener.setblocking(False)
+    slots = asyncio.Semaphore(MAX_CONNECTIONS)
+    tasks = set()
+
+    async def run(client):
+        async with slots:
+            await handle_client(client)
+
+    print(f"Media relay listening on {host}:{port}", file=sys.stderr)
+    while True:
+        client, _ = await loop.sock_accept(listener)
+        client.setblocking(False)
+        if slots.locked():
+            # At capacity: refuse quickly instead of queueing
+            try:
+                client.send(_response(503, 'Relay busy'))
+            except OSError:
+                pass
+            client.close()
+            continue
+        task = asyncio.ensure_future(run(client))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+
+def main(argv):
+    host, port = RELAY_HOST, RELAY_PORT
+    i = 0
+    while i < len(argv):
+        if argv[i] == '--host' and i + 1 < len(argv):
+            host = argv[i + 1]
+            i += 2
+            continue
+        if argv[i] == '--port' and i + 1 < len(argv):
+            port = int(argv[i + 1])
+            i += 2
+            continue
+        i += 1
+
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Extraction Metrics
+Per-stage timings and Prometheus-style counters/histograms for the
+extractors, kept in process memory (one registry per worker)
+
+- Timings: stopwatch for one extraction's stages (yt_dlp import, each
+  player client attempt, each Terabox domain, link probing...). With
+  EXTRACT_TIMINGS=1 the stages are added to the result as 'timings'
+  (milliseconds).
+- observe()/inc(): histograms and counters, rendered in the Prometheus text
+  format by render() (served by app.py at /metrics)
+
+Label values must come from small fixed sets (backend, client, domain,
+stage names) - never URLs.
+"""
+
+import os
+import time
+import threading
+import contextlib
+
+TIMINGS_IN_RESULT = os.environ.get('EXTRACT_TIMINGS', '').lower() in ('1', 'true', 'yes')
+
+# Seconds; extractions range from a cache hit to a full client fallback walk
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+METRICS = {
+    'extract_duration_seconds': ('histogram', 'Extraction wall time per backend, including cache hits'),
+    'extract_stage_seconds': ('histogram', 'Time spent per extraction stage'),
+    'ytdlp_client_duration_seconds': ('histogram', 'yt-dlp extraction attempt time per player client'),
+    'terabox_domain_duration_seconds': ('histogram', 'Terabox API request time per domain and endpoint'),
+    'extract_cache_total': ('counter', 'Result cache lookups by outcome'),
+    'extract_fallback_depth_total': ('counter', 'Extractions by number of failed clients/domains before the one that answered'),
+    'circuit_breaker_transitions_total': ('counter', 'Circuit breaker state changes per upstream'),
+    'circuit_breaker_rejections_total': ('counter', 'Calls refused by an open circuit breaker'),
+}
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_counters = {}  # (name, labels) -> value
+
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def observe(name, seconds, **labels):
+    """Add one sample to a histogram"""
+    key = (name, _labels(labels))
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                series[i] += 1
+                break
+        series[-2] += seconds
+        series[-1] += 1
+
+
+def inc(name, n=1, **labels):
+    """Increment a counter"""
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+@contextlib.contextmanager
+def timed(name, **labels):
+    """Observe the block's duration, labelled outcome="ok" or "error" """
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        observe(name, time.perf_counter() - started, outcome=outcome, **labels)
+
+
+class Timings:
+    """Stage durations of one extraction (safe to use from race threads)"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def stage(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def as_dict(self):
+        with self.lock:
+            timings = {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()}
+        timings['total'] = round((time.perf_counter() - self.started) * 1000, 1)
+        return timings
+
+    def finish(self, result):
+        """Record the stage histograms; attach 'timings' to a dict result when enabled"""
+        with self.lock:
+            stages = list(self.stages.items())
+        for stage, seconds in stages:
+            observe('extract_stage_seconds', seconds, backend=self.backend, stage=stage)
+
+        if TIMINGS_IN_RESULT and isinstance(result, dict):
+            result['timings'] = self.as_dict()
+        return result
+
+
+def stage(timings, name):
+    """timings.stage(name), or a no-op when timings is None"""
+    return timings.stage(name) if timings else contextlib.nullcontext()
+
+
+def process_age():
+    """Seconds since this process started (interpreter start + imports), or None"""
+    try:
+        with open('/proc/self/stat') as f:
+            # starttime is field 22, after the parenthesised command name
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def add_startup(result, startup):
+    """CLI scripts: put process start -> extraction start into result['timings']"""
+    if startup is not None and isinstance(result, dict) and 'timings' in result:
+        result['timings']['startup'] = round(startup * 1000, 1)
+    return result
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        f'{key}="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    with _lock:
+        histograms = {key: list(series) for key, series in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+        if kind == 'histogram':
+            for (series_name, labels), series in sorted(histograms.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS, series):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', repr(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {series[-2]:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {series[-1]}")
+        else:
+            for (series_name, labels), value in sorted(counters.items()):
+                if series_name == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    return '\n'.join(lines) + '\n'
+
+
+def snapshot():
+    """Counters and histogram count/sum as JSON-friendly dicts (worker stats op)"""
+    with _lock:
+        return {
+            'counters': [
+                dict(labels, metric=name, value=value)
+                for (name, labels), value in sorted(_counters.items())
+            ],
+            'histograms': [
+                dict(labels, metric=name, count=series[-1], sum=round(series[-2], 6))
+                for (name, labels), series in sorted(_histograms.items())
+            ],
+        }
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Extraction Progress Events
+Thread-safe event queue used to stream progress (client attempted/failed,
+metadata available, formats available) as NDJSON or SSE while an extraction
+is still running, plus a fast oEmbed lookup so title/thumbnail can be shown
+before the format list is ready
+"""
+
+import json
+import queue
+import threading
+import urllib.parse
+
+# oEmbed endpoints for sites where yt-dlp is slow but metadata is cheap
+OEMBED_ENDPOINTS = {
+    'youtube.com': 'https://www.youtube.com/oembed',
+    'youtu.be': 'https://www.youtube.com/oembed',
+    'vimeo.com': 'https://vimeo.com/api/oembed.json',
+}
+
+
+class ProgressQueue:
+    """Callable event sink: progress('event_name', key=value) from any thread"""
+
+    def __init__(self):
+        self.events = queue.Queue()
+
+    def __call__(self, event, **data):
+        self.events.put({'event': event, **data})
+
+    def close(self):
+        self.events.put(None)
+
+    def iter(self, timeout=None):
+        """Yield events until close(); yields a timeout event if nothing arrives in time"""
+        while True:
+            try:
+                item = self.events.get(timeout=timeout)
+            except queue.Empty:
+                yield {'event': 'error', 'message': 'Extraction timed out'}
+                return
+            if item is None:
+                return
+            yield item
+
+
+def format_ndjson(event):
+    return json.dumps(event) + '\n'
+
+
+def format_sse(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _oembed_endpoint(url):
+    host = (urllib.parse.urlsplit(url).hostname or '').lower()
+    for domain, endpoint in OEMBED_ENDPOINTS.items():
+        if host == domain or host.endswith('.' + domain):
+            return endpoint
+    return None
+
+
+def emit_early_metadata(url, progress, timeout=5):
+    """
+    Fetch title/thumbnail via oEmbed on a daemon thread and emit a 'metadata'
+    event. Does nothing for sites without a known oEmbed endpoint.
+    """
+    endpoint = _oembed_endpoint(url)
+    if not endpoint:
+        return
+
+    def fetch():
+        import urllib.request
+        try:
+            query = urllib.parse.urlencode({'url': url, 'format': 'json'})
+            req = urllib.request.Request(f"{endpoint}?{query}", headers={
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            })
+            with urllib.request.urlopen(req, timeout=timeout) as response:
+                data = json.loads(response.read().decode('utf-8'))
+
+            progress(
+                'metadata',
+                source='oembed',
+                title=data.get('title', ''),
+                thumbnail=data.get('thumbnail_url', ''),
+                uploader=data.get('author_name', '')
+            )
+        except Exception:
+            # Best effort only - the full result carries the metadata anyway
+            pass
+
+    threading.Thread(target=fetch, daemon=True).start()
@@ -46,4 +46,8 @@ app.get('/api/download-proxy', downloadProxyHandler);
 const PORT = process.env.PORT || 3000;
 app.listen(PORT, () => {
   console.log(`Server running on port ${PORT}`);
+
+  // Start Python extraction workers so the first request skips interpreter/import startup
+  const { pythonWorkerPool } = require('./utils/python-worker-pool');
+  pythonWorkerPool.warm();
 });
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Single-flight Request Coalescing
+Concurrent calls for the same key share one execution: the first caller
+runs the function, the others wait and receive its result (or its error)
+
+Followers get their own copy of the result (decoded from a JSON snapshot
+taken when the call finished), so callers may modify what they get back.
+"""
+
+import copy
+import json
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.snapshot = None
+        self.error = None
+        self.waiters = 0
+
+
+def _freeze(value):
+    """Immutable snapshot of a result: its JSON text, or a deep copy for non-JSON values"""
+    try:
+        return ('json', json.dumps(value))
+    except (TypeError, ValueError):
+        return ('copy', copy.deepcopy(value))
+
+
+def _thaw(snapshot):
+    kind, value = snapshot
+    return json.loads(value) if kind == 'json' else copy.deepcopy(value)
+
+
+class SingleFlight:
+    """Per-key in-flight deduplication for blocking calls"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.counters = {'executed': 0, 'coalesced': 0}
+
+    def do(self, key, func, *args, **kwargs):
+        """Run func(*args, **kwargs) unless a call for key is already in flight"""
+        with self.lock:
+            call = self.calls.get(key)
+            if call:
+                call.waiters += 1
+                self.counters['coalesced'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self.calls[key] = call
+                self.counters['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _thaw(call.snapshot)
+
+        try:
+            result = func(*args, **kwargs)
+            call.snapshot = _freeze(result)
+            return result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, in_flight=len(self.calls))
+
+
+# Shared by every extractor in the process
+flights = SingleFlight()
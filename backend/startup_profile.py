@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Startup Profiling
+Measures what a one-shot CLI extraction pays before doing any work: module
+import cost (parsed from `python -X importtime`) and time to the first byte
+of output, which is what the Node server waits on for every spawn
+
+    python3 ytdlp_extract.py --self-profile [--runs N] [--top K] <url> [cookies]
+    python3 startup_profile.py [--runs N] [--top K] <script> [args ...]
+
+With --runs N the script is started N times without -X importtime (which
+inflates timings) and TTFB / total percentiles are reported. Output is JSON.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+
+DEFAULT_TOP = 15
+
+
+def run_once(script, args, importtime=False):
+    """Run `script args` once; returns (timings dict, stderr text)"""
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ['-X', 'importtime']
+    cmd += [script] + list(args)
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            stdin=subprocess.DEVNULL)
+
+    # Drain stderr on the side so a chatty child can't block on a full pipe
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()), daemon=True)
+    reader.start()
+
+    first = proc.stdout.read(1)
+    ttfb = time.perf_counter() - started if first else None
+    output = first + proc.stdout.read()
+    proc.wait()
+    total = time.perf_counter() - started
+    reader.join()
+
+    return {
+        'ttfb_ms': round(ttfb * 1000, 1) if ttfb is not None else None,
+        'total_ms': round(total * 1000, 1),
+        'exit_code': proc.returncode,
+        'output_bytes': len(output),
+    }, stderr[0].decode('utf-8', 'replace') if stderr else ''
+
+
+def parse_importtime(text):
+    """
+    `-X importtime` lines -> list of {module, self_ms, cumulative_ms, depth}
+    in the order Python printed them (children before their parent)
+    """
+    entries = []
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            self_us = int(self_us)
+            cumulative_us = int(cumulative_us)
+        except ValueError:
+            # Header line ("self [us] | cumulative | imported package")
+            continue
+
+        module = name.rstrip()
+        entries.append({
+            'module': module.strip(),
+            'self_ms': round(self_us / 1000, 2),
+            'cumulative_ms': round(cumulative_us / 1000, 2),
+            'depth': (len(module) - len(module.lstrip()) - 1) // 2,
+        })
+    return entries
+
+
+def import_report(entries, top=DEFAULT_TOP):
+    """Total import time plus the most expensive modules, inclusive and exclusive"""
+    roots = [e for e in entries if e['depth'] == 0]
+    return {
+        'total_ms': round(sum(e['cumulative_ms'] for e in roots), 1),
+        'modules': len(entries),
+        'top_cumulative': [
+            {'module': e['module'], 'ms': e['cumulative_ms']}
+            for e in sorted(roots, key=lambda e: e['cumulative_ms'], reverse=True)[:top]
+        ],
+        'top_self': [
+            {'module': e['module'], 'ms': e['self_ms']}
+            for e in sorted(entries, key=lambda e: e['self_ms'], reverse=True)[:top]
+        ],
+    }
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return None
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def profile(script, args, top=DEFAULT_TOP):
+    """One run under -X importtime: import breakdown + TTFB"""
+    timings, stderr = run_once(script, args, importtime=True)
+    return {
+        'script': os.path.basename(script),
+        'args': list(args),
+        'run': timings,
+        'imports': import_report(parse_importtime(stderr), top),
+    }
+
+
+def bench(script, args, runs):
+    """TTFB / total wall time percentiles over `runs` plain starts"""
+    samples = [run_once(script, args)[0] for _ in range(runs)]
+    report = {'script': os.path.basename(script), 'args': list(args), 'runs': runs}
+
+    for field in ('ttfb_ms', 'total_ms'):
+        values = [s[field] for s in samples if s[field] is not None]
+        report[field] = {
+            'min': min(values) if values else None,
+            'p50': _percentile(values, 50),
+            'p95': _percentile(values, 95),
+            'max': max(values) if values else None,
+        }
+    return report
+
+
+def _options(argv):
+    """Leading --runs N / --top K -> (runs, top, remaining argv)"""
+    runs = 0
+    top = DEFAULT_TOP
+
+    while len(argv) > 1 and argv[0] in ('--runs', '--top'):
+        if argv[0] == '--runs':
+            runs = int(argv[1])
+        else:
+            top = int(argv[1])
+        argv = argv[2:]
+
+    return runs, top, argv
+
+
+def _report(script, args, runs, top):
+    report = bench(script, args, runs) if runs else profile(script, args, top)
+    print(json.dumps(report, indent=2))
+
+
+def self_profile(script, argv):
+    """Entry point for the extractor scripts' `--self-profile [--runs N] [--top K] [args ...]`"""
+    runs, top, args = _options(argv)
+    _report(script, args, runs, top)
+
+
+def main(argv):
+    """CLI for `startup_profile.py [--runs N] [--top K] <script> [args ...]`"""
+    runs, top, argv = _options(argv)
+
+    if not argv:
+        print(json.dumps({'error': 'Usage: startup_profile.py [--runs N] [--top K] <script> [args ...]'}))
+        sys.exit(1)
+
+    _report(argv[0], argv[1:], runs, top)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Parallel Range Downloader for Terabox dlinks
+Splits a file into byte ranges and fetches them over several connections of
+the shared 'terabox' http_pool session (with the account's cookies), so a
+multi-GB file isn't limited to one TCP stream
+
+- download(): ranges written with os.pwrite into a preallocated file;
+  finished ranges are recorded in a sidecar <dest>.part.json so an
+  interrupted download resumes where it stopped
+- iter_download(): the same parallel fetch, yielded in order to a consumer
+  (at most `connections` ranges buffered in memory)
+
+The final size is checked against size_bytes from the extractor and the
+server's Content-Range total.
+
+    python3 terabox_download.py <dlink | share url> <dest> [cookie_file] [--connections N]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import threading
+import contextlib
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import http_pool
+import cookie_store
+
+CONNECTIONS = int(os.environ.get('TERABOX_DL_CONNECTIONS', '8'))
+CHUNK_SIZE = int(os.environ.get('TERABOX_DL_CHUNK_MB', '8')) * 1024 * 1024
+RETRIES = int(os.environ.get('TERABOX_DL_RETRIES', '3'))
+TIMEOUT = float(os.environ.get('TERABOX_DL_TIMEOUT', '30'))
+
+# Hosts Terabox serves dlinks and media from; each also covers its subdomains
+TERABOX_MEDIA_DOMAINS = (
+    'terabox.com', 'terabox.app', 'terabox.fun', 'teraboxapp.com', 'teraboxcdn.com',
+    '1024terabox.com', '1024tera.com', 'dubox.com', 'freeterabox.com', 'nephobox.com',
+    '4funbox.com', 'mirrobox.com', 'momerybox.com', 'tibibox.com',
+)
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Referer': 'https://www.1024terabox.com/',
+}
+
+
+class DownloadError(Exception):
+    pass
+
+
+def is_terabox_host(host):
+    """host is a Terabox domain or a subdomain of one (gets the account cookies)"""
+    host = (host or '').lower().rstrip('.')
+    return any(host == domain or host.endswith('.' + domain) for domain in TERABOX_MEDIA_DOMAINS)
+
+
+def _stream(url, cookies, start=None, end=None):
+    headers = dict(HEADERS)
+    if start is not None:
+        headers['Range'] = f"bytes={start}-{end}"
+    # Terabox dlink servers are fetched without certificate checks like the
+    # extractors do; any other host (media cache fills) is verified
+    verify = not is_terabox_host(urllib.parse.urlsplit(url).hostname)
+    return http_pool.stream('GET', url, session='terabox', headers=headers,
+                            cookies=cookies, timeout=TIMEOUT, verify=verify)
+
+
+def probe(url, cookies=None):
+    """(total size or None, whether the server honours Range requests)"""
+    with _stream(url, cookies, 0, 0) as (status, headers, chunks):
+        if status == 206:
+            match = re.search(r'/(\d+)$', headers.get('Content-Range', ''))
+            return (int(match.group(1)) if match else None), True
+        if status == 200:
+            length = headers.get('Content-Length')
+            return (int(length) if length and length.isdigit() else None), False
+        raise DownloadError(f"HTTP {status} from download server")
+
+
+def _ranges(size, chunk_size):
+    return [(start, min(start + chunk_size, size) - 1) for start in range(0, size, chunk_size)]
+
+
+def _pwrite(fd, data, offset):
+    if hasattr(os, 'pwrite'):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+    else:
+        # No pwrite (Windows): seek + write on a per-call handle
+        with open(fd, 'r+b', closefd=False) as f:
+            f.seek(offset)
+            f.write(data)
+
+
+def _fetch_range(url, cookies, start, end, sink):
+    """
+    Fetch bytes start..end (inclusive), passing (offset, data) to sink.
+    A dropped connection is retried from the last byte received.
+    """
+    offset = start
+    for attempt in range(RETRIES + 1):
+        try:
+            with _stream(url, cookies, offset, end) as (status, headers, chunks):
+                if status != 206:
+                    error = f"HTTP {status} for range {offset}-{end}"
+                    # 5xx is worth retrying, anything else (expired dlink...) isn't
+                    raise IOError(error) if status >= 500 else DownloadError(error)
+                for data in chunks:
+                    data = data[:end + 1 - offset]
+                    sink(offset, data)
+                    offset += len(data)
+                    if offset > end:
+                        break
+            if offset > end:
+                return
+        except DownloadError:
+            raise
+        except Exception:
+            if attempt == RETRIES:
+                raise
+        time.sleep(min(2 ** attempt, 8))
+
+    raise DownloadError(f"Range {start}-{end} incomplete after {RETRIES + 1} attempts")
+
+
+def _load_state(path, size, chunk_size):
+    """Finished range indexes from the sidecar, if it matches this download"""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    if state.get('size') != size or state.get('chunk_size') != chunk_size:
+        return set()
+    return set(state.get('done', []))
+
+
+def _save_state(path, size, chunk_size, done):
+    tmp = f"{path}.tmp"
+    with open(tmp, 'w') as f:
+        json.dump({'size': size, 'chunk_size': chunk_size, 'done': sorted(done)}, f)
+    os.replace(tmp, path)
+
+
+def _preallocate(fd, size):
+    os.ftruncate(fd, size)
+    try:
+        # Reserve the blocks up front so ranges don't fragment the file
+        os.posix_fallocate(fd, 0, size)
+    except (AttributeError, OSError):
+        pass
+
+
+def _download_single(url, dest, cookies, size=None):
+    """
+    Server without Range support: one stream, no resume. Written to
+    <dest>.tmp and renamed only once complete, so a failed request never
+    truncates an existing dest.
+    """
+    tmp = f"{dest}.tmp"
+    try:
+        with _stream(url, cookies) as (status, headers, chunks):
+            if status != 200:
+                raise DownloadError(f"HTTP {status} from download server")
+            with open(tmp, 'wb') as f:
+                for data in chunks:
+                    f.write(data)
+        written = os.path.getsize(tmp)
+        if size and written != size:
+            raise DownloadError(f"Incomplete download: {written} of {size} bytes")
+        os.replace(tmp, dest)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp)
+        raise
+    return written
+
+
+def download(url, dest, size_bytes=None, cookie_file=None, connections=CONNECTIONS,
+             chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Download url to dest with parallel range requests, resuming from
+    <dest>.part.json when present. Returns a result dict.
+
+    progress: optional callable progress(event, **data) receiving
+    'download' events with done/total bytes
+    """
+    started = time.time()
+    cookies = cookie_store.load_jar(cookie_file) if cookie_file else None
+    state_path = f"{dest}.part.json"
+
+    try:
+        size, ranged = probe(url, cookies)
+        if size_bytes and size and int(size_bytes) != size:
+            raise DownloadError(f"Size mismatch: extractor says {size_bytes}, server says {size}")
+        size = size or (int(size_bytes) if size_bytes else None)
+
+        if not ranged or not size:
+            written = _download_single(url, dest, cookies, size)
+            return {
+                "success": True, "path": dest, "size_bytes": written,
+                "resumed_bytes": 0, "connections": 1,
+                "elapsed": round(time.time() - started, 2),
+            }
+
+        ranges = _ranges(size, chunk_size)
+        done = _load_state(state_path, size, chunk_size) if os.path.exists(dest) else set()
+        resumed = sum(end - start + 1 for i, (start, end) in enumerate(ranges) if i in done)
+        pending = [i for i in range(len(ranges)) if i not in done]
+
+        fd = os.open(dest, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0), 0o644)
+        try:
+            if os.fstat(fd).st_size != size:
+                _preallocate(fd, size)
+
+            lock = threading.Lock()
+            received = [resumed]
+
+            def sink(offset, data):
+                _pwrite(fd, data, offset)
+                with lock:
+                    received[0] += len(data)
+
+            def fetch(index):
+                start, end = ranges[index]
+                _fetch_range(url, cookies, start, end, sink)
+                with lock:
+                    done.add(index)
+                    _save_state(state_path, size, chunk_size, done)
+                if progress:
+                    progress('download', done=received[0], total=size)
+
+            with ThreadPoolExecutor(max_workers=max(1, connections)) as executor:
+                futures = [executor.submit(fetch, index) for index in pending]
+                try:
+                    for future in futures:
+                        future.result()
+                except Exception:
+                    # Don't start the remaining ranges after a failure
+                    for future in futures:
+                        future.cancel()
+                    raise
+
+            os.fsync(fd)
+            actual = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+        if len(done) != len(ranges) or actual != size:
+            raise DownloadError(f"Incomplete download: {len(done)}/{len(ranges)} ranges, {actual} of {size} bytes")
+
+        os.remove(state_path)
+        elapsed = time.time() - started
+        return {
+            "success": True,
+            "path": dest,
+            "size_bytes": size,
+            "resumed_bytes": resumed,
+            "connections": min(connections, len(pending)) if pending else 0,
+            "elapsed": round(elapsed, 2),
+            "speed_mbps": round((size - resumed) * 8 / elapsed / 1e6, 2) if elapsed else None,
+        }
+
+    except Exception as e:
+        # Keep the partial file and sidecar for the next attempt
+        return {
+            "success": False,
+            "error": f"Download failed: {str(e)}",
+            "path": dest,
+        }
+
+
+def iter_download(url, size_bytes=None, cookie_file=None, connections=CONNECTIONS,
+                  chunk_size=CHUNK_SIZE):
+    """
+    Yield the file's bytes in order while up to `connections` ranges are
+    fetched ahead in parallel. Raises DownloadError on failure, including
+    when the bytes received don't add up to the expected size.
+    """
+    cookies = cookie_store.load_jar(cookie_file) if cookie_file else None
+    size, ranged = probe(url, cookies)
+    if size_bytes and size and int(size_bytes) != size:
+        raise DownloadError(f"Size mismatch: extractor says {size_bytes}, server says {size}")
+    size = size or (int(size_bytes) if size_bytes else None)
+    received = 0
+
+    if not ranged or not size:
+        with _stream(url, cookies) as (status, headers, chunks):
+            if status != 200:
+                raise DownloadError(f"HTTP {status} from download server")
+            for data in chunks:
+                received += len(data)
+                yield data
+    else:
+        def fetch(bounds):
+            start, end = bounds
+            buffer = bytearray(end - start + 1)
+
+            def sink(offset, data):
+                buffer[offset - start:offset - start + len(data)] = data
+
+            _fetch_range(url, cookies, start, end, sink)
+            return bytes(buffer)
+
+        ranges = _ranges(size, chunk_size)
+        with ThreadPoolExecutor(max_workers=max(1, connections)) as executor:
+            window = [executor.submit(fetch, bounds) for bounds in ranges[:connections]]
+            next_range = len(window)
+
+            while window:
+                data = window.pop(0).result()
+                if next_range < len(ranges):
+                    window.append(executor.submit(fetch, ranges[next_range]))
+                    next_range += 1
+                received += len(data)
+                yield data
+
+    if size and received != size:
+        raise DownloadError(f"Incomplete download: {received} of {size} bytes")
+
+
+def main(argv):
+    """CLI: download a dlink (or extract a share URL first) to a file"""
+    connections = CONNECTIONS
+    args = []
+
+    i = 0
+    while i < len(argv):
+        if argv[i] == '--connections' and i + 1 < len(argv):
+            connections = int(argv[i + 1])
+            i += 2
+            continue
+        args.append(argv[i])
+        i += 1
+
+    if len(args) < 2:
+        print(json.dumps({
+            "success": False,
+            "error": "Usage: python3 terabox_download.py <dlink | share url> <dest> [cookie_file] [--connections N]"
+        }))
+        sys.exit(1)
+
+    url, dest = args[0], args[1]
+    cookie_file = args[2] if len(args) > 2 else None
+    size_bytes = None
+
+    if '/s/' in url or 'surl=' in url:
+        # Share link: resolve the dlink with the matching extractor first
+        import extractor
+        extracted = extractor.extract(url, cookie_file=cookie_file)
+        if not extracted.get('success'):
+            print(json.dumps(extracted))
+            sys.exit(1)
+        url = extracted['download_link']
+        size_bytes = extracted.get('size_bytes')
+
+    result = download(url, dest, size_bytes, cookie_file, connections)
+    print(json.dumps(result))
+    sys.exit(0 if result.get('success') else 1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -4,12 +4,58 @@ Terabox Video Extractor - Using Public API
 Extracts download links from Terabox using Cloudflare Worker API
 """
 
+import os
 import sys
 import json
 import re
-import urllib.request
+import urllib.error
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+import http_pool
+import metrics
+from extractor.formatting import format_bytes
+from extract_cache import cached_extraction
 
+# Folder shares: the worker API takes one fs_id per get-download call, so
+# links are resolved with up to LINK_CONCURRENCY calls in flight
+MAX_FILES = int(os.environ.get('TERABOX_MAX_FILES', '200'))
+LINK_CONCURRENCY = int(os.environ.get('TERABOX_LINK_CONCURRENCY', '4'))
+
+WORKER_HOST = 'terabox.hnn.workers.dev'
+
+def fetch_download_link(info_data, file_info, timings=None):
+    """get-download for one file; the link or None"""
+    download_api_url = f"https://{WORKER_HOST}/api/get-download"
+    
+    post_data = json.dumps({
+        'shareid': info_data['shareid'],
+        'uk': info_data['uk'],
+        'sign': info_data['sign'],
+        'timestamp': info_data['timestamp'],
+        'fs_id': file_info['fs_id']
+    }).encode('utf-8')
+    
+    download_headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept': 'application/json',
+        'Content-Type': 'application/json',
+        'Origin': 'https://terabox.hnn.workers.dev',
+        'Referer': 'https://terabox.hnn.workers.dev/'
+    }
+    
+    with metrics.stage(timings, 'get_download'), \
+            metrics.timed('terabox_domain_duration_seconds', domain=WORKER_HOST, endpoint='get-download'):
+        download_data = http_pool.fetch_json(
+            'POST',
+            download_api_url,
+            session='terabox',
+            headers=download_headers,
+            data=post_data,
+            timeout=15
+        )
+    return download_data.get('downloadLink')
+
+@cached_extraction('terabox')
 def extract_terabox(url, cookie_string=None):
     """
     Extract Terabox file info and download link using public API
@@ -21,7 +67,11 @@ def extract_terabox(url, cookie_string=None):
     Returns:
         JSON with file info and download link
     """
-    
+    timings = metrics.Timings('terabox')
+    return timings.finish(extract_share(url, timings))
+
+def extract_share(url, timings):
+    """extract_terabox without the cache and timing bookkeeping"""
     try:
         # Extract share ID from URL
         # Supports: terabox.com/s/xxx, teraboxapp.com/s/xxx, 1024tera.com/s/xxx
@@ -35,17 +85,17 @@ def extract_terabox(url, cookie_string=None):
         share_id = match.group(1)
         
         # Step 1: Get file info from Cloudflare Worker API
-        api_url = f"https://terabox.hnn.workers.dev/api/get-info?shorturl={share_id}&pwd="
+        api_url = f"https://{WORKER_HOST}/api/get-info?shorturl={share_id}&pwd="
         
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
             'Accept': 'application/json'
         }
         
-        req = urllib.request.Request(api_url, headers=headers)
-        
-        with urllib.request.urlopen(req, timeout=15) as response:
-            info_data = json.loads(response.read().decode('utf-8'))
+        # Shared keep-alive session: no new TLS handshake per extraction in a worker
+        with timings.stage('get_info'), \
+                metrics.timed('terabox_domain_duration_seconds', domain=WORKER_HOST, endpoint='get-info'):
+            info_data = http_pool.fetch_json('GET', api_url, session='terabox', headers=headers, timeout=15)
         
         # Check if we got file info
         if not info_data.get('list') or len(info_data['list']) == 0:
@@ -54,39 +104,28 @@ def extract_terabox(url, cookie_string=None):
                 "error": "No files found in share link"
             }
         
-        file_info = info_data['list'][0]
-        
-        # Step 2: Get download link
-        download_api_url = "https://terabox.hnn.workers.dev/api/get-download"
-        
-        post_data = json.dumps({
-            'shareid': info_data['shareid'],
-            'uk': info_data['uk'],
-            'sign': info_data['sign'],
-            'timestamp': info_data['timestamp'],
-            'fs_id': file_info['fs_id']
-        }).encode('utf-8')
-        
-        download_headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept': 'application/json',
-            'Content-Type': 'application/json',
-            'Origin': 'https://terabox.hnn.workers.dev',
-            'Referer': 'https://terabox.hnn.workers.dev/'
-        }
+        # Directories can't be listed through the worker API - keep the files
+        files = [f for f in info_data['list'] if str(f.get('isdir', 0)) != '1'][:MAX_FILES]
+        if not files:
+            return {
+                "success": False,
+                "error": "No files found in share link"
+            }
         
-        download_req = urllib.request.Request(
-            download_api_url,
-            data=post_data,
-            headers=download_headers,
-            method='POST'
-        )
+        # Step 2: Get download links - the first file's errors propagate as
+        # before, the others are just skipped when they fail
+        def resolve(index):
+            try:
+                return fetch_download_link(info_data, files[index], timings)
+            except Exception:
+                if index == 0:
+                    raise
+                return None
         
-        with urllib.request.urlopen(download_req, timeout=15) as response:
-            download_data = json.loads(response.read().decode('utf-8'))
+        with ThreadPoolExecutor(max_workers=max(1, min(LINK_CONCURRENCY, len(files)))) as executor:
+            links = list(executor.map(resolve, range(len(files))))
         
-        # Extract download link
-        download_link = download_data.get('downloadLink')
+        download_link = links[0]
         
         if not download_link:
             return {
@@ -94,13 +133,27 @@ def extract_terabox(url, cookie_string=None):
                 "error": "Could not get download link from API"
             }
         
-        # Return success
+        entries = [{
+            "title": f.get('server_filename', 'Terabox File'),
+            "download_link": link,
+            "thumbnail": f.get('thumbs', {}).get('url3', '') if isinstance(f.get('thumbs'), dict) else '',
+            "file_size": format_bytes(f.get('size', 0)),
+            "size_bytes": f.get('size', 0),
+            "fs_id": f.get('fs_id'),
+        } for f, link in zip(files, links) if link]
+        
+        # Return success (first file at the top level, every file in 'files')
+        file_info = files[0]
         return {
             "success": True,
             "title": file_info.get('server_filename', 'Terabox File'),
             "download_link": download_link,
             "thumbnail": file_info.get('thumbs', {}).get('url3', '') if isinstance(file_info.get('thumbs'), dict) else '',
             "file_size": format_bytes(file_info.get('size', 0)),
+            "size_bytes": file_info.get('size', 0),
+            "fs_id": file_info.get('fs_id'),
+            "file_count": len(entries),
+            "files": entries,
             "extractor": "terabox-cloudflare-api"
         }
         
@@ -130,63 +183,23 @@ def extract_terabox(url, cookie_string=None):
             "error": f"Extraction error: {str(e)}"
         }
 
-def format_bytes(bytes_size):
-    """Format bytes to human readable size"""
-    try:
-        bytes_size = int(bytes_size)
-        if bytes_size == 0:
-            return "0 B"
-        
-        units = ['B', 'KB', 'MB', 'GB', 'TB']
-        i = 0
-        while bytes_size >= 1024 and i < len(units) - 1:
-            bytes_size /= 1024.0
-            i += 1
-        
-        return f"{bytes_size:.2f} {units[i]}"
-    except:
-        return "Unknown"
-
-if __name__ == "__main__":
-    try:
-        if len(sys.argv) < 2:
-            result = {
-                "success": False,
-                "error": "Usage: python3 terabox_extract.py <url> [cookie_string]"
-            }
-        else:
-            url = sys.argv[1]
-            cookie = sys.argv[2] if len(sys.argv) > 2 else None
-            result = extract_terabox(url, cookie)
-        
-        # Output only JSON
-        print(json.dumps(result))
-        
-    except Exception as e:
-        # Always output valid JSON
-        print(json.dumps({
-            "success": False,
-            "error": f"Script error: {str(e)}"
-        }))
-
-def format_bytes(bytes_size):
-    """Format bytes to human readable size"""
-    try:
-        bytes_size = int(bytes_size)
-        if bytes_size == 0:
-            return "0 B"
-        
-        units = ['B', 'KB', 'MB', 'GB', 'TB']
-        i = 0
-        while bytes_size >= 1024 and i < len(units) - 1:
-            bytes_size /= 1024.0
-            i += 1
-        
-        return f"{bytes_size:.2f} {units[i]}"
-    except:
-        return "Unknown"
-
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        from extract_worker import main
+        main(sys.argv[2:], default_backend='terabox')
+        sys.exit(0)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--self-profile':
+        # Re-run this script under -X importtime and report startup cost
+        import startup_profile
+        startup_profile.self_profile(__file__, sys.argv[2:])
+        sys.exit(0)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        import batch_extract
+        batch_extract.main(sys.argv[2:], extract_terabox)
+        sys.exit(0)
+    
     try:
         if len(sys.argv) < 2:
             result = {
@@ -196,7 +209,8 @@ if __name__ == "__main__":
         else:
             url = sys.argv[1]
             cookie = sys.argv[2] if len(sys.argv) > 2 else None
-            result = extract_terabox(url, cookie)
+            startup = metrics.process_age()
+            result = metrics.add_startup(extract_terabox(url, cookie), startup)
         
         # Output only JSON
         print(json.dumps(result))
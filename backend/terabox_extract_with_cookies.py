@@ -7,30 +7,201 @@ Extracts download links from Terabox using authenticated API calls
 import sys
 import json
 import re
-import http.cookiejar
-import ssl
-
-try:
-    import requests
-    HAS_REQUESTS = True
-except ImportError:
-    HAS_REQUESTS = False
-    import urllib.request
-    import urllib.parse
+import os
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+import http_pool
+import cookie_store
+import cookie_pool
+import metrics
+from hedging import first_success
+from extract_cache import cached_extraction
 
 def load_cookies_from_file(cookie_file):
-    """Load cookies from Netscape format file"""
-    cookie_jar = http.cookiejar.MozillaCookieJar(cookie_file)
-    try:
-        cookie_jar.load(ignore_discard=True, ignore_expires=True)
-        return cookie_jar
-    except Exception as e:
-        return None
+    """Load cookies from Netscape format file (parsed once, reloaded when the file changes)"""
+    return cookie_store.load_jar(cookie_file)
+
+# Terabox mirror domains, in default priority order
+DOMAINS = [
+    'www.1024terabox.com',
+    'www.terabox.com',
+    'www.teraboxapp.com'
+]
+
+# Seconds between starting share/list on successive mirrors (0 = all at once)
+DOMAIN_STAGGER = float(os.environ.get('TERABOX_DOMAIN_STAGGER', '0.5'))
+# How long a winning mirror stays first in line
+DOMAIN_MEMORY = float(os.environ.get('TERABOX_DOMAIN_MEMORY', '600'))
+
+_last_winner = {'domain': None, 'at': 0.0}
+
+# share/list errno values caused by the share itself (missing, expired,
+# wrong password) rather than by the account making the request
+SHARE_ERRNOS = {2, -9, 105, 115, 145}
+
+# Folder shares: every file is returned, directories are listed page by
+# page, and download links are requested FID_BATCH fs_ids at a time with up
+# to LINK_CONCURRENCY requests in flight
+MAX_FILES = int(os.environ.get('TERABOX_MAX_FILES', '200'))
+FID_BATCH = int(os.environ.get('TERABOX_FID_BATCH', '20'))
+LINK_CONCURRENCY = int(os.environ.get('TERABOX_LINK_CONCURRENCY', '4'))
+PAGE_SIZE = 100
+
+API_PARAMS = "app_id=250528&web=1&channel=dubox&clienttype=0"
+
+def ordered_domains():
+    """Mirrors with the recent winner (if any) first"""
+    domain = _last_winner['domain']
+    if domain and time.time() - _last_winner['at'] < DOMAIN_MEMORY:
+        return [domain] + [d for d in DOMAINS if d != domain]
+    return list(DOMAINS)
+
+def remember_domain(domain):
+    _last_winner['domain'] = domain
+    _last_winner['at'] = time.time()
+
+def fetch_share_list(domain, share_id, headers, cookie_jar, path=None, page=1):
+    """share/list on one mirror (the share root, or a directory inside it)"""
+    if path is None:
+        info_url = f"https://{domain}/share/list?{API_PARAMS}&shorturl={share_id}&root=1&page={page}&num={PAGE_SIZE}"
+    else:
+        info_url = f"https://{domain}/share/list?{API_PARAMS}&shorturl={share_id}&dir={urllib.parse.quote(path)}&root=0&page={page}&num={PAGE_SIZE}"
+    
+    # Shared keep-alive pool (cookies are sent per request, never stored in it)
+    with metrics.timed('terabox_domain_duration_seconds', domain=domain, endpoint='share/list'):
+        return http_pool.fetch_json(
+            'GET', info_url, session='terabox', headers=headers,
+            cookies=cookie_jar, timeout=30, verify=False
+        )
+
+def share_list_ok(info_data):
+    return bool(info_data) and info_data.get('errno') == 0 and bool(info_data.get('list'))
+
+def is_dir(entry):
+    return str(entry.get('isdir', 0)) == '1'
+
+def list_pages(domain, share_id, headers, cookie_jar, path=None, first_page=None):
+    """Every entry of the share root or a directory, following pagination"""
+    data = first_page or fetch_share_list(domain, share_id, headers, cookie_jar, path)
+    entries = list(data.get('list') or [])
+    page = 1
+    
+    while len(data.get('list') or []) == PAGE_SIZE and len(entries) < MAX_FILES:
+        page += 1
+        data = fetch_share_list(domain, share_id, headers, cookie_jar, path, page)
+        if data.get('errno') != 0:
+            break
+        entries.extend(data.get('list') or [])
+    
+    return entries
 
+def collect_files(domain, share_id, info_data, headers, cookie_jar):
+    """
+    All files in the share (up to MAX_FILES), breadth-first; the directories
+    of each level are listed concurrently
+    """
+    entries = list_pages(domain, share_id, headers, cookie_jar, first_page=info_data)
+    files = []
+    
+    def list_dir(path):
+        try:
+            return list_pages(domain, share_id, headers, cookie_jar, path)
+        except Exception:
+            # One unreadable folder shouldn't sink the whole share
+            return []
+    
+    with ThreadPoolExecutor(max_workers=max(1, LINK_CONCURRENCY)) as executor:
+        while entries and len(files) < MAX_FILES:
+            files.extend(e for e in entries if not is_dir(e))
+            if len(files) >= MAX_FILES:
+                break
+            dirs = [e['path'] for e in entries if is_dir(e) and e.get('path')]
+            
+            listings = executor.map(list_dir, dirs)
+            entries = [entry for listing in listings for entry in listing]
+    
+    return files[:MAX_FILES]
+
+def fetch_dlinks(domains, info_data, fs_ids, headers, cookie_jar):
+    """(domain, {fs_id: dlink}) for one batch of fs_ids, trying the mirrors in order"""
+    for domain in domains:
+        try:
+            fid_list = urllib.parse.quote(json.dumps(fs_ids, separators=(',', ':')))
+            download_url = f"https://{domain}/share/download?{API_PARAMS}&sign={info_data['sign']}&timestamp={info_data['timestamp']}&shareid={info_data['shareid']}&uk={info_data['uk']}&primaryid={info_data['shareid']}&fid_list={fid_list}"
+            
+            with metrics.timed('terabox_domain_duration_seconds', domain=domain, endpoint='share/download'):
+                download_data = http_pool.fetch_json(
+                    'GET', download_url, session='terabox', headers=headers,
+                    cookies=cookie_jar, timeout=30, verify=False
+                )
+            
+            dlinks = {
+                item['fs_id']: item['dlink']
+                for item in download_data.get('list') or []
+                if item.get('dlink') and 'fs_id' in item
+            }
+            if dlinks:
+                return domain, dlinks
+        except Exception:
+            # Try next domain
+            continue
+    return None, {}
+
+def resolve_dlinks(domains, info_data, files, headers, cookie_jar):
+    """
+    {fs_id: (dlink, domain)} for every file: batches of FID_BATCH fs_ids,
+    up to LINK_CONCURRENCY batches in flight
+    """
+    fs_ids = [f['fs_id'] for f in files]
+    batches = [fs_ids[i:i + FID_BATCH] for i in range(0, len(fs_ids), max(1, FID_BATCH))]
+    
+    resolved = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(LINK_CONCURRENCY, len(batches)))) as executor:
+        for domain, dlinks in executor.map(
+            lambda batch: fetch_dlinks(domains, info_data, batch, headers, cookie_jar), batches
+        ):
+            for fs_id, dlink in dlinks.items():
+                resolved[fs_id] = (dlink, domain)
+    return resolved
+
+def file_entry(file_info, dlink):
+    file_size = file_info.get('size', 0)
+    thumbs = file_info.get('thumbs')
+    return {
+        "title": file_info.get('server_filename', 'Terabox File'),
+        "path": file_info.get('path', ''),
+        "download_link": dlink,
+        "thumbnail": thumbs.get('url3', '') if isinstance(thumbs, dict) else '',
+        "file_size": f"{file_size / (1024 * 1024):.2f} MB",
+        "size_bytes": file_size,
+        "fs_id": file_info.get('fs_id'),
+    }
+
+@cached_extraction('terabox-cookies', account='cookie_file')
 def extract_terabox_with_cookies(url, cookie_file):
     """
     Extract Terabox file using authenticated API with cookies
+    
+    cookie_file is the default account; TERABOX_COOKIE_POOL spreads requests
+    over several accounts and quarantines the ones that keep failing.
     """
+    timings = metrics.Timings('terabox-cookies')
+    pool = cookie_pool.get_pool('terabox', cookie_file)
+    if pool:
+        cookie_file = pool.acquire()
+    
+    result = extract_with_account(url, cookie_file, timings)
+    
+    if pool:
+        # Missing/expired shares aren't the account's fault
+        ok = result.get('success') or result.get('errno') in SHARE_ERRNOS
+        pool.report(cookie_file, ok, result.get('errno', result.get('error')))
+    
+    return timings.finish(result)
+
+def extract_with_account(url, cookie_file, timings=None):
+    """One extraction attempt with a single cookie file"""
     try:
         # Extract share ID
         match = re.search(r'/s/([a-zA-Z0-9_-]+)', url)
@@ -61,94 +232,67 @@ def extract_terabox_with_cookies(url, cookie_file):
             'Sec-Fetch-Site': 'same-origin'
         }
         
-        # Try multiple Terabox domains
-        domains = [
-            'www.1024terabox.com',
-            'www.terabox.com',
-            'www.teraboxapp.com'
-        ]
+        # Step 1: Get file info - fire share/list at the mirrors concurrently
+        # (staggered, last winner first) and keep the first errno == 0 answer
+        domains = ordered_domains()
+        errnos = []
+        
+        def probe(domain):
+            with metrics.stage(timings, f"share_list.{domain}"):
+                info = fetch_share_list(domain, share_id, headers, cookie_jar)
+            if isinstance(info, dict) and info.get('errno'):
+                errnos.append(info['errno'])
+            return info
         
-        for domain in domains:
-            try:
-                # Step 1: Get file info
-                info_url = f"https://{domain}/share/list?app_id=250528&web=1&channel=dubox&clienttype=0&shorturl={share_id}&root=1"
-                
-                if HAS_REQUESTS:
-                    # Use requests library (better SSL handling)
-                    session = requests.Session()
-                    
-                    # Convert cookie jar to requests format
-                    for cookie in cookie_jar:
-                        session.cookies.set(cookie.name, cookie.value, domain=cookie.domain, path=cookie.path)
-                    
-                    response = session.get(info_url, headers=headers, timeout=30, verify=False)
-                    info_data = response.json()
-                else:
-                    # Fallback to urllib with custom SSL context
-                    ctx = ssl.create_default_context()
-                    ctx.check_hostname = False
-                    ctx.verify_mode = ssl.CERT_NONE
-                    
-                    opener = urllib.request.build_opener(
-                        urllib.request.HTTPCookieProcessor(cookie_jar),
-                        urllib.request.HTTPSHandler(context=ctx)
-                    )
-                    
-                    req = urllib.request.Request(info_url, headers=headers)
-                    with opener.open(req, timeout=30) as response:
-                        info_data = json.loads(response.read().decode('utf-8'))
-                
-                # Check response
-                if info_data.get('errno') != 0:
-                    continue
-                
-                if not info_data.get('list') or len(info_data['list']) == 0:
-                    continue
-                
-                file_info = info_data['list'][0]
-                
-                # Step 2: Get download link
-                download_url = f"https://{domain}/share/download?app_id=250528&web=1&channel=dubox&clienttype=0&sign={info_data['sign']}&timestamp={info_data['timestamp']}&shareid={info_data['shareid']}&uk={info_data['uk']}&primaryid={info_data['shareid']}&fid_list=[{file_info['fs_id']}]"
-                
-                if HAS_REQUESTS:
-                    download_response = session.get(download_url, headers=headers, timeout=30, verify=False)
-                    download_data = download_response.json()
-                else:
-                    download_req = urllib.request.Request(download_url, headers=headers)
-                    with opener.open(download_req, timeout=30) as response:
-                        download_data = json.loads(response.read().decode('utf-8'))
-                
-                # Extract download link
-                dlink = None
-                if download_data.get('list') and len(download_data['list']) > 0:
-                    dlink = download_data['list'][0].get('dlink')
-                
-                if not dlink:
-                    continue
-                
-                # Success!
-                file_size = file_info.get('size', 0)
-                size_mb = file_size / (1024 * 1024)
-                
+        attempts = [(lambda domain=domain: probe(domain)) for domain in domains]
+        with metrics.stage(timings, 'share_list'):
+            index, info_data = first_success(attempts, DOMAIN_STAGGER, accept=share_list_ok)
+        
+        # How many mirrors came before the one that answered
+        metrics.inc('extract_fallback_depth_total', backend='terabox-cookies',
+                    depth=index if info_data is not None else 'exhausted')
+        
+        if info_data is not None:
+            winner = domains[index]
+            remember_domain(winner)
+            
+            # Step 2: Every file in the share (folders are walked on the winner)
+            with metrics.stage(timings, 'file_list'):
+                files = collect_files(winner, share_id, info_data, headers, cookie_jar)
+            
+            # Step 3: Download links in batched fid_list requests, winning domain first
+            with metrics.stage(timings, 'dlinks'):
+                resolved = resolve_dlinks([winner] + domains[:index] + domains[index + 1:], info_data, files, headers, cookie_jar)
+            
+            entries = [file_entry(f, resolved[f['fs_id']][0]) for f in files if f.get('fs_id') in resolved]
+            if entries:
+                # The first file stays at the top level for single-file callers
+                first = entries[0]
+                domain = resolved[first['fs_id']][1]
                 return {
                     "success": True,
-                    "title": file_info.get('server_filename', 'Terabox File'),
-                    "download_link": dlink,
-                    "thumbnail": file_info.get('thumbs', {}).get('url3', '') if isinstance(file_info.get('thumbs'), dict) else '',
-                    "file_size": f"{size_mb:.2f} MB",
-                    "size_bytes": file_size,
+                    "title": first['title'],
+                    "download_link": first['download_link'],
+                    "thumbnail": first['thumbnail'],
+                    "file_size": first['file_size'],
+                    "size_bytes": first['size_bytes'],
+                    "fs_id": first['fs_id'],
+                    "file_count": len(entries),
+                    "files": entries,
                     "extractor": f"terabox-authenticated-{domain}"
                 }
-                
-            except Exception as e:
-                # Try next domain
-                continue
         
         # All domains failed
-        return {
+        result = {
             "success": False,
             "error": "All Terabox domains failed. File may be private or require different authentication."
         }
+        if errnos:
+            result["errno"] = errnos[0]
+            # The mirrors that answered all say the share itself is gone
+            if all(errno in SHARE_ERRNOS for errno in errnos):
+                result["permanent"] = True
+        return result
         
     except Exception as e:
         return {
@@ -157,6 +301,17 @@ def extract_terabox_with_cookies(url, cookie_file):
         }
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        from extract_worker import main
+        main(sys.argv[2:], default_backend='terabox-cookies')
+        sys.exit(0)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--self-profile':
+        # Re-run this script under -X importtime and report startup cost
+        import startup_profile
+        startup_profile.self_profile(__file__, sys.argv[2:])
+        sys.exit(0)
+    
     try:
         if len(sys.argv) < 3:
             result = {
@@ -166,7 +321,8 @@ if __name__ == "__main__":
         else:
             url = sys.argv[1]
             cookie_file = sys.argv[2]
-            result = extract_terabox_with_cookies(url, cookie_file)
+            startup = metrics.process_age()
+            result = metrics.add_startup(extract_terabox_with_cookies(url, cookie_file), startup)
         
         print(json.dumps(result))
         
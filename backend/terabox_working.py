@@ -7,44 +7,35 @@ import sys
 import json
 import re
 import os
+import cookie_store
+import cookie_pool
+from extract_cache import cached_extraction
 
 # Suppress all warnings and debug output
 import warnings
 warnings.filterwarnings('ignore')
 
 # Redirect stderr to devnull to suppress package debug messages
-sys.stderr = open(os.devnull, 'w')
+# (only when run as a script - a persistent worker keeps its stderr, and so
+# does a -X importtime run from --self-profile)
+if __name__ == "__main__" and '--worker' not in sys.argv and 'importtime' not in sys._xoptions:
+    sys.stderr = open(os.devnull, 'w')
 
 try:
     from TeraboxDL import TeraboxDL
 except ImportError:
-    print(json.dumps({
-        "success": False,
-        "error": "terabox-downloader package not installed. Run: pip install terabox-downloader"
-    }), flush=True)
-    sys.exit(1)
+    TeraboxDL = None
 
 def extract_cookies_from_file(cookie_file):
     """Extract ndus and lang cookies from Netscape format file"""
     try:
-        ndus = None
-        lang = None
+        # Parsed once per file version by the shared cookie store
+        cookies = cookie_store.cookie_values(cookie_file)
+        if cookies is None:
+            return None, f"Failed to read cookie file: {cookie_file}"
         
-        with open(cookie_file, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith('#'):
-                    continue
-                
-                parts = line.split('\t')
-                if len(parts) >= 7:
-                    cookie_name = parts[5]
-                    cookie_value = parts[6]
-                    
-                    if cookie_name == 'ndus':
-                        ndus = cookie_value
-                    elif cookie_name == 'lang':
-                        lang = cookie_value
+        ndus = cookies.get('ndus')
+        lang = cookies.get('lang')
         
         if not ndus:
             return None, "ndus cookie not found in cookie file"
@@ -56,10 +47,33 @@ def extract_cookies_from_file(cookie_file):
     except Exception as e:
         return None, f"Failed to read cookie file: {str(e)}"
 
+@cached_extraction('terabox-working', account='cookie_file')
 def extract_terabox(url, cookie_file):
     """
     Extract Terabox file using terabox-downloader package
+    
+    cookie_file is the default account; TERABOX_COOKIE_POOL spreads requests
+    over several accounts and quarantines the ones that keep failing.
     """
+    pool = cookie_pool.get_pool('terabox', cookie_file)
+    if pool:
+        cookie_file = pool.acquire()
+    
+    result = extract_with_account(url, cookie_file)
+    
+    if pool:
+        pool.report(cookie_file, result.get('success'), result.get('error'))
+    
+    return result
+
+def extract_with_account(url, cookie_file):
+    """One extraction attempt with a single cookie file"""
+    if TeraboxDL is None:
+        return {
+            "success": False,
+            "error": "terabox-downloader package not installed. Run: pip install terabox-downloader"
+        }
+    
     try:
         # Extract cookies
         cookie_string, error = extract_cookies_from_file(cookie_file)
@@ -100,6 +114,17 @@ def extract_terabox(url, cookie_file):
         }
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        from extract_worker import main
+        main(sys.argv[2:], default_backend='terabox-working')
+        sys.exit(0)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--self-profile':
+        # Re-run this script under -X importtime and report startup cost
+        import startup_profile
+        startup_profile.self_profile(__file__, sys.argv[2:])
+        sys.exit(0)
+    
     try:
         if len(sys.argv) < 3:
             result = {
@@ -0,0 +1,68 @@
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask')
+pytest.importorskip('flask_cors')
+
+import app as app_module
+from bounded_pool import BoundedPool
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, 'extract_pool', BoundedPool(4, 4))
+    monkeypatch.setattr(app_module, 'BATCH_CONCURRENCY', 2)
+    return app_module.app.test_client()
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_batch_limits_its_own_concurrency(client, monkeypatch):
+    lock = threading.Lock()
+    running = [0, 0]  # current, peak
+
+    def extract_info(url, progress=None):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return {'url': url}
+
+    monkeypatch.setattr(app_module, 'extract_info', extract_info)
+    urls = [f'https://vimeo.com/{n}' for n in range(10)]
+    lines = _lines(client.post('/api/extract/batch', json={'urls': urls}))
+
+    assert sorted(line['index'] for line in lines) == list(range(10))
+    assert all(line['result'] == {'url': urls[line['index']]} for line in lines)
+    assert running[1] <= 2
+    assert app_module.extract_pool.stats()['rejected'] == 0
+
+
+def test_batch_timeout_is_per_url(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'EXTRACT_TIMEOUT', 0.2)
+    release = threading.Event()
+
+    def extract_info(url, progress=None):
+        if url.endswith('/slow'):
+            release.wait(2)
+        else:
+            time.sleep(0.05)
+        return {'url': url}
+
+    monkeypatch.setattr(app_module, 'extract_info', extract_info)
+    urls = ['https://vimeo.com/slow'] + [f'https://vimeo.com/{n}' for n in range(6)]
+    lines = _lines(client.post('/api/extract/batch', json={'urls': urls}))
+    release.set()
+
+    by_index = {line['index']: line for line in lines}
+    assert by_index[0]['error'] == 'Extraction timed out'
+    # Six 50ms URLs through the one free slot take longer than the timeout
+    # in total, but none of them individually times out
+    assert all('result' in by_index[n] for n in range(1, 7))
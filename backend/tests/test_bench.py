@@ -0,0 +1,33 @@
+import pytest
+
+from bench.run import _options, _timed
+
+
+@pytest.mark.parametrize('result, ok', [
+    ({'success': True, 'download_link': 'https://d.terabox.com/f'}, True),
+    ({'title': 'video', 'qualities': []}, True),
+    ({'success': False, 'error': 'Invalid share link'}, False),
+    ({'error': 'Extraction error: HTTP Error 503'}, False),
+    ({}, False),
+    (None, False),
+])
+def test_timed_classifies_results(result, ok):
+    ms, classified = _timed(lambda n: result, 0)
+    assert classified is ok
+    assert ms >= 0
+
+
+def test_timed_counts_exceptions_as_errors():
+    def call(n):
+        raise RuntimeError('boom')
+
+    assert _timed(call, 0)[1] is False
+
+
+def test_options():
+    options = _options(['--iterations', '5', '--host-fail', 'terabox.com=0.5', '--fail-rate', '1'])
+    assert options['iterations'] == 5
+    assert options['fail_rate'] == 1.0
+    assert options['host_fail'] == {'terabox.com': 0.5}
+    with pytest.raises(ValueError):
+        _options(['--nope', '1'])
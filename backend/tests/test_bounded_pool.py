@@ -0,0 +1,30 @@
+import threading
+
+import pytest
+
+from bounded_pool import BoundedPool, PoolSaturated
+
+
+def test_rejects_beyond_concurrency_and_queue():
+    pool = BoundedPool(concurrency=1, queue_depth=1)
+    release = threading.Event()
+    pool.submit(release.wait, 2)
+    pool.submit(release.wait, 2)
+    with pytest.raises(PoolSaturated):
+        pool.submit(release.wait, 2)
+    release.set()
+
+
+def test_cancelled_task_frees_its_slot():
+    pool = BoundedPool(concurrency=1, queue_depth=1)
+    release = threading.Event()
+    running = pool.submit(release.wait, 2)
+    queued = pool.submit(release.wait, 2)
+
+    assert queued.cancel()
+    assert pool.stats()['pending'] == 1
+    assert pool.stats()['cancelled'] == 1
+    pool.submit(lambda: None)
+
+    release.set()
+    running.result(2)
@@ -0,0 +1,185 @@
+import sys
+import time
+import types
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, Breaker, CircuitOpen
+
+
+def test_opens_after_consecutive_failures():
+    breaker = Breaker('test', failure_threshold=3, cooldown=60)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record(False)
+    assert breaker.state == CLOSED
+
+    # A success resets the count
+    assert breaker.allow()
+    breaker.record(True)
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record(False)
+
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+    assert breaker.stats()['rejected'] == 1
+    assert 0 < breaker.retry_after() <= 60
+
+
+def test_half_open_trial_closes_on_success():
+    breaker = Breaker('test', failure_threshold=1, cooldown=0.05, half_open_calls=1)
+    breaker.allow()
+    breaker.record(False)
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # Only one trial at a time
+    assert not breaker.allow()
+
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_trial_doubles_the_cooldown():
+    breaker = Breaker('test', failure_threshold=1, cooldown=0.05, max_cooldown=0.15)
+    breaker.allow()
+    breaker.record(False)
+
+    for expected in (0.1, 0.15):
+        time.sleep(breaker.cooldown + 0.01)
+        assert breaker.allow()
+        breaker.record(False)
+        assert breaker.state == OPEN
+        assert breaker.cooldown == pytest.approx(expected)
+
+    time.sleep(breaker.cooldown + 0.01)
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.cooldown == 0.05
+
+
+def test_check_raises_when_open(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+    monkeypatch.setattr(circuit_breaker, 'BREAKERS_ENABLED', True)
+    breaker = circuit_breaker.get_breaker('host.example')
+    breaker.failure_threshold = 1
+    breaker.allow()
+    breaker.record(False)
+
+    with pytest.raises(CircuitOpen) as error:
+        circuit_breaker.check('host.example')
+    assert error.value.name == 'host.example'
+    assert circuit_breaker.stats()['host.example']['state'] == OPEN
+
+
+def test_disabled_breakers_pass_through(monkeypatch):
+    monkeypatch.setattr(circuit_breaker, 'BREAKERS_ENABLED', False)
+    assert circuit_breaker.get_breaker('host.example') is None
+    assert circuit_breaker.check('host.example') is None
+
+
+class _Stats:
+    def __init__(self):
+        self.records = []
+
+    def record(self, name, success, latency):
+        self.records.append((name, success))
+
+
+@pytest.mark.parametrize('message, client_fault', [
+    ('ERROR: [youtube] abc: Private video. Sign in if you have been granted access', False),
+    ('ERROR: [youtube] abc: HTTP Error 403: Forbidden', True),
+])
+def test_video_errors_do_not_count_against_the_client(monkeypatch, message, client_fault):
+    import ytdlp_extract
+
+    class YoutubeDL:
+        def __init__(self, params):
+            pass
+
+        def extract_info(self, url, download=False):
+            raise Exception(message)
+
+        def close(self):
+            pass
+
+    monkeypatch.setitem(sys.modules, 'yt_dlp', types.SimpleNamespace(YoutubeDL=YoutubeDL))
+    breaker = Breaker('ytdlp-client:ios', failure_threshold=1)
+    monkeypatch.setattr(circuit_breaker, 'get_breaker', lambda name: breaker)
+    stats = _Stats()
+    monkeypatch.setattr(ytdlp_extract, 'client_stats', stats)
+
+    result = ytdlp_extract.extract_with_client(
+        'https://www.youtube.com/watch?v=abcdefghijk', {}, {'name': 'ios', 'client': ['ios']}
+    )
+
+    assert result is None
+    assert stats.records == ([('ios', False)] if client_fault else [])
+    assert breaker.state == (OPEN if client_fault else CLOSED)
+
+
+def _failing_ytdlp(monkeypatch, message):
+    class YoutubeDL:
+        def __init__(self, params):
+            self.params = params
+
+        def extract_info(self, url, download=False):
+            raise Exception(message.format(cookiefile=self.params.get('cookiefile')))
+
+        def close(self):
+            pass
+
+    monkeypatch.setitem(sys.modules, 'yt_dlp', types.SimpleNamespace(YoutubeDL=YoutubeDL))
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+    monkeypatch.setattr(circuit_breaker, 'BREAKERS_ENABLED', True)
+
+
+def test_client_breakers_are_per_account(monkeypatch, tmp_path):
+    import extract_cache
+    import ytdlp_extract
+
+    _failing_ytdlp(monkeypatch, "ERROR: [youtube] abc: Sign in to confirm you're not a bot ({cookiefile})")
+    monkeypatch.setattr(ytdlp_extract, 'client_stats', None)
+    bad, good = str(tmp_path / 'bad.txt'), str(tmp_path / 'good.txt')
+    client = {'name': 'ios', 'client': ['ios']}
+
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD):
+        ytdlp_extract.extract_with_client('https://youtu.be/abcdefghijk', {'cookiefile': bad}, client)
+
+    failures = []
+    ytdlp_extract.extract_with_client('https://youtu.be/abcdefghijk', {'cookiefile': good}, client, failures=failures)
+    # The other account's client still ran
+    assert failures and 'good.txt' in failures[0]
+
+    states = {name: breaker['state'] for name, breaker in circuit_breaker.stats().items()}
+    assert states == {
+        f"ytdlp-client:ios@{extract_cache.account_key(bad)}": OPEN,
+        f"ytdlp-client:ios@{extract_cache.account_key(good)}": CLOSED,
+    }
+
+
+def test_cookie_account_not_blamed_when_no_client_ran(monkeypatch, tmp_path):
+    import cookie_pool
+    import extract_cache
+    import ytdlp_extract
+
+    _failing_ytdlp(monkeypatch, 'should not run')
+    monkeypatch.setattr(ytdlp_extract, 'client_stats', None)
+    monkeypatch.setattr(extract_cache, 'CACHE_ENABLED', False)
+    monkeypatch.setattr(cookie_pool, '_pools', {})
+    monkeypatch.delenv('YOUTUBE_COOKIE_POOL', raising=False)
+    cookies = str(tmp_path / 'cookies.txt')
+
+    for extractor in ytdlp_extract.EXTRACTORS:
+        breaker = circuit_breaker.get_breaker(f"ytdlp-client:{extractor['name']}@{extract_cache.account_key(cookies)}")
+        breaker._open()
+
+    result = ytdlp_extract.extract_video('https://youtu.be/abcdefghijk', cookies, race=False)
+
+    assert result['error'] == 'All extractors failed'
+    assert cookie_pool.get_pool('youtube', cookies).stats()[cookies]['failures'] == 0
@@ -0,0 +1,186 @@
+import time
+import threading
+
+import pytest
+
+import extract_cache
+from extract_cache import ResultCache, cached_extraction, canonical_key
+from singleflight import SingleFlight
+
+
+@pytest.mark.parametrize('url', [
+    'https://www.youtube.com/watch?v=abcdefghijk',
+    'https://m.youtube.com/watch?v=abcdefghijk&feature=share',
+    'https://music.youtube.com/watch?v=abcdefghijk',
+    'https://youtu.be/abcdefghijk?si=xyz',
+    'https://www.youtube.com/shorts/abcdefghijk',
+    'https://www.youtube-nocookie.com/embed/abcdefghijk',
+])
+def test_youtube_urls_share_a_key(url):
+    assert canonical_key(url) == 'youtube:abcdefghijk'
+
+
+@pytest.mark.parametrize('url', [
+    'https://notyoutube.com/watch?v=abcdefghijk',
+    'https://evilyoutube.com/watch?v=abcdefghijk',
+    'https://youtube.com.evil.example/watch?v=abcdefghijk',
+    'https://notyoutu.be/abcdefghijk',
+])
+def test_lookalike_hosts_are_not_youtube(url):
+    assert not canonical_key(url).startswith('youtube:')
+
+
+def test_terabox_mirrors_share_a_key():
+    assert canonical_key('https://www.1024terabox.com/s/1abcDEF') == 'terabox:1abcDEF'
+    assert canonical_key('https://teraboxapp.com/s/1abcDEF') == 'terabox:1abcDEF'
+    assert canonical_key('https://www.terabox.com/sharing/link?surl=abcDEF') == 'terabox:1abcDEF'
+    assert not canonical_key('https://terabox.com.evil.example/s/1abcDEF').startswith('terabox:')
+
+
+def test_tracking_params_are_dropped():
+    assert canonical_key('https://vimeo.com/123/?utm_source=x&fbclid=y') == canonical_key('https://vimeo.com/123')
+
+
+def test_entries_expire():
+    cache = ResultCache(sqlite_path=None)
+    cache.set('k', {'title': 'a'}, ttl=0.05)
+    assert cache.get('k') == {'title': 'a'}
+    time.sleep(0.1)
+    assert cache.get('k') is None
+    assert cache.stats()['expired'] == 1
+
+
+def test_ttl_follows_signed_url_expiry():
+    soon = int(time.time()) + extract_cache.EXPIRY_MARGIN + 60
+    result = {'qualities': [{'url': f'https://rr1.googlevideo.com/videoplayback?expire={soon}'}]}
+    assert 0 < extract_cache.result_ttl(result, 1800) <= 60
+
+    expired = {'qualities': [{'url': f'https://rr1.googlevideo.com/videoplayback?expire={int(time.time())}'}]}
+    cache = ResultCache(sqlite_path=None)
+    cache.set('k', expired)
+    assert cache.get('k') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    value = {'data': 'x' * 100}
+    cache = ResultCache(max_bytes=300, sqlite_path=None)
+    cache.set('a', value, ttl=60)
+    cache.set('b', value, ttl=60)
+    cache.get('a')
+    cache.set('c', value, ttl=60)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == value
+    assert cache.get('c') == value
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] <= 300
+
+
+def test_hits_return_copies():
+    cache = ResultCache(sqlite_path=None)
+    cache.set('k', {'qualities': [{'url': 'u'}]}, ttl=60)
+    cache.get('k')['qualities'].clear()
+    assert cache.get('k') == {'qualities': [{'url': 'u'}]}
+
+
+def test_sqlite_tier_is_shared(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    ResultCache(sqlite_path=path).set('k', {'title': 'a'}, ttl=60)
+
+    other = ResultCache(sqlite_path=path)
+    assert other.get('k') == {'title': 'a'}
+    assert other.stats()['disk_hits'] == 1
+
+
+def test_cached_extraction_keys_by_cookie_file(monkeypatch):
+    monkeypatch.setattr(extract_cache, 'result_cache', ResultCache(sqlite_path=None))
+    monkeypatch.setattr(extract_cache, 'CACHE_ENABLED', True)
+    calls = []
+
+    @cached_extraction('test', account='cookie_file')
+    def extract(url, cookie_file=None):
+        calls.append(cookie_file)
+        return {'title': cookie_file}
+
+    url = 'https://www.youtube.com/watch?v=abcdefghijk'
+    assert extract(url, 'a.txt') == {'title': 'a.txt'}
+    assert extract(url, cookie_file='b.txt') == {'title': 'b.txt'}
+    assert extract('https://youtu.be/abcdefghijk', 'a.txt') == {'title': 'a.txt'}
+    assert calls == ['a.txt', 'b.txt']
+
+
+def test_permanent_failures_are_cached_briefly(monkeypatch):
+    monkeypatch.setattr(extract_cache, 'result_cache', ResultCache(sqlite_path=None))
+    monkeypatch.setattr(extract_cache, 'CACHE_ENABLED', True)
+    monkeypatch.setattr(extract_cache, 'NEGATIVE_TTL', 60)
+    calls = []
+
+    @cached_extraction('test')
+    def extract(url):
+        calls.append(url)
+        return {'error': 'gone', 'permanent': True} if 'dead' in url else {'error': 'busy'}
+
+    extract('https://vimeo.com/dead')
+    extract('https://vimeo.com/dead')
+    extract('https://vimeo.com/busy')
+    extract('https://vimeo.com/busy')
+    assert calls == ['https://vimeo.com/dead', 'https://vimeo.com/busy', 'https://vimeo.com/busy']
+
+
+def test_singleflight_coalesces_concurrent_calls():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(2)
+        return 'done'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do('k', slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flights.stats()['coalesced'] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ['done'] * 5
+
+
+def test_singleflight_followers_get_copies():
+    flights = SingleFlight()
+    release = threading.Event()
+
+    def slow():
+        release.wait(2)
+        return {'qualities': [{'url': 'u'}]}
+
+    results = []
+
+    def leader():
+        result = flights.do('k', slow)
+        result['qualities'].clear()
+        results.append(result)
+
+    def follower():
+        results.append(flights.do('k', slow))
+
+    threads = [threading.Thread(target=leader)] + [threading.Thread(target=follower) for _ in range(2)]
+    threads[0].start()
+    while flights.stats()['in_flight'] < 1:
+        time.sleep(0.01)
+    for thread in threads[1:]:
+        thread.start()
+    while flights.stats()['coalesced'] < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    copies = [result for result in results if result['qualities']]
+    assert len(copies) == 2
+    assert copies[0] is not copies[1]
@@ -0,0 +1,188 @@
+import random
+
+import pytest
+
+from extractor.formatting import format_size
+from format_select import top_formats, top_formats_by_quality
+from ytdlp_extract import build_result
+
+
+# The selection code before format_select.py, kept verbatim as the reference
+
+def old_build_result_formats(info):
+    formats = []
+    for fmt in info['formats']:
+        if fmt.get('url'):
+            formats.append({
+                'format_id': fmt.get('format_id', ''),
+                'ext': fmt.get('ext', 'mp4'),
+                'quality': fmt.get('format_note', ''),
+                'height': fmt.get('height', 0),
+                'width': fmt.get('width', 0),
+                'filesize': fmt.get('filesize', 0),
+                'vcodec': fmt.get('vcodec', 'none'),
+                'acodec': fmt.get('acodec', 'none'),
+                'url': fmt.get('url', ''),
+                'abr': fmt.get('abr', 0),
+                'tbr': fmt.get('tbr', 0)
+            })
+
+    qualities = []
+    audio = []
+    video_formats = [f for f in formats if f['vcodec'] != 'none' and f['url']]
+    audio_formats = [f for f in formats if f['vcodec'] == 'none' and f['acodec'] != 'none' and f['url']]
+
+    video_formats.sort(key=lambda x: x['height'] or 0, reverse=True)
+    for fmt in video_formats[:5]:
+        quality_label = f"{fmt['height']}p" if fmt['height'] else (fmt['quality'] or 'Unknown')
+        size_mb = f"{fmt['filesize'] / (1024*1024):.2f} MB" if fmt['filesize'] else 'Unknown'
+        qualities.append({
+            'quality': quality_label,
+            'format': fmt['ext'] or 'mp4',
+            'size': size_mb,
+            'url': fmt['url'],
+            'hasAudio': fmt['acodec'] != 'none',
+            'hasVideo': fmt['vcodec'] != 'none'
+        })
+
+    audio_formats.sort(key=lambda x: x['abr'] or x['tbr'] or 0, reverse=True)
+    for fmt in audio_formats[:3]:
+        quality_label = f"{int(fmt['abr'])}kbps" if fmt['abr'] else (f"{int(fmt['tbr'])}kbps" if fmt['tbr'] else '128kbps')
+        size_mb = f"{fmt['filesize'] / (1024*1024):.2f} MB" if fmt['filesize'] else 'Unknown'
+        audio.append({
+            'quality': quality_label,
+            'format': fmt['ext'] or 'mp3',
+            'size': size_mb,
+            'url': fmt['url']
+        })
+    return qualities, audio
+
+
+def old_app_formats(formats):
+    video_formats = []
+    audio_formats = []
+    for f in formats:
+        if f.get('vcodec') != 'none' and f.get('acodec') != 'none':
+            quality = f.get('format_note', f.get('height', 'unknown'))
+            if isinstance(quality, int):
+                quality = f"{quality}p"
+            video_formats.append({
+                'quality': quality,
+                'format': f.get('ext', 'mp4'),
+                'size': format_size(f.get('filesize') or f.get('filesize_approx', 0)),
+                'url': f.get('url', ''),
+                'width': f.get('width'),
+                'height': f.get('height'),
+                'fps': f.get('fps')
+            })
+        elif f.get('acodec') != 'none' and f.get('vcodec') == 'none':
+            bitrate = f.get('abr', 128)
+            audio_formats.append({
+                'quality': f"{int(bitrate)}kbps",
+                'format': f.get('ext', 'mp3'),
+                'size': format_size(f.get('filesize') or f.get('filesize_approx', 0)),
+                'url': f.get('url', '')
+            })
+
+    video_formats = sorted(
+        {v['quality']: v for v in video_formats}.values(),
+        key=lambda x: x.get('height', 0),
+        reverse=True
+    )[:10]
+    audio_formats = sorted(
+        {a['quality']: a for a in audio_formats}.values(),
+        key=lambda x: int(x['quality'].replace('kbps', '')),
+        reverse=True
+    )[:5]
+    return video_formats, audio_formats
+
+
+def new_app_formats(formats):
+    """The generic backend's mapping of top_formats_by_quality records"""
+    video, audio = top_formats_by_quality(formats, video_limit=10, audio_limit=5)
+    return (
+        [{'quality': f.quality, 'format': f.ext or 'mp4', 'size': format_size(f.filesize), 'url': f.url,
+          'width': f.width, 'height': f.height, 'fps': f.fps} for f in video],
+        [{'quality': f.quality, 'format': f.ext or 'mp3', 'size': format_size(f.filesize), 'url': f.url}
+         for f in audio],
+    )
+
+
+MISSING = object()
+
+
+def _put(fmt, key, choices, rng):
+    value = rng.choice(choices)
+    if value is not MISSING:
+        fmt[key] = value
+
+
+def random_formats(rng, n, nullable_height=True, nullable_abr=True):
+    """
+    yt-dlp-like format lists with many ties. The old app.py code raised on
+    None heights/abr, so those are only generated where the old code ran.
+    """
+    heights = [144, 360, 360, 720, 720, 1080] + ([None, MISSING] if nullable_height else [])
+    abrs = [MISSING, 0, 48, 128, 129.6, 160, 160.0] + ([None] if nullable_abr else [])
+    formats = []
+    for i in range(n):
+        fmt = {'format_id': str(i), 'ext': rng.choice(['mp4', 'webm', 'm4a'])}
+        _put(fmt, 'url', [f"https://cdn.example/{i}", f"https://cdn.example/{i}", '', MISSING], rng)
+        _put(fmt, 'vcodec', ['none', 'avc1', 'vp9', MISSING], rng)
+        _put(fmt, 'acodec', ['none', 'mp4a', 'opus', MISSING], rng)
+        _put(fmt, 'height', heights, rng)
+        _put(fmt, 'width', [None, 640, 1280, MISSING], rng)
+        _put(fmt, 'fps', [None, 30, 60], rng)
+        _put(fmt, 'format_note', ['360p', '720p', 'medium', 'low', '', None, MISSING], rng)
+        _put(fmt, 'abr', abrs, rng)
+        _put(fmt, 'tbr', [MISSING, None, 0, 96.5, 256], rng)
+        _put(fmt, 'filesize', [MISSING, None, 0, 500, 3 * 1024 * 1024], rng)
+        formats.append(fmt)
+    return formats
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_ytdlp_selection_matches_old_build_result(seed):
+    rng = random.Random(seed)
+    info = {'formats': random_formats(rng, rng.randint(0, 40))}
+
+    result = build_result(info, 'ios')
+    # format_id was added to the output later (media cache keys)
+    for fmt in result['qualities'] + result['audioFormats']:
+        fmt.pop('format_id', None)
+
+    qualities, audio = old_build_result_formats(info)
+    assert result['qualities'] == qualities
+    assert result['audioFormats'] == audio
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_app_selection_matches_old_app_code(seed):
+    rng = random.Random(seed)
+    formats = random_formats(rng, rng.randint(0, 40), nullable_height=False, nullable_abr=False)
+    # Old app.py sorted muxed formats on a None height when it was missing
+    for fmt in formats:
+        fmt.setdefault('height', 360)
+
+    assert new_app_formats(formats) == old_app_formats(formats)
+
+
+def test_ties_keep_input_order():
+    formats = [{'url': f'u{i}', 'vcodec': 'avc1', 'acodec': 'mp4a', 'height': 720} for i in range(8)]
+    video, _ = top_formats(formats)
+    assert [f.url for f in video] == ['u0', 'u1', 'u2', 'u3', 'u4']
+
+
+def test_documented_differences():
+    # ytdlp_extract falls back to filesize_approx, as app.py did
+    video, _ = top_formats([{'url': 'u', 'vcodec': 'avc1', 'height': 360, 'filesize_approx': 2048}])
+    assert video[0].filesize == 2048
+
+    # Null abr / height no longer raise in the app.py selection
+    video, audio = top_formats_by_quality([
+        {'url': 'a', 'vcodec': 'none', 'acodec': 'opus', 'abr': None},
+        {'url': 'v1', 'vcodec': 'avc1', 'acodec': 'mp4a', 'height': None, 'format_note': 'low'},
+        {'url': 'v2', 'vcodec': 'avc1', 'acodec': 'mp4a', 'height': 720, 'format_note': 'hd'},
+    ])
+    assert [f.quality for f in audio] == ['128kbps']
+    assert [f.url for f in video] == ['v2', 'v1']
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from hedging import first_success
+
+
+def recorder():
+    """Attempt factory that records when each attempt started"""
+    started = {}
+    origin = time.monotonic()
+
+    def attempt(index, result=None, delay=0.0, error=None):
+        def run():
+            started[index] = time.monotonic() - origin
+            time.sleep(delay)
+            if error:
+                raise error
+            return result
+        return run
+
+    return attempt, started
+
+
+def test_first_attempt_wins_without_starting_the_rest():
+    attempt, started = recorder()
+    attempts = [attempt(0, 'a'), attempt(1, 'b')]
+
+    assert first_success(attempts, stagger=0.5) == (0, 'a')
+    assert list(started) == [0]
+
+
+def test_next_attempt_starts_after_the_stagger():
+    attempt, started = recorder()
+    # The first attempt is slow, so the hedge fires and wins
+    attempts = [attempt(0, 'slow', delay=1.0), attempt(1, 'fast')]
+
+    assert first_success(attempts, stagger=0.2) == (1, 'fast')
+    assert 0.15 <= started[1] < 0.6
+
+
+def test_failure_starts_the_next_attempt_early():
+    attempt, started = recorder()
+    attempts = [attempt(0, None), attempt(1, 'b')]
+
+    assert first_success(attempts, stagger=5) == (1, 'b')
+    assert started[1] < 1
+
+
+def test_exception_counts_as_failure():
+    attempt, started = recorder()
+    attempts = [attempt(0, error=RuntimeError('boom')), attempt(1, 'b')]
+
+    assert first_success(attempts, stagger=5) == (1, 'b')
+    assert started[1] < 1
+
+
+def test_accept_filters_results():
+    attempt, _ = recorder()
+    attempts = [attempt(0, {'errno': -9}), attempt(1, {'errno': 0})]
+
+    index, result = first_success(attempts, stagger=5, accept=lambda r: r and r['errno'] == 0)
+
+    assert (index, result) == (1, {'errno': 0})
+
+
+def test_all_failed_returns_none():
+    attempt, started = recorder()
+    attempts = [attempt(0, None), attempt(1, error=ValueError()), attempt(2, '')]
+
+    assert first_success(attempts, stagger=5) == (None, None)
+    assert sorted(started) == [0, 1, 2]
+
+
+def test_no_attempts():
+    assert first_success([], stagger=1) == (None, None)
+
+
+def test_late_winner_is_returned_over_earlier_failures():
+    release = threading.Event()
+
+    def slow_winner():
+        release.wait(2)
+        return 'late'
+
+    def failing():
+        release.set()
+        return None
+
+    # The first attempt only succeeds after the hedge has failed
+    assert first_success([slow_winner, failing], stagger=0.05) == (0, 'late')
@@ -0,0 +1,55 @@
+import http.cookiejar
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import http_pool
+
+
+class _Handler(BaseHTTPRequestHandler):
+    cookies_seen = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.cookies_seen.append(self.headers.get('Cookie'))
+        self.send_response(200)
+        self.send_header('Set-Cookie', 'session=from-response; Path=/')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+
+@pytest.fixture
+def server():
+    httpd = HTTPServer(('127.0.0.1', 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True).start()
+    _Handler.cookies_seen = []
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _jar():
+    jar = http.cookiejar.CookieJar()
+    jar.set_cookie(http.cookiejar.Cookie(
+        0, 'ndus', 'account', None, False, '127.0.0.1', False, False, '/', True,
+        False, None, False, None, None, {}
+    ))
+    return jar
+
+
+def test_urllib_fallback_never_writes_the_callers_jar(server, monkeypatch):
+    monkeypatch.setattr(http_pool, 'get_session', lambda *args, **kwargs: None)
+    jar = _jar()
+
+    for _ in range(2):
+        with http_pool.stream('GET', f"{server}/", cookies=jar) as (status, headers, chunks):
+            assert status == 200
+            b''.join(chunks)
+
+    assert [cookie.name for cookie in jar] == ['ndus']
+    assert _Handler.cookies_seen == ['ndus=account', 'ndus=account']
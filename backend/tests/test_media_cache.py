@@ -0,0 +1,81 @@
+import contextlib
+import os
+import time
+
+import terabox_download
+from media_cache import MediaCache, media_key
+
+
+def fake_download(monkeypatch, body):
+    def download(url, dest, size_bytes=None, cookie_file=None, *args, **kwargs):
+        with open(dest, 'wb') as f:
+            f.write(body)
+        return {'success': True, 'path': dest, 'size_bytes': len(body)}
+
+    monkeypatch.setattr(terabox_download, 'download', download)
+
+
+def fill(cache, key, size):
+    cache.fill(key, 'https://d.terabox.com/f', size)
+    # Fills run on a daemon thread; wait for it
+    while cache.stats()['filling']:
+        time.sleep(0.01)
+
+
+def test_media_key():
+    assert media_key('https://www.terabox.com/s/1abc', {'fs_id': 42}) == 'terabox-fs:42'
+    assert media_key('https://youtu.be/abcdefghijk', {}, {'format_id': '18'}) == 'youtube:abcdefghijk:18'
+    assert media_key('https://vimeo.com/1', {}, {'format_id': 'hd'}) is None
+
+
+def test_fill_then_read(monkeypatch, tmp_path):
+    fake_download(monkeypatch, b'0123456789')
+    cache = MediaCache(str(tmp_path))
+    fill(cache, 'terabox-fs:1', 10)
+
+    assert cache.read_range('terabox-fs:1', 2, 5) == b'2345'
+    assert cache.read_range('terabox-fs:2') is None
+    assert sorted(os.listdir(tmp_path)) == sorted(f"{cache._name('terabox-fs:1')}{suffix}" for suffix in ('.bin', '.json'))
+
+
+def test_least_recently_used_file_is_evicted(monkeypatch, tmp_path):
+    fake_download(monkeypatch, b'x' * 100)
+    cache = MediaCache(str(tmp_path), max_bytes=250)
+    fill(cache, 'a', 100)
+    fill(cache, 'b', 100)
+    cache.lookup('a')
+    fill(cache, 'c', 100)
+
+    assert cache.lookup('b') is None
+    assert cache.lookup('a') is not None
+    assert cache.lookup('c') is not None
+    assert cache.stats()['evictions'] == 1
+    assert not os.path.exists(cache._path(cache._name('b')))
+
+
+def test_oversized_files_are_not_cached(tmp_path):
+    cache = MediaCache(str(tmp_path), max_file_bytes=10)
+    assert cache.fill('a', 'https://d.terabox.com/f', 11) is False
+    assert cache.fill('a', 'https://d.terabox.com/f', None) is False
+
+
+def test_index_is_rebuilt_from_disk(monkeypatch, tmp_path):
+    fake_download(monkeypatch, b'abc')
+    fill(MediaCache(str(tmp_path)), 'a', 3)
+    assert MediaCache(str(tmp_path)).read_range('a') == b'abc'
+
+
+def test_tls_is_verified_outside_terabox(monkeypatch):
+    calls = []
+
+    @contextlib.contextmanager
+    def stream(method, url, verify=True, **kwargs):
+        calls.append(verify)
+        yield 200, {}, iter(())
+
+    monkeypatch.setattr(terabox_download.http_pool, 'stream', stream)
+    with terabox_download._stream('https://d.terabox.com/f', None):
+        pass
+    with terabox_download._stream('https://rr1.googlevideo.com/videoplayback', None):
+        pass
+    assert calls == [False, True]
@@ -0,0 +1,211 @@
+import asyncio
+import socket
+import sys
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import media_relay
+from terabox_download import is_terabox_host
+
+
+@pytest.mark.parametrize('host, expected', [
+    ('d.terabox.com', True),
+    ('terabox.com', True),
+    ('data.1024tera.com', True),
+    ('d8.freeterabox.com', True),
+    ('terabox.attacker.example', False),
+    ('myterabox.com', False),
+    ('terabox.com.attacker.example', False),
+    ('', False),
+])
+def test_terabox_host_matching(host, expected):
+    assert is_terabox_host(host) is expected
+
+
+def test_upstream_allowlist():
+    assert media_relay._allowed_host('rr3---sn-abc.googlevideo.com')
+    assert media_relay._allowed_host('D.TeraBox.com.')
+    assert not media_relay._allowed_host('evilgooglevideo.com')
+    assert not media_relay._allowed_host('127.0.0.1')
+    assert not media_relay._allowed_host('metadata.google.internal')
+
+
+def relay(target, method='GET'):
+    """Run one request through handle_client; returns the raw response"""
+    async def run():
+        client, server = socket.socketpair()
+        client.setblocking(False)
+        server.setblocking(False)
+        loop = asyncio.get_running_loop()
+        await loop.sock_sendall(client, f"{method} {target} HTTP/1.1\r\nHost: relay\r\n\r\n".encode())
+        await media_relay.handle_client(server)
+        response = bytearray()
+        while True:
+            data = await loop.sock_recv(client, 65536)
+            if not data:
+                break
+            response += data
+        client.close()
+        return bytes(response)
+
+    return asyncio.run(run())
+
+
+def status(response):
+    return int(response.split(b' ', 2)[1])
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    methods = []
+    headers_seen = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, body):
+        self.methods.append(self.command)
+        self.headers_seen.append(dict(self.headers))
+        if self.path == '/garbage':
+            self.wfile.write(b'garbage\r\n\r\n')
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', '5')
+        self.end_headers()
+        if body:
+            self.wfile.write(b'video')
+
+    def do_GET(self):
+        self._reply(True)
+
+    def do_HEAD(self):
+        self._reply(False)
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    server = HTTPServer(('127.0.0.1', 0), _Upstream)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    _Upstream.methods = []
+    _Upstream.headers_seen = []
+    monkeypatch.setattr(media_relay, 'ALLOWED_HOSTS', ('localhost',))
+    yield f"http://localhost:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_requires_url_or_src():
+    assert status(relay('/relay')) == 400
+    assert status(relay('/relay?url=ftp://d.terabox.com/f')) == 400
+
+
+def test_rejects_hosts_outside_the_allowlist():
+    assert status(relay('/relay?url=http://127.0.0.1:1/')) == 403
+    assert status(relay('/relay?url=https://terabox.attacker.example/f')) == 403
+
+
+def test_rejects_private_addresses(upstream):
+    response = relay(f'/relay?url={upstream}/video')
+    assert status(response) == 403
+    assert b'address not allowed' in response
+
+
+def test_relays_allowed_upstream(upstream, monkeypatch):
+    monkeypatch.setattr(media_relay, 'ALLOW_PRIVATE', True)
+    response = relay(f'/relay?url={upstream}/video')
+    assert status(response) == 200
+    assert response.endswith(b'\r\n\r\nvideo')
+    assert _Upstream.methods == ['GET']
+
+
+def test_head_is_sent_upstream(upstream, monkeypatch):
+    monkeypatch.setattr(media_relay, 'ALLOW_PRIVATE', True)
+    response = relay(f'/relay?url={upstream}/video', method='HEAD')
+    assert status(response) == 200
+    assert b'Content-Length: 5' in response
+    assert response.endswith(b'\r\n\r\n')
+    assert _Upstream.methods == ['HEAD']
+
+
+def test_malformed_status_line(upstream, monkeypatch):
+    monkeypatch.setattr(media_relay, 'ALLOW_PRIVATE', True)
+    assert status(relay(f'/relay?url={upstream}/garbage')) == 502
+
+
+def test_extractor_failure_is_a_502(monkeypatch):
+    def extract(url):
+        raise RuntimeError('No video formats found')
+
+    monkeypatch.setitem(sys.modules, 'extractor', types.SimpleNamespace(extract=extract))
+    response = relay('/relay?src=https://vimeo.com/1')
+    assert status(response) == 502
+    assert b'No video formats found' in response
+
+
+def test_query_cannot_choose_the_cache_key(upstream, monkeypatch, tmp_path):
+    from media_cache import MediaCache
+
+    cache = MediaCache(str(tmp_path))
+    fills = []
+    monkeypatch.setattr(cache, 'fill', lambda *args: fills.append(args))
+    monkeypatch.setattr(media_relay, 'media_cache', cache)
+    monkeypatch.setattr(media_relay, 'ALLOW_PRIVATE', True)
+
+    response = relay(f'/relay?url={upstream}/video&key=terabox-fs:1&size=5')
+    assert status(response) == 200
+    assert fills == []
+    assert cache.stats()['misses'] == 0
+
+
+@pytest.mark.parametrize('referer', [
+    'x%0D%0AX-Injected:%20yes',
+    'https://example.com/%0D%0AX-Injected:%20yes',
+    'https://example.com/%E2%9C%93',
+    'javascript:alert(1)',
+])
+def test_rejects_unsafe_referers(upstream, monkeypatch, referer):
+    monkeypatch.setattr(media_relay, 'ALLOW_PRIVATE', True)
+    assert status(relay(f'/relay?url={upstream}/video&referer={referer}')) == 400
+    assert _Upstream.methods == []
+
+
+def test_passes_a_clean_referer(upstream, monkeypatch):
+    monkeypatch.setattr(media_relay, 'ALLOW_PRIVATE', True)
+    response = relay(f'/relay?url={upstream}/video&referer=https%3A%2F%2Fexample.com%2Fwatch%3Fv%3D1')
+    assert status(response) == 200
+    assert _Upstream.headers_seen[0]['Referer'] == 'https://example.com/watch?v=1'
+    assert 'X-Injected' not in _Upstream.headers_seen[0]
+
+
+def test_rejects_header_characters_in_the_url(upstream, monkeypatch):
+    monkeypatch.setattr(media_relay, 'ALLOW_PRIVATE', True)
+    assert status(relay(f'/relay?url={upstream}/video%20HTTP/1.1%0D%0AX-Injected:%20yes')) == 400
+    assert _Upstream.methods == []
+
+
+@pytest.fixture
+def terabox_upstream(upstream, monkeypatch):
+    """The local upstream posing as a Terabox host, with a pooled account cookie"""
+    monkeypatch.setattr(media_relay, 'ALLOW_PRIVATE', True)
+    monkeypatch.setattr(media_relay, 'is_terabox_host', lambda host: host == 'localhost')
+    monkeypatch.setattr(media_relay, '_terabox_cookie', lambda: 'ndus=account')
+    return upstream
+
+
+def test_client_urls_never_get_the_account_cookie(terabox_upstream):
+    response = relay(f'/relay?url={terabox_upstream}/api/list')
+    assert status(response) == 200
+    assert 'Cookie' not in _Upstream.headers_seen[0]
+
+
+def test_resolved_dlinks_get_the_account_cookie(terabox_upstream, monkeypatch):
+    def extract(url):
+        return {'success': True, 'download_link': f'{terabox_upstream}/video'}
+
+    monkeypatch.setitem(sys.modules, 'extractor', types.SimpleNamespace(extract=extract))
+    response = relay('/relay?src=https://www.terabox.com/s/1abc')
+    assert status(response) == 200
+    assert _Upstream.headers_seen[0]['Cookie'] == 'ndus=account'
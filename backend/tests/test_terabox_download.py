@@ -0,0 +1,75 @@
+import contextlib
+
+import pytest
+
+import terabox_download
+from terabox_download import DownloadError
+
+BLOB = bytes(range(256)) * 40  # 10240 bytes
+
+
+def fake_server(monkeypatch, ranged=True, status=200, body=BLOB, size=None):
+    """Patch _stream to serve body, honouring Range requests when ranged; status applies to plain GETs"""
+    size = len(body) if size is None else size
+
+    @contextlib.contextmanager
+    def stream(url, cookies, start=None, end=None):
+        if start is None and status != 200:
+            yield status, {}, iter(())
+        elif start is not None and ranged:
+            data = body[start:end + 1]
+            yield 206, {'Content-Range': f"bytes {start}-{end}/{size}"}, iter([data[:700], data[700:]])
+        else:
+            yield 200, {'Content-Length': str(size)}, iter([body[i:i + 1000] for i in range(0, len(body), 1000)])
+
+    monkeypatch.setattr(terabox_download, '_stream', stream)
+
+
+def test_parallel_download(monkeypatch, tmp_path):
+    fake_server(monkeypatch)
+    dest = str(tmp_path / 'file')
+    result = terabox_download.download('https://d.terabox.com/f', dest, len(BLOB), connections=3, chunk_size=1024)
+
+    assert result['success'], result
+    assert open(dest, 'rb').read() == BLOB
+    assert not (tmp_path / 'file.part.json').exists()
+
+
+def test_single_stream_failure_keeps_existing_file(monkeypatch, tmp_path):
+    dest = tmp_path / 'file'
+    dest.write_bytes(b'previous')
+
+    fake_server(monkeypatch, ranged=False, status=403)
+    result = terabox_download.download('https://d.terabox.com/f', str(dest))
+
+    assert not result['success']
+    assert dest.read_bytes() == b'previous'
+    assert list(tmp_path.iterdir()) == [dest]
+
+
+def test_single_stream_short_body_is_not_kept(monkeypatch, tmp_path):
+    fake_server(monkeypatch, ranged=False, body=BLOB[:5000], size=len(BLOB))
+    dest = tmp_path / 'file'
+    result = terabox_download.download('https://d.terabox.com/f', str(dest))
+
+    assert not result['success']
+    assert 'Incomplete' in result['error']
+    assert not dest.exists()
+
+
+def test_iter_download_in_order(monkeypatch):
+    fake_server(monkeypatch)
+    data = b''.join(terabox_download.iter_download('https://d.terabox.com/f', connections=2, chunk_size=1500))
+    assert data == BLOB
+
+
+def test_iter_download_checks_total(monkeypatch):
+    fake_server(monkeypatch, ranged=False, body=BLOB[:5000], size=len(BLOB))
+    with pytest.raises(DownloadError, match='Incomplete'):
+        b''.join(terabox_download.iter_download('https://d.terabox.com/f'))
+
+
+def test_iter_download_checks_extractor_size(monkeypatch):
+    fake_server(monkeypatch)
+    with pytest.raises(DownloadError, match='Size mismatch'):
+        next(terabox_download.iter_download('https://d.terabox.com/f', size_bytes=len(BLOB) + 1))
@@ -0,0 +1,134 @@
+import json
+import threading
+import urllib.error
+import urllib.parse
+
+import pytest
+
+import http_pool
+import terabox_extract_with_cookies as terabox
+from terabox_extract_with_cookies import PAGE_SIZE
+
+SHARE_URL = 'https://www.1024terabox.com/s/1abcDEF'
+
+
+def _file(fs_id, path):
+    return {'fs_id': fs_id, 'isdir': 0, 'path': path, 'server_filename': path.rsplit('/', 1)[-1], 'size': 1024}
+
+
+def _dir(path):
+    return {'isdir': '1', 'path': path, 'server_filename': path.rsplit('/', 1)[-1]}
+
+
+def build_share():
+    """
+    152 files: a 108-entry root (2 pages: 98 files + 2 folders, then 10
+    files), /A with 30 files, /B with 13 files and a folder /B/C with 1
+    """
+    fs_ids = iter(range(1, 1000))
+    root = [_file(next(fs_ids), f'/root{i}.mp4') for i in range(98)] + [_dir('/A'), _dir('/B')]
+    root += [_file(next(fs_ids), f'/more{i}.mp4') for i in range(10)]
+    return {
+        None: root,
+        '/A': [_file(next(fs_ids), f'/A/{i}.mp4') for i in range(30)],
+        '/B': [_dir('/B/C')] + [_file(next(fs_ids), f'/B/{i}.mp4') for i in range(13)],
+        '/B/C': [_file(next(fs_ids), '/B/C/0.mp4')],
+    }
+
+
+class FakeTerabox:
+    """share/list and share/download across the mirrors, with call counts"""
+
+    def __init__(self, share, failing_download_domains=(), empty_download_domains=()):
+        self.share = share
+        self.failing = set(failing_download_domains)
+        self.empty = set(empty_download_domains)
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def __call__(self, method, url, **kwargs):
+        parts = urllib.parse.urlsplit(url)
+        query = dict(urllib.parse.parse_qsl(parts.query))
+        with self.lock:
+            self.calls.append((parts.hostname, parts.path, query))
+
+        if parts.path == '/share/list':
+            entries = self.share[None if query['root'] == '1' else query['dir']]
+            page, num = int(query['page']), int(query['num'])
+            return {'errno': 0, 'list': entries[(page - 1) * num:page * num],
+                    'sign': 's', 'timestamp': 1, 'shareid': 2, 'uk': 3}
+
+        if parts.hostname in self.failing:
+            raise urllib.error.URLError('mirror down')
+        if parts.hostname in self.empty:
+            return {'errno': 0, 'list': []}
+        fs_ids = json.loads(query['fid_list'])
+        return {'errno': 0, 'list': [{'fs_id': fs_id, 'dlink': f'https://d.terabox.com/file/{fs_id}'} for fs_id in fs_ids]}
+
+    def count(self, path, host=None):
+        return sum(1 for h, p, _ in self.calls if p == path and (host is None or h == host))
+
+
+@pytest.fixture
+def cookie_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(terabox, '_last_winner', {'domain': None, 'at': 0.0})
+    path = tmp_path / 'cookies.txt'
+    path.write_text("# Netscape HTTP Cookie File\n.1024terabox.com\tTRUE\t/\tTRUE\t2147483647\tndus\tsession\n")
+    return str(path)
+
+
+def test_folder_share_is_listed_and_resolved_in_batches(monkeypatch, cookie_file):
+    api = FakeTerabox(build_share())
+    monkeypatch.setattr(http_pool, 'fetch_json', api)
+
+    result = terabox.extract_with_account(SHARE_URL, cookie_file)
+
+    assert result['success'], result
+    assert result['file_count'] == 152
+    assert len({entry['fs_id'] for entry in result['files']}) == 152
+    assert all(entry['download_link'].endswith(f"/{entry['fs_id']}") for entry in result['files'])
+    # Root page 1 and 2, /A, /B, /B/C
+    assert api.count('/share/list') == 5
+    # ceil(152 / FID_BATCH)
+    assert api.count('/share/download') == 8
+    assert max(len(json.loads(q['fid_list'])) for _, p, q in api.calls if p == '/share/download') == terabox.FID_BATCH
+
+
+def test_pagination_stops_on_a_short_page(monkeypatch, cookie_file):
+    share = {None: [_file(i, f'/{i}.mp4') for i in range(PAGE_SIZE)]}
+    api = FakeTerabox(share)
+    monkeypatch.setattr(http_pool, 'fetch_json', api)
+
+    entries = terabox.list_pages('www.terabox.com', '1abc', {}, None)
+
+    # A full page means "maybe more": page 2 is fetched and comes back empty
+    assert len(entries) == PAGE_SIZE
+    assert [q['page'] for _, p, q in api.calls] == ['1', '2']
+
+
+def test_max_files_caps_the_walk(monkeypatch, cookie_file):
+    monkeypatch.setattr(terabox, 'MAX_FILES', 40)
+    api = FakeTerabox(build_share())
+    monkeypatch.setattr(http_pool, 'fetch_json', api)
+
+    result = terabox.extract_with_account(SHARE_URL, cookie_file)
+
+    assert result['file_count'] == 40
+    # The root's first page already holds more than MAX_FILES entries
+    assert api.count('/share/list') == 1
+    assert api.count('/share/download') == 2
+
+
+def test_download_links_fall_back_to_other_mirrors(monkeypatch, cookie_file):
+    # The first mirror errors, the second answers without dlinks, the third works
+    api = FakeTerabox(build_share(), failing_download_domains={'www.1024terabox.com'},
+                      empty_download_domains={'www.terabox.com'})
+    monkeypatch.setattr(http_pool, 'fetch_json', api)
+
+    result = terabox.extract_with_account(SHARE_URL, cookie_file)
+
+    assert result['file_count'] == 152
+    assert all(entry['download_link'] for entry in result['files'])
+    for domain in terabox.DOMAINS:
+        assert api.count('/share/download', domain) == 8
+    assert result['extractor'] == 'terabox-authenticated-www.teraboxapp.com'
@@ -0,0 +1,102 @@
+import os
+import sys
+import types
+
+import pytest
+
+from ydl_pool import YdlPool, pool_key
+
+
+class FakeJar:
+    def __init__(self, path):
+        self.path = path
+        self.loads = 0
+        self.load()
+
+    def clear(self):
+        pass
+
+    def load(self, ignore_discard=False, ignore_expires=False):
+        self.loads += 1
+
+
+class FakeYoutubeDL:
+    def __init__(self, params):
+        self.params = params
+        self.cookiejar = FakeJar(params.get('cookiefile'))
+
+    def close(self):
+        # yt-dlp saves the jar back to cookiefile on close
+        with open(self.params['cookiefile'], 'a') as f:
+            f.write('# saved\n')
+
+
+@pytest.fixture
+def cookiefile(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'yt_dlp', types.SimpleNamespace(YoutubeDL=FakeYoutubeDL))
+    path = tmp_path / 'cookies.txt'
+    path.write_text('# Netscape HTTP Cookie File\n')
+    return str(path)
+
+
+def test_key_ignores_cookie_file_contents(cookiefile):
+    opts = {'cookiefile': cookiefile}
+    key = pool_key(opts)
+    with open(cookiefile, 'a') as f:
+        f.write('# edited\n')
+    assert pool_key(opts) == key
+
+
+def test_own_saves_do_not_strand_idle_instances(cookiefile):
+    pool = YdlPool(enabled=True, max_idle=2)
+    opts = {'cookiefile': cookiefile}
+
+    with pool.checkout(opts) as first:
+        with pytest.raises(RuntimeError):
+            with pool.checkout(opts):
+                raise RuntimeError('extraction failed')
+
+    # The failed instance was closed, which rewrote the cookie file; the idle
+    # one is still reused and picks the saved cookies up
+    with pool.checkout(opts) as again:
+        assert again is first
+        assert again.cookiejar.loads == 2
+
+    stats = pool.stats()
+    assert stats['keys'] == 1
+    assert stats['created'] == 2
+    assert stats['cookie_reloads'] == 1
+
+
+def test_unchanged_cookie_file_is_not_reloaded(cookiefile):
+    pool = YdlPool(enabled=True)
+    opts = {'cookiefile': cookiefile}
+    for _ in range(3):
+        with pool.checkout(opts) as ydl:
+            pass
+    assert ydl.cookiejar.loads == 1
+    assert pool.stats()['reused'] == 2
+
+
+def test_instance_without_reloadable_jar_is_replaced(cookiefile):
+    pool = YdlPool(enabled=True)
+    opts = {'cookiefile': cookiefile}
+    with pool.checkout(opts) as first:
+        first.cookiejar = None
+    os.utime(cookiefile, ns=(1, 1))
+
+    with pool.checkout(opts) as second:
+        assert second is not first
+    assert pool.stats()['created'] == 2
+
+
+def test_instances_are_recycled_after_max_uses(cookiefile):
+    pool = YdlPool(enabled=True, max_uses=2)
+    opts = {'cookiefile': cookiefile}
+    with pool.checkout(opts) as first:
+        pass
+    with pool.checkout(opts):
+        pass
+    with pool.checkout(opts) as third:
+        assert third is not first
+    assert pool.stats()['recycled'] == 1
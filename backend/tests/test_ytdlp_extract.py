@@ -0,0 +1,20 @@
+import pytest
+
+from ytdlp_extract import is_permanent_error, is_video_error
+
+
+@pytest.mark.parametrize('reason, permanent', [
+    ('ERROR: [youtube] abc: Private video. Sign in if you have been granted access to this video', True),
+    ('ERROR: [youtube] abc: Video unavailable. This video is unavailable', True),
+    ('ERROR: [youtube] abc: Video unavailable. This video has been removed by the uploader', True),
+    ('ERROR: [youtube] abc: Video unavailable. This content isn\'t available, try again later.', False),
+    ('ERROR: [youtube] abc: Sign in to confirm you\'re not a bot', False),
+    ('ERROR: [youtube] abc: HTTP Error 429: Too Many Requests', False),
+])
+def test_permanent_errors(reason, permanent):
+    assert is_permanent_error(reason) is permanent
+
+
+def test_rate_limit_counts_against_the_client():
+    assert is_video_error('Sign in to confirm your age')
+    assert not is_video_error('Video unavailable. This content isn\'t available, try again later.')
@@ -0,0 +1,233 @@
+// Python Worker Pool - Reuses warm extract_worker.py processes instead of
+// spawning a fresh interpreter (and re-importing yt_dlp) for every request.
+// Each worker runs one extraction at a time; a job's timeout runs from the
+// moment it is queued, and jobs beyond the queue limit are rejected at once.
+const { spawn } = require('child_process');
+const os = require('os');
+const path = require('path');
+const readline = require('readline');
+
+const WORKER_SCRIPT = path.join(__dirname, '..', 'extract_worker.py');
+// Extractions mostly wait on the network, so run a few per core (each worker
+// is one Python process, so keep a ceiling for memory)
+const DEFAULT_POOL_SIZE = parseInt(
+  process.env.PYTHON_WORKERS || String(Math.min(8, Math.max(4, os.cpus().length * 2))), 10
+);
+const DEFAULT_QUEUE_LIMIT = parseInt(process.env.PYTHON_WORKER_QUEUE || '32', 10);
+const MAX_REQUESTS_PER_WORKER = parseInt(process.env.PYTHON_WORKER_MAX_REQUESTS || '500', 10);
+
+class PythonWorker {
+  constructor(pool) {
+    this.pool = pool;
+    this.busy = false;
+    this.ready = false;
+    this.served = 0;
+    this.current = null;
+
+    this.process = spawn('python3', [WORKER_SCRIPT, '--preload', pool.preload.join(',')], {
+      cwd: path.dirname(WORKER_SCRIPT),
+      stdio: ['pipe', 'pipe', 'pipe']
+    });
+
+    this.readyPromise = new Promise((resolve, reject) => {
+      this.onReady = resolve;
+      this.onReadyError = reject;
+    });
+
+    readline.createInterface({ input: this.process.stdout }).on('line', (line) => this.handleLine(line));
+
+    this.process.stderr.on('data', (data) => {
+      const text = data.toString().trim();
+      if (text) console.log(`🐍 worker[${this.process.pid}]: ${text.substring(0, 300)}`);
+    });
+
+    this.process.on('error', (error) => {
+      console.log('⚠️ Failed to start Python worker:', error.message);
+    });
+
+    this.process.on('exit', (code) => {
+      const startedUp = this.ready;
+      this.ready = false;
+      this.onReadyError(new Error(`Python worker exited during startup (code ${code})`));
+      if (this.current) {
+        clearTimeout(this.current.timer);
+        this.current.reject(new Error(`Python worker exited (code ${code})`));
+        this.current = null;
+      }
+      this.pool.remove(this, startedUp);
+    });
+  }
+
+  handleLine(line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (error) {
+      console.log('⚠️ Ignoring non-JSON worker output:', line.substring(0, 200));
+      return;
+    }
+
+    if (message.ready) {
+      this.ready = true;
+      this.onReady();
+      return;
+    }
+
+    const job = this.current;
+    if (!job || message.id !== job.id) return;
+
+    if (message.error) {
+      job.reject(new Error(message.error));
+    } else {
+      job.resolve(message.result);
+    }
+    this.finish();
+  }
+
+  run(job) {
+    this.busy = true;
+    this.current = job;
+    job.worker = this;
+    this.served++;
+
+    this.process.stdin.write(JSON.stringify({ id: job.id, backend: job.backend, args: job.args }) + '\n');
+  }
+
+  finish() {
+    if (this.current) clearTimeout(this.current.timer);
+    this.current = null;
+    this.busy = false;
+
+    // Recycle long-lived workers to bound memory growth
+    if (this.served >= MAX_REQUESTS_PER_WORKER) {
+      this.kill();
+      return;
+    }
+    this.pool.drain();
+  }
+
+  // The job's deadline passed while it was running: a hung extraction would
+  // block this worker forever - replace it
+  abandon(job) {
+    if (this.current !== job) return;
+    this.current = null;
+    this.kill();
+  }
+
+  kill() {
+    this.process.kill();
+  }
+}
+
+class PoolBusyError extends Error {
+  constructor(limit) {
+    super(`Python worker pool busy (${limit} extractions queued)`);
+    this.code = 'POOL_BUSY';
+  }
+}
+
+class PythonWorkerPool {
+  constructor({ size = DEFAULT_POOL_SIZE, queueLimit = DEFAULT_QUEUE_LIMIT, preload = ['ytdlp'] } = {}) {
+    this.size = Math.max(1, size);
+    this.queueLimit = Math.max(0, queueLimit);
+    this.preload = preload;
+    this.workers = [];
+    this.queue = [];
+    this.nextId = 1;
+    this.inFlight = new Map();
+  }
+
+  // Run an extraction backend with positional args, resolves with its JSON result.
+  // Identical concurrent requests share one extraction (and its result or error).
+  // timeout covers queueing and running; rejects with PoolBusyError (code
+  // POOL_BUSY) when the queue is full.
+  run(backend, args, timeout = 45000) {
+    const key = JSON.stringify([backend, args]);
+    if (this.inFlight.has(key)) {
+      // Every caller gets its own copy of the shared result
+      return this.inFlight.get(key).then(result => structuredClone(result));
+    }
+
+    const idle = this.workers.some(w => w.ready && !w.busy);
+    if (!idle && this.queue.length >= this.queueLimit) {
+      return Promise.reject(new PoolBusyError(this.queueLimit));
+    }
+
+    const promise = new Promise((resolve, reject) => {
+      const job = { id: this.nextId++, backend, args, timeout, resolve, reject, worker: null };
+      job.timer = setTimeout(() => this.expire(job), timeout);
+      this.queue.push(job);
+      this.drain();
+    });
+
+    this.inFlight.set(key, promise);
+    const clear = () => this.inFlight.delete(key);
+    promise.then(clear, clear);
+    return promise.then(result => structuredClone(result));
+  }
+
+  expire(job) {
+    job.reject(new Error(`${job.backend} worker timeout`));
+    if (job.worker) {
+      job.worker.abandon(job);
+    } else {
+      // Still waiting for a worker: it never runs
+      this.queue = this.queue.filter(queued => queued !== job);
+    }
+  }
+
+  drain() {
+    while (this.queue.length > 0) {
+      const worker = this.workers.find(w => w.ready && !w.busy);
+      if (!worker) break;
+      worker.run(this.queue.shift());
+    }
+
+    // Grow the pool lazily up to its configured size
+    if (this.queue.length > 0 && this.workers.length < this.size) {
+      this.spawn();
+    }
+  }
+
+  spawn() {
+    const worker = new PythonWorker(this);
+    this.workers.push(worker);
+    worker.readyPromise
+      .then(() => this.drain())
+      .catch((error) => console.log('⚠️', error.message));
+    return worker;
+  }
+
+  remove(worker, startedUp = true) {
+    this.workers = this.workers.filter(w => w !== worker);
+
+    // A worker that never became ready will not do better on respawn -
+    // fail the waiting jobs instead of looping
+    if (!startedUp && this.workers.length === 0) {
+      const queued = this.queue.splice(0);
+      queued.forEach(job => {
+        clearTimeout(job.timer);
+        job.reject(new Error('Python worker failed to start'));
+      });
+      return;
+    }
+    this.drain();
+  }
+
+  // Start workers ahead of the first request
+  warm() {
+    while (this.workers.length < this.size) {
+      this.spawn();
+    }
+  }
+
+  shutdown() {
+    this.workers.forEach(w => w.kill());
+    this.workers = [];
+  }
+}
+
+// Shared singleton used by the extract handlers
+const pythonWorkerPool = new PythonWorkerPool({ preload: ['ytdlp', 'terabox-working'] });
+
+module.exports = { pythonWorkerPool, PythonWorkerPool, PoolBusyError };
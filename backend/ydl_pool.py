@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+YoutubeDL Instance Pool
+Reuses initialized yt_dlp.YoutubeDL objects across extractions in a
+long-running worker instead of building one per request (extractor
+registry setup, cookie file parsing, opener construction)
+
+- instances are keyed by (player_client, cookie file path, hash of the
+  remaining options); when the cookie file's mtime/size changed since an
+  instance last read it (an edit, or another instance saving its jar on
+  close), the instance reloads its cookie jar on checkout
+- checkout() hands an instance to one thread at a time; an instance whose
+  extraction raised is closed rather than returned
+- instances are recycled after YDL_POOL_MAX_USES extractions or
+  YDL_POOL_MAX_AGE seconds; at most YDL_POOL_IDLE idle instances per key and
+  YDL_POOL_KEYS keys (least recently used key dropped first)
+
+YDL_POOL=0 builds a fresh instance per checkout (the old behaviour).
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+import contextlib
+from collections import OrderedDict
+
+POOL_ENABLED = os.environ.get('YDL_POOL', '1').lower() not in ('0', 'false', 'no')
+MAX_IDLE = int(os.environ.get('YDL_POOL_IDLE', '2'))
+MAX_USES = int(os.environ.get('YDL_POOL_MAX_USES', '50'))
+MAX_AGE = float(os.environ.get('YDL_POOL_MAX_AGE', '600'))
+MAX_KEYS = int(os.environ.get('YDL_POOL_KEYS', '32'))
+
+
+class _Entry:
+    def __init__(self, ydl, cookie_signature=None):
+        self.ydl = ydl
+        self.created = time.time()
+        self.uses = 0
+        self.cookie_signature = cookie_signature
+
+
+def _close(entry):
+    try:
+        # close() also writes the cookie jar back to cookiefile, as the
+        # `with YoutubeDL(...)` form did
+        close = getattr(entry.ydl, 'close', None)
+        if close:
+            close()
+        else:
+            entry.ydl.__exit__(None, None, None)
+    except Exception:
+        pass
+
+
+def _cookie_signature(cookiefile):
+    """(mtime_ns, size) of the cookie file, None when missing or unset"""
+    if not cookiefile:
+        return None
+    try:
+        stat = os.stat(cookiefile)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _reload_cookies(ydl):
+    """Re-read cookiefile into the instance's jar; False when it can't"""
+    jar = getattr(ydl, 'cookiejar', None)
+    if jar is None or not hasattr(jar, 'load'):
+        return False
+    try:
+        jar.clear()
+        jar.load(ignore_discard=True, ignore_expires=True)
+    except Exception:
+        return False
+    return True
+
+
+def pool_key(opts):
+    """(player_client, cookie file, options hash)"""
+    clients = tuple(
+        (opts.get('extractor_args') or {}).get('youtube', {}).get('player_client') or ()
+    )
+    digest = hashlib.sha1(
+        json.dumps(opts, sort_keys=True, default=repr).encode('utf-8')
+    ).hexdigest()
+    return clients, opts.get('cookiefile'), digest
+
+
+class YdlPool:
+    def __init__(self, enabled=POOL_ENABLED, max_idle=MAX_IDLE, max_uses=MAX_USES,
+                 max_age=MAX_AGE, max_keys=MAX_KEYS):
+        self.enabled = enabled
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.max_keys = max_keys
+        self.lock = threading.Lock()
+        self.idle = OrderedDict()  # key -> [_Entry], least recently used key first
+        self.counters = {'created': 0, 'reused': 0, 'recycled': 0, 'discarded': 0, 'cookie_reloads': 0}
+
+    def _take(self, key):
+        with self.lock:
+            entries = self.idle.get(key)
+            if entries:
+                self.idle.move_to_end(key)
+                self.counters['reused'] += 1
+                return entries.pop()
+        return None
+
+    def _give_back(self, key, entry):
+        expired = []
+        with self.lock:
+            entries = self.idle.setdefault(key, [])
+            self.idle.move_to_end(key)
+            if len(entries) < self.max_idle:
+                entries.append(entry)
+            else:
+                expired.append(entry)
+
+            while len(self.idle) > self.max_keys:
+                _, dropped = self.idle.popitem(last=False)
+                expired.extend(dropped)
+
+        for old in expired:
+            _close(old)
+
+    @contextlib.contextmanager
+    def checkout(self, opts):
+        """A YoutubeDL for opts, exclusively owned until the block exits"""
+        import yt_dlp
+
+        if not self.enabled:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                yield ydl
+            return
+
+        key = pool_key(opts)
+        signature = _cookie_signature(opts.get('cookiefile'))
+        entry = self._take(key)
+        if entry is not None and entry.cookie_signature != signature:
+            if _reload_cookies(entry.ydl):
+                entry.cookie_signature = signature
+                with self.lock:
+                    self.counters['cookie_reloads'] += 1
+            else:
+                _close(entry)
+                entry = None
+        if entry is None:
+            entry = _Entry(yt_dlp.YoutubeDL(opts), signature)
+            with self.lock:
+                self.counters['created'] += 1
+
+        reusable = False
+        try:
+            yield entry.ydl
+            reusable = True
+        finally:
+            entry.uses += 1
+            if not reusable:
+                # Unknown internal state after an error - start over
+                with self.lock:
+                    self.counters['discarded'] += 1
+                _close(entry)
+            elif entry.uses >= self.max_uses or time.time() - entry.created >= self.max_age:
+                with self.lock:
+                    self.counters['recycled'] += 1
+                _close(entry)
+            else:
+                self._give_back(key, entry)
+
+    def stats(self):
+        with self.lock:
+            return dict(
+                self.counters,
+                enabled=self.enabled,
+                keys=len(self.idle),
+                idle=sum(len(entries) for entries in self.idle.values()),
+            )
+
+
+ydl_pool = YdlPool()
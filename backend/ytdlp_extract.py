@@ -2,13 +2,94 @@
 """
 yt-dlp extractor with YouTube PO Token workaround
 Fixes "Requested format is not available" error
+
+yt_dlp is imported on the first extraction (by ydl_pool), so argument
+errors and the --worker/--batch entry points don't pay for it up front.
 """
-import yt_dlp
 import json
 import sys
+import os
+import time
+import threading
+from client_stats import ClientStats
+from extract_cache import account_key, cached_extraction
+from progress import ProgressQueue, emit_early_metadata, format_ndjson
+from hedging import first_success
+import cookie_pool
+import link_probe
+import metrics
+import circuit_breaker
+from format_select import top_formats, slim_opts, youtube_args
+from ydl_pool import ydl_pool
+from extractor.formatting import format_duration, format_size_mb
+
+# Player clients in priority order (prioritize those that don't need PO tokens)
+# tv_embedded: No PO token needed, works best
+# android_vr: No PO token needed
+# ios: May need PO token (rolling out)
+EXTRACTORS = [
+    {'name': 'tv_embedded', 'client': ['tv_embedded']},
+    {'name': 'android_vr', 'client': ['android_vr']},
+    {'name': 'ios', 'client': ['ios']},
+    {'name': 'android', 'client': ['android']},
+    {'name': 'mweb', 'client': ['mweb']},
+]
+
+# Race mode: launch clients concurrently instead of one after another.
+# A new client is started every RACE_STAGGER seconds (or as soon as the
+# running ones have all failed), so a healthy first client costs no fan-out.
+RACE_MODE = os.environ.get('YTDLP_RACE', '').lower() in ('1', 'true', 'yes')
+RACE_STAGGER = float(os.environ.get('YTDLP_RACE_STAGGER', '2.0'))
+
+# Adaptive ordering: reorder EXTRACTORS by live per-client success rate and
+# latency (shared across workers via a state file). YTDLP_ADAPTIVE=0 disables.
+ADAPTIVE_ORDER = os.environ.get('YTDLP_ADAPTIVE', '1').lower() not in ('0', 'false', 'no')
+client_stats = ClientStats() if ADAPTIVE_ORDER else None
+
+# Failures caused by the video itself - no player client will get past
+# them, so when every client fails this way the result is marked permanent
+# (and negatively cached by extract_cache)
+PERMANENT_ERRORS = (
+    'Private video',
+    'This video is unavailable',
+    'This video has been removed',
+    'This video is no longer available',
+    'This video is not available',
+    'members-only',
+    'not made this video available in your country',
+)
+
+# YouTube's rate-limit / bot check also reads "Video unavailable. This
+# content isn't available, try again later" - never permanent, and it is
+# the client (or IP) that is being refused
+TRANSIENT_ERRORS = ('try again later',)
+
+# Failures that say nothing about the player client, so they don't count
+# against the client's circuit breaker (age gates depend on the client)
+VIDEO_ERRORS = PERMANENT_ERRORS + ('confirm your age',)
 
-def extract_video(url, cookies_file=None):
-    """Extract video info using yt-dlp Python library with PO Token workaround"""
+def is_permanent_error(reason):
+    return (any(marker in reason for marker in PERMANENT_ERRORS)
+            and not any(marker in reason for marker in TRANSIENT_ERRORS))
+
+def is_video_error(reason):
+    return (any(marker in reason for marker in VIDEO_ERRORS)
+            and not any(marker in reason for marker in TRANSIENT_ERRORS))
+
+@cached_extraction('ytdlp', account='cookies_file')
+def extract_video(url, cookies_file=None, race=None, stagger=None, progress=None):
+    """
+    Extract video info using yt-dlp Python library with PO Token workaround
+    
+    progress: optional callable progress(event, **data) receiving
+    client_attempt / client_failed / metadata / formats events
+    """
+    timings = metrics.Timings('ytdlp')
+    
+    # The first extraction in a process pays for importing yt_dlp
+    if 'yt_dlp' not in sys.modules:
+        with timings.stage('import_yt_dlp'):
+            import yt_dlp  # noqa: F401
     
     # Base options - Use clients that don't require PO tokens
     # Source: https://github.com/yt-dlp/yt-dlp/wiki/PO-Token-Guide
@@ -24,117 +105,59 @@ def extract_video(url, cookies_file=None):
         # 'format': 'best',  # DON'T USE THIS - causes errors
     }
     
+    # Pick an account from the cookie pool (YOUTUBE_COOKIE_POOL, or just
+    # the given cookies file)
+    pool = cookie_pool.get_pool('youtube', cookies_file)
+    if pool:
+        cookies_file = pool.acquire()
+    
     # Add cookies if provided
     if cookies_file:
         ydl_opts['cookiefile'] = cookies_file
     
-    # Try different clients in order (prioritize those that don't need PO tokens)
-    # tv_embedded: No PO token needed, works best
-    # android_vr: No PO token needed
-    # ios: May need PO token (rolling out)
-    extractors = [
-        {'name': 'tv_embedded', 'client': ['tv_embedded']},
-        {'name': 'android_vr', 'client': ['android_vr']},
-        {'name': 'ios', 'client': ['ios']},
-        {'name': 'android', 'client': ['android']},
-        {'name': 'mweb', 'client': ['mweb']},
-    ]
+    if race is None:
+        race = RACE_MODE
+    if stagger is None:
+        stagger = RACE_STAGGER
     
-    for extractor in extractors:
-        try:
-            # Set player client
-            ydl_opts['extractor_args'] = {
-                'youtube': {
-                    'player_client': extractor['client']
-                }
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                if info and 'formats' in info and len(info['formats']) > 0:
-                    # Success! Build response in expected format
-                    formats = []
-                    
-                    # Extract format info
-                    for fmt in info['formats']:
-                        if fmt.get('url'):
-                            formats.append({
-                                'format_id': fmt.get('format_id', ''),
-                                'ext': fmt.get('ext', 'mp4'),
-                                'quality': fmt.get('format_note', ''),
-                                'height': fmt.get('height', 0),
-                                'width': fmt.get('width', 0),
-                                'filesize': fmt.get('filesize', 0),
-                                'vcodec': fmt.get('vcodec', 'none'),
-                                'acodec': fmt.get('acodec', 'none'),
-                                'url': fmt.get('url', ''),
-                                'abr': fmt.get('abr', 0),
-                                'tbr': fmt.get('tbr', 0)
-                            })
-                    
-                    # Format duration
-                    duration_seconds = info.get('duration', 0)
-                    if duration_seconds:
-                        mins = int(duration_seconds // 60)
-                        secs = int(duration_seconds % 60)
-                        duration_str = f"{mins}:{secs:02d}"
-                    else:
-                        duration_str = "0:00"
-                    
-                    # Build response
-                    result = {
-                        'title': info.get('title', 'Video'),
-                        'thumbnail': info.get('thumbnail', 'https://via.placeholder.com/640x360'),
-                        'duration': duration_str,
-                        'qualities': [],
-                        'audioFormats': [],
-                        'platform': 'youtube',
-                        'extractionMethod': f'yt-dlp-{extractor["name"]}'
-                    }
-                    
-                    # Separate video and audio formats
-                    video_formats = [f for f in formats if f['vcodec'] != 'none' and f['url']]
-                    audio_formats = [f for f in formats if f['vcodec'] == 'none' and f['acodec'] != 'none' and f['url']]
-                    
-                    # Sort video formats by height (quality)
-                    video_formats.sort(key=lambda x: x['height'] or 0, reverse=True)
-                    
-                    # Build qualities list (top 5)
-                    for fmt in video_formats[:5]:
-                        quality_label = f"{fmt['height']}p" if fmt['height'] else (fmt['quality'] or 'Unknown')
-                        size_mb = f"{fmt['filesize'] / (1024*1024):.2f} MB" if fmt['filesize'] else 'Unknown'
-                        
-                        result['qualities'].append({
-                            'quality': quality_label,
-                            'format': fmt['ext'] or 'mp4',
-                            'size': size_mb,
-                            'url': fmt['url'],
-                            'hasAudio': fmt['acodec'] != 'none',
-                            'hasVideo': fmt['vcodec'] != 'none'
-                        })
-                    
-                    # Build audio formats list (top 3)
-                    audio_formats.sort(key=lambda x: x['abr'] or x['tbr'] or 0, reverse=True)
-                    for fmt in audio_formats[:3]:
-                        quality_label = f"{int(fmt['abr'])}kbps" if fmt['abr'] else (f"{int(fmt['tbr'])}kbps" if fmt['tbr'] else '128kbps')
-                        size_mb = f"{fmt['filesize'] / (1024*1024):.2f} MB" if fmt['filesize'] else 'Unknown'
-                        
-                        result['audioFormats'].append({
-                            'quality': quality_label,
-                            'format': fmt['ext'] or 'mp3',
-                            'size': size_mb,
-                            'url': fmt['url']
-                        })
-                    
-                    return result
-                    
-        except Exception as e:
-            # Try next extractor
-            continue
+    extractors = client_stats.order(EXTRACTORS) if client_stats else EXTRACTORS
+    
+    # Title/thumbnail from oEmbed usually arrive long before the formats
+    if progress:
+        emit_early_metadata(url, progress)
+    
+    result = None
+    depth = None
+    failures = []
+    if race:
+        depth, result = race_clients(url, ydl_opts, extractors, stagger, progress, timings, failures)
+    else:
+        for depth, extractor in enumerate(extractors):
+            result = extract_with_client(url, ydl_opts, extractor, progress, timings, failures)
+            if result:
+                break
+    
+    # Permanent only when every client that ran gave a video-level error
+    permanent = result is None and bool(failures) and all(map(is_permanent_error, failures))
+    
+    # How many clients failed before one answered
+    metrics.inc('extract_fallback_depth_total', backend='ytdlp', depth=depth if result else 'exhausted')
+    
+    if pool and (result is not None or failures):
+        # A private/removed video isn't the account's fault; when no client
+        # ran at all (every breaker open) there is nothing to report
+        pool.report(cookies_file, result is not None or permanent, None if result else 'All extractors failed')
+    
+    # Optional: check the top format URLs are alive and fill in real sizes
+    if result and link_probe.PROBE_ENABLED:
+        with timings.stage('probe'):
+            link_probe.probe_formats(result, format_size_mb, progress=progress)
+    
+    if result:
+        return timings.finish(result)
     
     # All extractors failed
-    return {
+    failed = {
         'title': 'Video',
         'thumbnail': 'https://via.placeholder.com/640x360',
         'duration': '0:00',
@@ -144,14 +167,201 @@ def extract_video(url, cookies_file=None):
         'extractionMethod': 'yt-dlp-failed',
         'error': 'All extractors failed'
     }
+    if permanent:
+        failed['permanent'] = True
+        failed['reason'] = failures[0][:300]
+    return timings.finish(failed)
+
+def extract_with_client(url, base_opts, extractor, progress=None, timings=None, failures=None):
+    """
+    Try one player client, returns the response dict or None on failure
+    (the failure reason is appended to `failures` when given)
+    """
+    # A client that has been failing for every video is skipped until its
+    # breaker lets a trial request through. One breaker per client and
+    # account: a bot-checked account must not close the clients for the others.
+    breaker_name = f"ytdlp-client:{extractor['name']}"
+    if base_opts.get('cookiefile'):
+        breaker_name += f"@{account_key(base_opts['cookiefile'])}"
+    breaker = circuit_breaker.get_breaker(breaker_name)
+    if breaker and not breaker.allow():
+        if progress:
+            progress('client_failed', client=extractor['name'],
+                     reason=f"circuit open (retry in {breaker.retry_after():.0f}s)")
+        return None
+    
+    started = time.time()
+    result = None
+    client_fault = True
+    
+    if progress:
+        progress('client_attempt', client=extractor['name'])
+    
+    try:
+        # Set player client (on a copy - race mode runs clients concurrently)
+        ydl_opts = slim_opts(base_opts)
+        ydl_opts['extractor_args'] = youtube_args(player_client=extractor['client'])
+        
+        # Pooled instance for this client + cookie file + options
+        with ydl_pool.checkout(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+            
+            if info and 'formats' in info and len(info['formats']) > 0:
+                if progress:
+                    progress(
+                        'metadata',
+                        source=extractor['name'],
+                        title=info.get('title', 'Video'),
+                        thumbnail=info.get('thumbnail', ''),
+                        duration=info.get('duration', 0)
+                    )
+                
+                with metrics.stage(timings, 'build_result'):
+                    result = build_result(info, extractor['name'])
+                
+                if progress:
+                    progress(
+                        'formats',
+                        client=extractor['name'],
+                        qualities=len(result['qualities']),
+                        audioFormats=len(result['audioFormats'])
+                    )
+            else:
+                if failures is not None:
+                    failures.append('No formats returned')
+                if progress:
+                    progress('client_failed', client=extractor['name'], reason='No formats returned')
+    
+    except Exception as e:
+        # Caller tries the next extractor
+        client_fault = not is_video_error(str(e))
+        if failures is not None:
+            failures.append(str(e))
+        if progress:
+            progress('client_failed', client=extractor['name'], reason=str(e)[:300])
+    
+    if breaker:
+        breaker.record(result is not None or not client_fault)
+    
+    elapsed = time.time() - started
+    metrics.observe('ytdlp_client_duration_seconds', elapsed, client=extractor['name'], outcome='ok' if result else 'error')
+    if timings:
+        timings.add(f"client.{extractor['name']}", elapsed)
+    
+    # Feed the outcome back into the client ordering (video-level errors
+    # say nothing about the client, same as for the breaker)
+    if client_stats and (result is not None or client_fault):
+        client_stats.record(extractor['name'], result is not None, elapsed)
+    
+    return result
+
+def race_clients(url, base_opts, extractors, stagger, progress=None, timings=None, failures=None):
+    """
+    Hedged extraction: start clients in priority order, one every `stagger`
+    seconds. Returns (index of the winning client, first result with formats).
+    """
+    attempts = [
+        (lambda extractor=extractor: extract_with_client(url, base_opts, extractor, progress, timings, failures))
+        for extractor in extractors
+    ]
+    return first_success(attempts, stagger)
+
+def build_result(info, extractor_name):
+    """Build the response dict from a yt-dlp info dict"""
+    # One pass over the formats, top-K by heap, compact records only
+    video_formats, audio_formats = top_formats(info['formats'], video_limit=5, audio_limit=3)
+    
+    # Build response
+    result = {
+        'title': info.get('title', 'Video'),
+        'thumbnail': info.get('thumbnail', 'https://via.placeholder.com/640x360'),
+        'duration': format_duration(info.get('duration', 0)),
+        'qualities': [],
+        'audioFormats': [],
+        'platform': 'youtube',
+        'extractionMethod': f'yt-dlp-{extractor_name}'
+    }
+    
+    # Build qualities list (top 5 by height)
+    for fmt in video_formats:
+        quality_label = f"{fmt.height}p" if fmt.height else (fmt.quality or 'Unknown')
+        size_mb = format_size_mb(fmt.filesize)
+        
+        result['qualities'].append({
+            'quality': quality_label,
+            'format': fmt.ext or 'mp4',
+            'size': size_mb,
+            'url': fmt.url,
+            'format_id': fmt.format_id,
+            'hasAudio': fmt.acodec != 'none',
+            'hasVideo': fmt.vcodec != 'none'
+        })
+    
+    # Build audio formats list (top 3 by bitrate)
+    for fmt in audio_formats:
+        quality_label = f"{int(fmt.abr)}kbps" if fmt.abr else (f"{int(fmt.tbr)}kbps" if fmt.tbr else '128kbps')
+        size_mb = format_size_mb(fmt.filesize)
+        
+        result['audioFormats'].append({
+            'quality': quality_label,
+            'format': fmt.ext or 'mp3',
+            'size': size_mb,
+            'url': fmt.url,
+            'format_id': fmt.format_id
+        })
+    
+    return result
 
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        from extract_worker import main
+        main(sys.argv[2:], default_backend='ytdlp')
+        sys.exit(0)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--self-profile':
+        # Re-run this script under -X importtime and report startup cost
+        import startup_profile
+        startup_profile.self_profile(__file__, sys.argv[2:])
+        sys.exit(0)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--stream':
+        # NDJSON progress events, then a final {"event": "result"} line
+        if len(sys.argv) < 3:
+            print(format_ndjson({'event': 'error', 'message': 'No URL provided'}))
+            sys.exit(1)
+        
+        events = ProgressQueue()
+        
+        def run():
+            try:
+                result = extract_video(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None, progress=events)
+                events('result', result=result)
+            except Exception as e:
+                events('error', message=str(e))
+            finally:
+                events.close()
+        
+        threading.Thread(target=run, daemon=True).start()
+        for event in events.iter():
+            sys.stdout.write(format_ndjson(event))
+            sys.stdout.flush()
+        sys.exit(0)
+    
+    if len(sys.argv) > 1 and sys.argv[1] == '--batch':
+        import batch_extract
+        batch_extract.main(sys.argv[2:], extract_video)
+        sys.exit(0)
+    
+    args = [a for a in sys.argv[1:] if a != '--race']
+    race = True if '--race' in sys.argv[1:] else None
+    
+    if len(args) < 1:
         print(json.dumps({'error': 'No URL provided', 'qualities': [], 'audioFormats': []}))
         sys.exit(1)
     
-    url = sys.argv[1]
-    cookies_file = sys.argv[2] if len(sys.argv) > 2 else None
+    url = args[0]
+    cookies_file = args[1] if len(args) > 1 else None
+    startup = metrics.process_age()
     
-    result = extract_video(url, cookies_file)
-    print(json.dumps(result))
+    result = extract_video(url, cookies_file, race=race)
+    print(json.dumps(metrics.add_startup(result, startup)))